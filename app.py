@@ -1,43 +1,203 @@
+import asyncio
+import html
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import gradio as gr
-from openai import OpenAI
-from PIL import Image
-import io
-import markdown
-
-client = OpenAI(base_url='http://localhost:8000/v1', api_key='fake')  # Connect to local vLLM
-
-def infer(image, is_finetuned):
-    model = 'models/sumerian-deepseek-ocr' if is_finetuned else 'unsloth/DeepSeek-OCR'
-    
-    # Prepare image as base64 or bytes (vLLM/DeepSeek expects <image> token)
-    buffered = io.BytesIO()
-    image.save(buffered, format='JPEG')
-    img_bytes = buffered.getvalue()
-
-    prompt = '<image>\nExtract cuneiform signs as CDLI ATF transliteration format. Output only the ATF lines.'
-    
-    response = client.chat.completions.create(
-        model=model,
-        messages=[{'role': 'user', 'content': [{'type': 'text', 'text': prompt}, {'type': 'image_url', 'image_url': {'url': f'data:image/jpeg;base64,{img_bytes}'}}]}],
-        max_tokens=1024
-    )
-    
-    atf = response.choices[0].message.content.strip()
-    
-    # Optional markdown table: simple parse of ATF lines into table
-    lines = atf.split('\n')
-    table = '| Line | Signs |\n|------|-------|\n' + '\n'.join(f'| {i+1} | {line} |' for i, line in enumerate(lines) if line)
-    md_table = markdown.markdown(table)
-    
-    return atf, md_table
+from openai import APIConnectionError, APIStatusError, APITimeoutError
+
+# Add lib to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'lib'))
+
+from inference import (BASE_MODEL, FINETUNED_MODEL, PROMPT, OCRClient, ResultCache, encode_image, enrich_atf,
+                       result_key, warm_translators)
+from inference.fanout import line_crops, stitch, transcribe_crops
+
+# Requests generating on the vLLM server at once; further users wait in the Gradio queue
+MAX_IN_FLIGHT = 16
+# Users allowed to wait in the queue before new submissions are rejected
+QUEUE_SIZE = 64
+REQUEST_TIMEOUT = 120
+# Transliterations keyed by image pixels + model + prompt; repeated uploads skip the server
+RESULT_CACHE_DIR = 'data/cache/ocr'
+RESULT_CACHE_SIZE = 512
+# Request images: long edge in pixels (the model's native resolution), JPEG quality, size cap in bytes
+PAYLOAD_SIZE = 1024
+PAYLOAD_QUALITY = 88
+MAX_PAYLOAD_BYTES = 750_000
+# Line-parallel mode: columns on the obverse/reverse (line counts are estimated)
+MAX_COLUMNS = 6
+# Threads for glyph/gloss enrichment of the OCR output
+ENRICH_WORKERS = 2
+
+client = OCRClient(base_url='http://localhost:8000/v1', api_key='fake', max_in_flight=MAX_IN_FLIGHT,
+                   timeout=REQUEST_TIMEOUT)  # Connect to local vLLM
+cache = ResultCache(RESULT_CACHE_DIR, capacity=RESULT_CACHE_SIZE)
+# Dictionaries are loaded once here, not per request
+translators = warm_translators()
+enrich_pool = ThreadPoolExecutor(max_workers=ENRICH_WORKERS, thread_name_prefix='enrich')
+
+
+def signs_table(rows):
+    """HTML table of enriched lines; unmapped signs are highlighted."""
+    def cell(sign):
+        text = html.escape(sign['atf'])
+        return text if sign['mapped'] else f'<mark title="no Unicode glyph">{text}</mark>'
+
+    body = ''.join(
+        f"<tr><td>{html.escape(row['label'])}</td><td>{' '.join(cell(sign) for sign in row['signs'])}</td>"
+        f"<td style=\"font-size: 1.5em\">{html.escape(row['glyphs'])}</td><td>{html.escape(row['gloss'])}</td></tr>"
+        for row in rows)
+    return f'<table><tr><th>Line</th><th>ATF</th><th>Glyphs</th><th>Gloss</th></tr>{body}</table>'
+
+
+async def enrich(atf):
+    """Enriched rows for `atf`, computed on the enrichment pool."""
+    return await asyncio.get_running_loop().run_in_executor(enrich_pool, enrich_atf, atf, translators)
+
+
+async def transcribe_whole(image, model, crop_background, updates):
+    """One streamed request for the whole photo; partial ATF goes to `updates`."""
+    # Resize/crop and encode once, off the event loop
+    payload = await asyncio.to_thread(encode_image, image, PAYLOAD_SIZE, PAYLOAD_QUALITY, MAX_PAYLOAD_BYTES,
+                                      crop_background)
+    print(f"{model}: {payload.bytes} bytes ({payload.size[0]}x{payload.size[1]}, q{payload.quality}), "
+          f"encoded in {payload.encode_ms:.0f} ms")
+    start = time.perf_counter()
+    atf, usage, first_token_ms = '', {}, None
+    async for delta, chunk_usage in client.stream(payload.url, model):
+        if delta and first_token_ms is None:
+            first_token_ms = (time.perf_counter() - start) * 1000
+        usage = chunk_usage or usage
+        if delta:
+            atf += delta
+            updates.put_nowait(atf)
+    return {'atf': atf.strip(), 'model': model, 'usage': usage,
+            'first_token_ms': round(first_token_ms or 0, 1),
+            'payload': {'bytes': payload.bytes, 'images': 1, 'encode_ms': round(payload.encode_ms, 1)}}
+
+
+async def transcribe_lines(image, model, columns, updates):
+    """Line-parallel requests for faces/line bands; the stitched ATF so far goes to `updates`."""
+    start = time.perf_counter()
+
+    def prepare():
+        crops = line_crops(image, columns)
+        return crops, [encode_image(crop.image, PAYLOAD_SIZE, PAYLOAD_QUALITY, MAX_PAYLOAD_BYTES) for crop in crops]
+
+    crops, payloads = await asyncio.to_thread(prepare)
+    encode_ms = (time.perf_counter() - start) * 1000
+    sent = sum(payload.bytes for payload in payloads)
+    print(f"{model}: {len(crops)} crops, {sent} bytes, segmented and encoded in {encode_ms:.0f} ms")
+    start = time.perf_counter()
+    texts = [None] * len(crops)
+    usage = {'prompt_tokens': 0, 'completion_tokens': 0}
+    first_token_ms = None
+    async for index, text, crop_usage in transcribe_crops(client, [payload.url for payload in payloads], model,
+                                                          max_tokens=[crop.max_tokens for crop in crops]):
+        first_token_ms = first_token_ms or (time.perf_counter() - start) * 1000
+        texts[index] = text
+        for name in usage:
+            usage[name] += crop_usage.get(name) or 0
+        # Show the crops finished so far, up to the first one still pending in reading order
+        done = next((i for i, t in enumerate(texts) if t is None), len(texts))
+        updates.put_nowait(stitch(crops[:done], texts[:done]) + '\n')
+    return {'atf': stitch(crops, texts), 'model': model, 'usage': usage,
+            'first_token_ms': round(first_token_ms or 0, 1),
+            'payload': {'bytes': sent, 'images': len(crops), 'encode_ms': round(encode_ms, 1)}}
+
+
+async def infer(image, is_finetuned, crop_background=True, line_parallel=False, columns=1):
+    """Stream (ATF, table, status) updates: the text as it arrives, the table per completed line."""
+    if image is None:
+        raise gr.Error('Upload a tablet image first.')
+    model = FINETUNED_MODEL if is_finetuned else BASE_MODEL
+    columns = int(columns)
+    options = {'size': PAYLOAD_SIZE, 'quality': PAYLOAD_QUALITY, 'max_bytes': MAX_PAYLOAD_BYTES,
+               'crop': bool(crop_background)}
+    if line_parallel:
+        options.update(mode='lines', columns=columns)
+    updates = asyncio.Queue()
+
+    def transcribe():
+        if line_parallel:
+            return transcribe_lines(image, model, columns, updates)
+        return transcribe_whole(image, model, crop_background, updates)
+
+    # Hashing the full-resolution pixels takes tens of ms; keep it off the event loop like the encoding
+    key = await asyncio.to_thread(result_key, image, model, PROMPT, options)
+    # The request runs as its own task (shared with identical concurrent requests by the cache);
+    # partial text arrives through `updates` until it finishes
+    task = asyncio.ensure_future(cache.get_or_compute(key, transcribe))
+    rendered_lines = 0
+    try:
+        while not task.done():
+            update = asyncio.ensure_future(updates.get())
+            await asyncio.wait({update, task}, return_when=asyncio.FIRST_COMPLETED)
+            if not update.done():
+                update.cancel()
+                break
+            atf = update.result()
+            while not updates.empty():
+                atf = updates.get_nowait()
+            # Post-processing only sees completed lines; the table is re-rendered when one is added
+            completed = atf[:atf.rfind('\n') + 1]
+            table = gr.update()
+            if completed.count('\n') != rendered_lines:
+                rendered_lines = completed.count('\n')
+                table = signs_table(await enrich(completed))
+            yield atf, table, f'Generating… {rendered_lines} lines'
+        result, cached = await task
+    except ValueError as e:
+        raise gr.Error(str(e))
+    except APITimeoutError:
+        raise gr.Error(f'The OCR server did not answer within {REQUEST_TIMEOUT}s.')
+    except APIConnectionError:
+        raise gr.Error('The OCR server is not reachable; start it with `python serve.py`.')
+    except APIStatusError as e:
+        raise gr.Error(f'The OCR server rejected the request ({e.status_code}).')
+    finally:
+        # Cancel/disconnect closes this generator: stop the request, which aborts the generation
+        task.cancel()
+
+    atf = result['atf']
+    start = time.perf_counter()
+    rows = await enrich(atf)
+    enrich_ms = (time.perf_counter() - start) * 1000
+    unknown = sum(len(row['unknown']) for row in rows)
+    stats = cache.stats()
+    payload = result['payload']
+    sent = ('Cache hit, nothing sent' if cached else
+            f"Sent {payload['bytes'] / 1024:.0f} KB in {payload['images']} JPEG(s), prepared in "
+            f"{payload['encode_ms']:.0f} ms; first output after {result['first_token_ms']:.0f} ms")
+    status = (f"{sent} · enriched in {enrich_ms:.0f} ms, {unknown} signs without a glyph · "
+              f"cache: {stats['hits']} hits / {stats['misses']} misses, {stats['entries']} in memory")
+    yield atf, signs_table(rows), status
+
 
 with gr.Blocks() as demo:
     gr.Markdown('# Deep Cuneiform OCR Demo')
     image_input = gr.Image(type='pil', label='Upload Tablet Image')
     toggle = gr.Checkbox(label='Use Fine-Tuned Model (vs Zero-Shot)', value=False)
+    crop_toggle = gr.Checkbox(label='Crop Background Around the Tablet', value=True)
+    with gr.Row():
+        parallel_toggle = gr.Checkbox(label='Line-Parallel Mode (Large Tablets)', value=False)
+        columns_input = gr.Slider(1, MAX_COLUMNS, value=1, step=1, label='Columns per Face')
     atf_output = gr.Textbox(label='ATF Transliteration')
-    table_output = gr.HTML(label='Signs Table (Optional)')
-    submit = gr.Button('Transliterate')
-    submit.click(infer, inputs=[image_input, toggle], outputs=[atf_output, table_output])
+    table_output = gr.HTML(label='Signs: Glyphs and Glosses')
+    status_output = gr.Markdown()
+    with gr.Row():
+        submit = gr.Button('Transliterate')
+        cancel = gr.Button('Cancel')
+    # Cancelling the stream closes its HTTP request, which aborts the generation on the server
+    run = submit.click(infer, inputs=[image_input, toggle, crop_toggle, parallel_toggle, columns_input],
+                       outputs=[atf_output, table_output, status_output],
+                       concurrency_limit=MAX_IN_FLIGHT)
+    cancel.click(None, cancels=[run])
+
+demo.queue(max_size=QUEUE_SIZE, default_concurrency_limit=MAX_IN_FLIGHT)
 
-demo.launch(server_name='0.0.0.0', server_port=7860)
+if __name__ == '__main__':
+    demo.launch(server_name='0.0.0.0', server_port=7860)
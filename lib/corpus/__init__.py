@@ -0,0 +1,33 @@
+"""
+ATF corpus tooling: streaming reader, sign index and integer-encoded corpus.
+"""
+
+from .atf_reader import SURFACES, normalize_sign, tokenize_line, parse_tablet, split_surfaces, split_columns, iter_atf_files, iter_tablets, read_tablet_at
+from .sign_index import SignIndex
+from .encoded_corpus import SignVocabulary, EncodedCorpus, encode_corpus, load_period_map
+from .dedup import find_clusters, group_clusters, grouped_split
+from .ngram_stats import unigram_counts, ngram_counts, cooccurrence_counts, period_distribution
+
+__all__ = [
+    'SURFACES',
+    'normalize_sign',
+    'tokenize_line',
+    'parse_tablet',
+    'split_surfaces',
+    'split_columns',
+    'iter_atf_files',
+    'iter_tablets',
+    'read_tablet_at',
+    'SignIndex',
+    'SignVocabulary',
+    'EncodedCorpus',
+    'encode_corpus',
+    'load_period_map',
+    'unigram_counts',
+    'ngram_counts',
+    'cooccurrence_counts',
+    'period_distribution',
+    'find_clusters',
+    'group_clusters',
+    'grouped_split'
+]
@@ -0,0 +1,179 @@
+"""
+Streaming ATF corpus reader.
+
+Splits ATF files (single-tablet files from data/annotations as well as the
+multi-tablet CDLI dump) into tablets, surfaces and numbered lines, and
+tokenizes transliterations into normalized signs.
+"""
+
+import os
+import re
+
+SURFACES = ['obverse', 'reverse', 'left', 'right', 'top', 'bottom', 'edge', 'seal', 'face', 'other']
+SURFACE_IDS = {name: i for i, name in enumerate(SURFACES)}
+
+LINE_RE = re.compile(r'^(\d+[a-z]?[\'"]*)\.\s*(.*)$')
+TABLET_RE = re.compile(r'^&\s*([A-Z]\d+)')
+# Compounds |...| and determinatives {...} are single tokens; everything
+# else is split on whitespace and hyphens.
+TOKEN_RE = re.compile(r'\|[^|\s]+\||\{[^}\s]+\}|[^\s\-{}|]+')
+BRACKETS_RE = re.compile(r'[\[\]⸢⸣<>_]')
+FLAGS_RE = re.compile(r'[#?!*]+')
+
+
+def normalize_sign(token):
+    """
+    Normalize a raw ATF token for indexing and statistics.
+
+    Strips breakage brackets, Sumerogram underscores and damage/uncertainty
+    flags, and case-folds. Returns None for tokens that carry no sign
+    (`...`, `,`, empty).
+    """
+    sign = FLAGS_RE.sub('', BRACKETS_RE.sub('', token)).lower()
+    if not sign or sign.strip('.,:;') == '':
+        return None
+    return sign
+
+
+def tokenize_line(text):
+    """Split the transliteration part of a line into normalized signs."""
+    signs = []
+    for token in TOKEN_RE.findall(text):
+        sign = normalize_sign(token)
+        if sign:
+            signs.append(sign)
+    return signs
+
+
+def parse_tablet(atf_text):
+    """
+    Parse the text of one tablet into numbered lines.
+
+    Returns:
+        list[tuple[str, str, list[str]]]: (surface, line_label, signs)
+    """
+    lines = []
+    surface = 'obverse'
+    for raw in atf_text.split('\n'):
+        line = raw.strip()
+        if not line:
+            continue
+        if line.startswith('@'):
+            surface = _surface_name(line) or surface
+            continue
+        match = LINE_RE.match(line)
+        if not match:
+            continue  # $ state, # comment, >> link, & header
+        signs = tokenize_line(match.group(2))
+        if signs:
+            lines.append((surface, match.group(1), signs))
+    return lines
+
+
+def _surface_name(line):
+    """Surface for an `@...` line, or None for other structure lines (@tablet, @column)."""
+    name = line[1:].split()[0].lower() if len(line) > 1 else ''
+    if name in SURFACE_IDS:
+        return name
+    if name in ('envelope', 'fragment', 'object'):
+        return 'other'
+    return None
+
+
+def split_surfaces(atf_text):
+    """
+    Split the text of one tablet into its surfaces.
+
+    Keeps numbered lines, `$` state lines and `@column` rulings; drops the
+    header, `#` comments and `>>` links.
+
+    Returns:
+        dict[str, str]: surface -> ATF text of that surface, in tablet order.
+        Surfaces without a numbered line are left out.
+    """
+    sections = {}
+    surface = 'obverse'
+    for raw in atf_text.split('\n'):
+        line = raw.strip()
+        if not line or line.startswith(('&', '#', '>>')):
+            continue
+        if line.startswith('@'):
+            name = _surface_name(line)
+            if name:
+                surface = name
+                continue
+            if not line.lower().startswith('@column'):
+                continue
+        sections.setdefault(surface, []).append(line)
+    return {surface: '\n'.join(lines) for surface, lines in sections.items()
+            if any(LINE_RE.match(line) for line in lines)}
+
+
+def split_columns(section_text):
+    """
+    Numbered lines of one surface section, grouped by `@column`.
+
+    Returns:
+        list[list[tuple[str, str]]]: Columns in ATF order, each a list of
+        (line label, full line text); sections without rulings are one column
+    """
+    columns = [[]]
+    for raw in section_text.split('\n'):
+        line = raw.strip()
+        if line.lower().startswith('@column'):
+            if columns[-1]:
+                columns.append([])
+            continue
+        match = LINE_RE.match(line)
+        if match:
+            columns[-1].append((match.group(1), line))
+    return [column for column in columns if column]
+
+
+def iter_atf_files(sources):
+    """Yield `.atf` file paths from a list of files and/or directories."""
+    for source in sources:
+        if os.path.isdir(source):
+            for name in sorted(os.listdir(source)):
+                if name.endswith('.atf'):
+                    yield os.path.join(source, name)
+        elif os.path.exists(source):
+            yield source
+
+
+def iter_tablets(atf_path):
+    """
+    Split an ATF file into tablets on `&P...` header lines.
+
+    Yields:
+        tuple[str, int, str]: (tablet name, byte offset in the file, text).
+        Files without a header yield a single tablet named after the file.
+    """
+    default_name = os.path.splitext(os.path.basename(atf_path))[0]
+    name, start, chunk = None, 0, []
+    offset = 0
+    with open(atf_path, 'rb') as f:
+        for raw in f:
+            line = raw.decode('utf-8', errors='ignore')
+            match = TABLET_RE.match(line)
+            if match:
+                if chunk and (name or ''.join(chunk).strip()):
+                    yield name or default_name, start, ''.join(chunk)
+                name, start, chunk = match.group(1), offset, []
+            chunk.append(line)
+            offset += len(raw)
+    if chunk and (name or ''.join(chunk).strip()):
+        yield name or default_name, start, ''.join(chunk)
+
+
+def read_tablet_at(atf_path, offset):
+    """Read a single tablet starting at a byte offset recorded by iter_tablets()."""
+    chunk = []
+    with open(atf_path, 'rb') as f:
+        f.seek(offset)
+        for i, raw in enumerate(f):
+            line = raw.decode('utf-8', errors='ignore')
+            if i > 0 and TABLET_RE.match(line):
+                break
+            chunk.append(line)
+    return ''.join(chunk)
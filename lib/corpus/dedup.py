@@ -0,0 +1,196 @@
+"""
+Near-duplicate tablet detection with MinHash over sign shingles and LSH.
+
+Every tablet becomes a set of k-sign shingles (within lines). MinHash
+signatures are computed in vectorized batches, banded into an LSH table, and
+only tablets sharing a band bucket are compared, so clustering is
+sub-quadratic. Candidate pairs above the Jaccard threshold are merged with
+union-find into clusters.
+"""
+
+import random
+import zlib
+
+import numpy as np
+
+from .atf_reader import parse_tablet
+
+# Largest prime below 2**32. Operands are reduced below it, so a * x + b is
+# at most (p - 1)**2 + (p - 1) < 2**64 and the uint64 arithmetic never wraps
+MERSENNE_PRIME = np.uint64(4294967291)
+MAX_HASH = np.uint64(2 ** 32 - 1)
+DEFAULT_NUM_PERM = 128
+DEFAULT_BANDS = 16
+DEFAULT_SHINGLE = 3
+DEFAULT_THRESHOLD = 0.8
+BATCH_SHINGLES = 65536
+# Buckets larger than this are compared star-wise against their first member
+MAX_BUCKET_ALL_PAIRS = 64
+
+
+def shingle_hashes(atf_text, k=DEFAULT_SHINGLE):
+    """
+    Hash the k-sign shingles of a tablet to stable 32-bit integers.
+
+    Lines shorter than k contribute the whole line as one shingle.
+    """
+    hashes = set()
+    for surface, label, signs in parse_tablet(atf_text):
+        if len(signs) <= k:
+            hashes.add(zlib.crc32(' '.join(signs).encode('utf-8')))
+            continue
+        for i in range(len(signs) - k + 1):
+            hashes.add(zlib.crc32(' '.join(signs[i:i + k]).encode('utf-8')))
+    return np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+
+
+class MinHasher:
+    """Fixed family of `num_perm` universal hash functions (a * x + b) mod p over Z_p."""
+
+    def __init__(self, num_perm=DEFAULT_NUM_PERM, seed=1):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.a = rng.randint(1, int(MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+        self.b = rng.randint(0, int(MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+
+    def signatures(self, shingle_sets):
+        """
+        MinHash signatures for a list of shingle-hash arrays.
+
+        Shingles of many tablets are concatenated and hashed in batches;
+        per-tablet minima come from np.minimum.reduceat.
+
+        Returns:
+            np.ndarray: uint64 array of shape (len(shingle_sets), num_perm);
+            tablets without shingles get all-MAX_HASH rows
+        """
+        result = np.full((len(shingle_sets), self.num_perm), MAX_HASH, dtype=np.uint64)
+        start = 0
+        while start < len(shingle_sets):
+            end, total = start, 0
+            while end < len(shingle_sets) and (total == 0 or total + len(shingle_sets[end]) <= BATCH_SHINGLES):
+                total += len(shingle_sets[end])
+                end += 1
+            batch = [(i, s) for i, s in enumerate(shingle_sets[start:end], start) if len(s)]
+            if batch:
+                # 32-bit shingle hashes may exceed p; reduce them into Z_p before multiplying
+                values = np.concatenate([s for _, s in batch]) % MERSENNE_PRIME
+                offsets = np.cumsum([0] + [len(s) for _, s in batch[:-1]])
+                hashed = (self.a[:, None] * values[None, :] + self.b[:, None]) % MERSENNE_PRIME
+                minima = np.minimum.reduceat(hashed, offsets, axis=1)
+                result[[i for i, _ in batch]] = minima.T
+            start = end
+        return result
+
+
+class MinHashLSH:
+    """Banded LSH table over MinHash signatures."""
+
+    def __init__(self, num_perm=DEFAULT_NUM_PERM, bands=DEFAULT_BANDS):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be divisible by bands ({bands})")
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.tables = [{} for _ in range(bands)]
+
+    def insert(self, item, signature):
+        for band, table in enumerate(self.tables):
+            key = signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            table.setdefault(key, []).append(item)
+
+    def candidate_pairs(self):
+        """
+        (i, j) pairs with i < j sharing at least one band bucket.
+
+        Very large buckets (typically exact duplicates) only pair every
+        member with the first one, which keeps the count linear.
+        """
+        pairs = set()
+        for table in self.tables:
+            for bucket in table.values():
+                if len(bucket) < 2:
+                    continue
+                if len(bucket) > MAX_BUCKET_ALL_PAIRS:
+                    pairs.update((bucket[0], other) for other in bucket[1:])
+                    continue
+                for x in range(len(bucket)):
+                    for y in range(x + 1, len(bucket)):
+                        pairs.add((bucket[x], bucket[y]) if bucket[x] < bucket[y] else (bucket[y], bucket[x]))
+        return pairs
+
+
+def _find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def find_clusters(texts, threshold=DEFAULT_THRESHOLD, num_perm=DEFAULT_NUM_PERM, bands=DEFAULT_BANDS,
+                  shingle=DEFAULT_SHINGLE, seed=1):
+    """
+    Cluster near-duplicate tablets.
+
+    Args:
+        texts (list[str]): ATF text of each tablet
+        threshold (float): Minimum estimated Jaccard similarity to merge
+        num_perm (int): MinHash signature length
+        bands (int): LSH bands (num_perm must be divisible by bands)
+        shingle (int): Signs per shingle
+        seed (int): Seed of the hash family
+
+    Returns:
+        list[int]: Cluster id of every tablet; singletons get their own id.
+        Ids are the index of the cluster's first member.
+    """
+    shingle_sets = [shingle_hashes(text, shingle) for text in texts]
+    signatures = MinHasher(num_perm, seed).signatures(shingle_sets)
+
+    lsh = MinHashLSH(num_perm, bands)
+    for i, shingles in enumerate(shingle_sets):
+        if len(shingles):
+            lsh.insert(i, signatures[i])
+
+    parent = list(range(len(texts)))
+    for i, j in lsh.candidate_pairs():
+        similarity = float(np.mean(signatures[i] == signatures[j]))
+        if similarity >= threshold:
+            root_i, root_j = _find(parent, i), _find(parent, j)
+            if root_i != root_j:
+                parent[max(root_i, root_j)] = min(root_i, root_j)
+    return [_find(parent, i) for i in range(len(texts))]
+
+
+def group_clusters(cluster_ids):
+    """Group item indices by cluster id, keeping only clusters with duplicates."""
+    groups = {}
+    for i, cluster in enumerate(cluster_ids):
+        groups.setdefault(cluster, []).append(i)
+    return [members for members in groups.values() if len(members) > 1]
+
+
+def grouped_split(cluster_ids, test_size=0.2, seed=3407):
+    """
+    Train/test split that keeps every cluster on one side.
+
+    Clusters are shuffled deterministically and assigned to the test side
+    until it holds `test_size` of the items.
+
+    Returns:
+        tuple[list[int], list[int]]: (train indices, test indices)
+    """
+    groups = {}
+    for i, cluster in enumerate(cluster_ids):
+        groups.setdefault(cluster, []).append(i)
+    clusters = sorted(groups)
+    random.Random(seed).shuffle(clusters)
+
+    target = int(round(test_size * len(cluster_ids)))
+    train, test = [], []
+    for cluster in clusters:
+        members = groups[cluster]
+        if len(test) < target:
+            test.extend(members)
+        else:
+            train.extend(members)
+    return sorted(train), sorted(test)
@@ -0,0 +1,179 @@
+"""
+Integer-encoded ATF corpus stored as memory-mapped NumPy arrays.
+
+Layout of an encoded corpus directory:
+
+    vocab.json           sign id -> sign (the global interning table)
+    tokens.npy           int32 sign ids of every token, in reading order
+    line_offsets.npy     int64, line i spans tokens[line_offsets[i]:line_offsets[i + 1]]
+    tablet_offsets.npy   int64, tablet j spans lines[tablet_offsets[j]:tablet_offsets[j + 1]]
+    tablet_periods.npy   int16 index into periods for every tablet
+    tablets.json         tablet names and period names
+"""
+
+import csv
+import json
+import os
+from array import array
+
+import numpy as np
+
+from .atf_reader import iter_atf_files, iter_tablets, parse_tablet
+
+UNKNOWN_PERIOD = 'Unknown'
+
+
+class SignVocabulary:
+    """Global sign interning table (sign <-> int32 id)."""
+
+    def __init__(self, signs=None):
+        self.signs = list(signs or [])
+        self.ids = {sign: i for i, sign in enumerate(self.signs)}
+
+    def __len__(self):
+        return len(self.signs)
+
+    def intern(self, sign):
+        """Return the id of a sign, adding it if new."""
+        sign_id = self.ids.get(sign)
+        if sign_id is None:
+            sign_id = len(self.signs)
+            self.signs.append(sign)
+            self.ids[sign] = sign_id
+        return sign_id
+
+    def encode(self, signs):
+        return [self.intern(sign) for sign in signs]
+
+    def decode(self, ids):
+        return [self.signs[i] for i in ids]
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.signs, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+
+def load_period_map(csv_path):
+    """Map P-numbers to periods from the CDLI catalogue CSV (empty if missing)."""
+    periods = {}
+    if not os.path.exists(csv_path):
+        return periods
+    with open(csv_path, 'r', encoding='utf-8') as csvfile:
+        reader = csv.DictReader(csvfile)
+        for row in reader:
+            pnumber_raw = row.get('id_text')
+            if not pnumber_raw:
+                continue
+            try:
+                pnumber = f"P{int(pnumber_raw):06d}"
+            except ValueError:
+                pnumber = pnumber_raw
+            periods[pnumber] = row.get('period', '') or UNKNOWN_PERIOD
+    return periods
+
+
+def encode_corpus(sources, out_dir, period_map=None, vocab=None):
+    """
+    Encode every tablet of the given ATF files/directories into out_dir.
+
+    Args:
+        sources (list[str]): ATF files and/or directories
+        out_dir (str): Output directory
+        period_map (dict): Optional P-number -> period name
+        vocab (SignVocabulary): Optional existing vocabulary to extend, so
+            ids stay stable across re-encodes
+
+    Returns:
+        EncodedCorpus: The encoded corpus, memory-mapped from out_dir
+    """
+    period_map = period_map or {}
+    vocab = vocab or SignVocabulary()
+    tokens = array('i')
+    line_offsets = array('q', [0])
+    tablet_offsets = array('q', [0])
+    tablet_names = []
+    tablet_periods = array('h')
+    periods = {}
+
+    for path in iter_atf_files(sources):
+        for name, offset, text in iter_tablets(path):
+            for surface, label, signs in parse_tablet(text):
+                tokens.extend(vocab.encode(signs))
+                line_offsets.append(len(tokens))
+            tablet_offsets.append(len(line_offsets) - 1)
+            tablet_names.append(name)
+            period = period_map.get(name, UNKNOWN_PERIOD)
+            tablet_periods.append(periods.setdefault(period, len(periods)))
+
+    os.makedirs(out_dir, exist_ok=True)
+    vocab.save(os.path.join(out_dir, 'vocab.json'))
+    np.save(os.path.join(out_dir, 'tokens.npy'), np.frombuffer(tokens, dtype=np.int32))
+    np.save(os.path.join(out_dir, 'line_offsets.npy'), np.frombuffer(line_offsets, dtype=np.int64))
+    np.save(os.path.join(out_dir, 'tablet_offsets.npy'), np.frombuffer(tablet_offsets, dtype=np.int64))
+    np.save(os.path.join(out_dir, 'tablet_periods.npy'), np.frombuffer(tablet_periods, dtype=np.int16))
+    with open(os.path.join(out_dir, 'tablets.json'), 'w', encoding='utf-8') as f:
+        json.dump({'names': tablet_names, 'periods': list(periods)}, f, ensure_ascii=False)
+    return EncodedCorpus.load(out_dir)
+
+
+class EncodedCorpus:
+    """Read-only view over an encoded corpus directory (arrays are memory-mapped)."""
+
+    def __init__(self, vocab, tokens, line_offsets, tablet_offsets, tablet_periods, tablet_names, periods):
+        self.vocab = vocab
+        self.tokens = tokens
+        self.line_offsets = line_offsets
+        self.tablet_offsets = tablet_offsets
+        self.tablet_periods = tablet_periods
+        self.tablet_names = tablet_names
+        self.periods = periods
+
+    @classmethod
+    def load(cls, corpus_dir):
+        def load_array(name):
+            return np.load(os.path.join(corpus_dir, name), mmap_mode='r')
+
+        with open(os.path.join(corpus_dir, 'tablets.json'), 'r', encoding='utf-8') as f:
+            tablets = json.load(f)
+        return cls(
+            vocab=SignVocabulary.load(os.path.join(corpus_dir, 'vocab.json')),
+            tokens=load_array('tokens.npy'),
+            line_offsets=load_array('line_offsets.npy'),
+            tablet_offsets=load_array('tablet_offsets.npy'),
+            tablet_periods=load_array('tablet_periods.npy'),
+            tablet_names=tablets['names'],
+            periods=tablets['periods'],
+        )
+
+    @property
+    def num_tokens(self):
+        return len(self.tokens)
+
+    @property
+    def num_lines(self):
+        return len(self.line_offsets) - 1
+
+    @property
+    def num_tablets(self):
+        return len(self.tablet_offsets) - 1
+
+    def line_ids(self):
+        """Line index of every token (int64 array, same length as tokens)."""
+        return np.repeat(np.arange(self.num_lines, dtype=np.int64), np.diff(self.line_offsets))
+
+    def tablet_ids(self):
+        """Tablet index of every token."""
+        lines_per_tablet = np.diff(self.tablet_offsets)
+        line_tablet = np.repeat(np.arange(self.num_tablets, dtype=np.int64), lines_per_tablet)
+        return line_tablet[self.line_ids()]
+
+    def tablet_tokens(self, tablet):
+        """Token ids of one tablet as a zero-copy slice."""
+        first_line = self.tablet_offsets[tablet]
+        last_line = self.tablet_offsets[tablet + 1]
+        return self.tokens[self.line_offsets[first_line]:self.line_offsets[last_line]]
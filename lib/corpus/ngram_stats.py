@@ -0,0 +1,89 @@
+"""
+Vectorized sign statistics over an EncodedCorpus.
+
+All functions operate on whole int32 token arrays; n-grams and
+co-occurrences never cross line boundaries.
+"""
+
+import numpy as np
+
+
+def unigram_counts(corpus):
+    """Count of every sign id (array of length len(vocab))."""
+    return np.bincount(np.asarray(corpus.tokens), minlength=len(corpus.vocab))
+
+
+def _valid_starts(corpus, span):
+    """Token positions i such that tokens[i:i + span] lie on one line."""
+    line_ids = corpus.line_ids()
+    if len(line_ids) < span:
+        return np.zeros(0, dtype=np.int64)
+    return np.flatnonzero(line_ids[:len(line_ids) - span + 1] == line_ids[span - 1:])
+
+
+def ngram_counts(corpus, n):
+    """
+    Count all sign n-grams that fall within a single line.
+
+    Each n-gram is packed into one int64 key (base len(vocab)), so counting
+    is a single np.unique call.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: (ngrams of shape (k, n), counts of
+        shape (k,)), sorted by descending count
+    """
+    vocab_size = max(len(corpus.vocab), 1)
+    if vocab_size ** n >= 2 ** 63:
+        raise ValueError(f"{n}-grams over {vocab_size} signs do not fit an int64 key")
+    tokens = np.asarray(corpus.tokens, dtype=np.int64)
+    starts = _valid_starts(corpus, n)
+    keys = np.zeros(len(starts), dtype=np.int64)
+    for k in range(n):
+        keys = keys * vocab_size + tokens[starts + k]
+    unique, counts = np.unique(keys, return_counts=True)
+
+    ngrams = np.empty((len(unique), n), dtype=np.int64)
+    rest = unique
+    for k in range(n - 1, -1, -1):
+        ngrams[:, k] = rest % vocab_size
+        rest = rest // vocab_size
+    order = np.argsort(-counts, kind='stable')
+    return ngrams[order], counts[order]
+
+
+def cooccurrence_counts(corpus, window=2):
+    """
+    Count unordered sign pairs occurring within `window` positions on a line.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: (pairs of shape (k, 2) with
+        pairs[:, 0] <= pairs[:, 1], counts), sorted by descending count
+    """
+    vocab_size = len(corpus.vocab)
+    tokens = np.asarray(corpus.tokens, dtype=np.int64)
+    keys = []
+    for distance in range(1, window + 1):
+        starts = _valid_starts(corpus, distance + 1)
+        a = tokens[starts]
+        b = tokens[starts + distance]
+        keys.append(np.minimum(a, b) * vocab_size + np.maximum(a, b))
+    keys = np.concatenate(keys) if keys else np.zeros(0, dtype=np.int64)
+    unique, counts = np.unique(keys, return_counts=True)
+    pairs = np.stack([unique // vocab_size, unique % vocab_size], axis=1) if len(unique) else np.zeros((0, 2), dtype=np.int64)
+    order = np.argsort(-counts, kind='stable')
+    return pairs[order], counts[order]
+
+
+def period_distribution(corpus):
+    """
+    Sign counts per period.
+
+    Returns:
+        np.ndarray: int64 matrix of shape (len(periods), len(vocab))
+    """
+    vocab_size = len(corpus.vocab)
+    num_periods = max(len(corpus.periods), 1)
+    token_periods = np.asarray(corpus.tablet_periods, dtype=np.int64)[corpus.tablet_ids()]
+    keys = token_periods * vocab_size + np.asarray(corpus.tokens, dtype=np.int64)
+    counts = np.bincount(keys, minlength=num_periods * vocab_size)
+    return counts.reshape(num_periods, vocab_size)
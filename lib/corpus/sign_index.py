@@ -0,0 +1,398 @@
+"""
+Corpus-wide inverted index of ATF signs.
+
+Signs are interned to integer ids. Each sign owns one postings blob of
+delta/varint-compressed (tablet, surface, line, position) entries, laid out
+in two levels so doc-level intersections never touch position data:
+
+    varint n_docs
+    n_docs x varint doc id delta
+    n_docs x varint byte length of the doc's position block
+    position blocks: varint n_occ, then per occurrence
+        varint surface, varint line delta, varint position (delta on the same line)
+
+New tablets always get larger doc ids than existing ones, so incremental
+updates only append to the blobs of the signs they touch. Changed or removed
+files are tombstoned and dropped on compaction.
+"""
+
+import fnmatch
+import json
+import os
+
+from .atf_reader import SURFACES, iter_atf_files, iter_tablets, normalize_sign, parse_tablet
+
+INDEX_VERSION = 1
+META_FILE = 'meta.json'
+POSTINGS_FILE = 'postings.bin'
+# Compact automatically once this fraction of doc ids is tombstoned
+COMPACT_RATIO = 0.25
+
+ANY = None  # a bare `*` in a sequence query matches any single sign
+
+
+def encode_varint(value, out):
+    """Append an unsigned LEB128 varint to a bytearray."""
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def decode_varint(buf, pos):
+    """Decode one varint at `pos`. Returns (value, next_pos)."""
+    result = 0
+    shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def encode_block(occurrences):
+    """Encode the sorted (surface, line, pos) occurrences of one sign in one doc."""
+    out = bytearray()
+    encode_varint(len(occurrences), out)
+    prev_line, prev_pos = 0, 0
+    for surface, line, pos in occurrences:
+        encode_varint(surface, out)
+        encode_varint(line - prev_line, out)
+        encode_varint(pos - prev_pos if line == prev_line else pos, out)
+        prev_line, prev_pos = line, pos
+    return bytes(out)
+
+
+def decode_block(buf, pos=0):
+    """Inverse of encode_block()."""
+    count, pos = decode_varint(buf, pos)
+    occurrences = []
+    line, prev_pos = 0, 0
+    for _ in range(count):
+        surface, pos = decode_varint(buf, pos)
+        delta, pos = decode_varint(buf, pos)
+        value, pos = decode_varint(buf, pos)
+        if delta:
+            line += delta
+            prev_pos = value
+        else:
+            prev_pos += value
+        occurrences.append((surface, line, prev_pos))
+    return occurrences
+
+
+def encode_postings(doc_ids, blocks):
+    """Encode a full postings blob from sorted doc ids and their position blocks."""
+    out = bytearray()
+    encode_varint(len(doc_ids), out)
+    prev = 0
+    for doc in doc_ids:
+        encode_varint(doc - prev, out)
+        prev = doc
+    for block in blocks:
+        encode_varint(len(block), out)
+    for block in blocks:
+        out += block
+    return bytes(out)
+
+
+def decode_doc_list(blob):
+    """
+    Decode only the doc level of a postings blob.
+
+    Returns:
+        tuple[list[int], list[int]]: doc ids and the start offset of each
+        doc's position block within the blob
+    """
+    if not blob:
+        return [], []
+    count, pos = decode_varint(blob, 0)
+    doc_ids = []
+    doc = 0
+    for _ in range(count):
+        delta, pos = decode_varint(blob, pos)
+        doc += delta
+        doc_ids.append(doc)
+    lengths = []
+    for _ in range(count):
+        length, pos = decode_varint(blob, pos)
+        lengths.append(length)
+    offsets = []
+    for length in lengths:
+        offsets.append(pos)
+        pos += length
+    return doc_ids, offsets
+
+
+def split_blocks(blob, offsets):
+    """Slice the raw position blocks out of a blob."""
+    ends = offsets[1:] + [len(blob)]
+    return [blob[start:end] for start, end in zip(offsets, ends)]
+
+
+class SignIndex:
+    """Inverted index over ATF signs with incremental updates."""
+
+    def __init__(self):
+        self.signs = []          # sign id -> sign
+        self.sign_ids = {}       # sign -> sign id
+        self.postings = []       # sign id -> encoded blob
+        self.docs = []           # doc id -> [tablet name, file id, byte offset]
+        self.file_paths = []     # file id -> path
+        self.files = {}          # path -> {'id', 'mtime', 'size', 'docs'}
+        self.deleted = set()     # tombstoned doc ids
+        self._pending = {}       # sign id -> [(doc id, block bytes)]
+        self._doc_cache = {}     # sign id -> (doc ids, {doc id: block offset})
+
+    # ------------------------------------------------------------------
+    # Building
+    # ------------------------------------------------------------------
+    def intern(self, sign):
+        """Return the integer id of a sign, adding it to the vocabulary if new."""
+        sign_id = self.sign_ids.get(sign)
+        if sign_id is None:
+            sign_id = len(self.signs)
+            self.signs.append(sign)
+            self.sign_ids[sign] = sign_id
+            self.postings.append(b'')
+        return sign_id
+
+    def add_tablet(self, name, file_id, offset, atf_text):
+        """Index one tablet and return its doc id."""
+        doc = len(self.docs)
+        self.docs.append([name, file_id, offset])
+        occurrences = {}
+        for line, (surface, label, signs) in enumerate(parse_tablet(atf_text)):
+            surface_id = SURFACES.index(surface)
+            for pos, sign in enumerate(signs):
+                occurrences.setdefault(self.intern(sign), []).append((surface_id, line, pos))
+        for sign_id, occ in occurrences.items():
+            self._pending.setdefault(sign_id, []).append((doc, encode_block(occ)))
+        return doc
+
+    def _flush(self):
+        """Merge pending postings into the encoded blobs."""
+        for sign_id, new in self._pending.items():
+            doc_ids, offsets = decode_doc_list(self.postings[sign_id])
+            blocks = split_blocks(self.postings[sign_id], offsets)
+            for doc, block in new:
+                doc_ids.append(doc)
+                blocks.append(block)
+            self.postings[sign_id] = encode_postings(doc_ids, blocks)
+        self._pending = {}
+        self._doc_cache = {}
+
+    def update(self, sources):
+        """
+        Incrementally (re)index `.atf` files from files and/or directories.
+
+        Unchanged files (same mtime and size) are skipped; changed files are
+        tombstoned and re-added; indexed files that no longer exist are
+        tombstoned and forgotten, so a restored file is indexed again even if
+        its mtime and size match the old entry.
+
+        Returns:
+            tuple[int, int]: (tablets added, tablets removed)
+        """
+        added = removed = 0
+        for path in iter_atf_files(sources):
+            path = os.path.normpath(path)
+            stat = os.stat(path)
+            entry = self.files.get(path)
+            if entry and entry['mtime'] == stat.st_mtime and entry['size'] == stat.st_size:
+                continue
+            if entry:
+                self.deleted.update(entry['docs'])
+                removed += len(entry['docs'])
+                file_id = entry['id']
+            else:
+                file_id = len(self.file_paths)
+                self.file_paths.append(path)
+            docs = []
+            for name, offset, text in iter_tablets(path):
+                docs.append(self.add_tablet(name, file_id, offset, text))
+            self.files[path] = {'id': file_id, 'mtime': stat.st_mtime, 'size': stat.st_size, 'docs': docs}
+            added += len(docs)
+
+        for path in [path for path in self.files if not os.path.exists(path)]:
+            entry = self.files.pop(path)
+            self.deleted.update(entry['docs'])
+            removed += len(entry['docs'])
+
+        self._flush()
+        if self.docs and len(self.deleted) > COMPACT_RATIO * len(self.docs):
+            self.compact()
+        return added, removed
+
+    def compact(self):
+        """Drop tombstoned docs from every postings blob."""
+        if not self.deleted:
+            return
+        for sign_id, blob in enumerate(self.postings):
+            doc_ids, offsets = decode_doc_list(blob)
+            if not any(doc in self.deleted for doc in doc_ids):
+                continue
+            blocks = split_blocks(blob, offsets)
+            kept = [(doc, block) for doc, block in zip(doc_ids, blocks) if doc not in self.deleted]
+            self.postings[sign_id] = encode_postings([d for d, _ in kept], [b for _, b in kept])
+        self.deleted = set()
+        self._doc_cache = {}
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+    def save(self, index_dir):
+        """Write the index to `index_dir` (meta.json + postings.bin)."""
+        os.makedirs(index_dir, exist_ok=True)
+        offsets = []
+        with open(os.path.join(index_dir, POSTINGS_FILE), 'wb') as f:
+            pos = 0
+            for blob in self.postings:
+                f.write(blob)
+                offsets.append(pos)
+                pos += len(blob)
+            offsets.append(pos)
+        meta = {
+            'version': INDEX_VERSION,
+            'signs': self.signs,
+            'offsets': offsets,
+            'docs': self.docs,
+            'file_paths': self.file_paths,
+            'files': self.files,
+            'deleted': sorted(self.deleted),
+        }
+        with open(os.path.join(index_dir, META_FILE), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, index_dir):
+        """Load an index written by save(). Returns an empty index if none exists."""
+        index = cls()
+        meta_path = os.path.join(index_dir, META_FILE)
+        if not os.path.exists(meta_path):
+            return index
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('version') != INDEX_VERSION:
+            raise ValueError(f"Unsupported sign index version {meta.get('version')} in {index_dir}")
+        with open(os.path.join(index_dir, POSTINGS_FILE), 'rb') as f:
+            data = f.read()
+        offsets = meta['offsets']
+        index.signs = meta['signs']
+        index.sign_ids = {sign: i for i, sign in enumerate(index.signs)}
+        index.postings = [data[offsets[i]:offsets[i + 1]] for i in range(len(index.signs))]
+        index.docs = meta['docs']
+        index.file_paths = meta['file_paths']
+        index.files = meta['files']
+        index.deleted = set(meta['deleted'])
+        return index
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    def _doc_list(self, sign_id):
+        """Decoded doc level of a sign: (doc ids, {doc id: block offset})."""
+        cached = self._doc_cache.get(sign_id)
+        if cached is None:
+            doc_ids, offsets = decode_doc_list(self.postings[sign_id])
+            cached = (doc_ids, dict(zip(doc_ids, offsets)))
+            self._doc_cache[sign_id] = cached
+        return cached
+
+    def _occurrences(self, sign_ids, doc):
+        """Sorted (surface, line, pos) of any of `sign_ids` in one doc."""
+        result = []
+        for sign_id in sign_ids:
+            offset = self._doc_list(sign_id)[1].get(doc)
+            if offset is not None:
+                result.extend(decode_block(self.postings[sign_id], offset))
+        if len(sign_ids) > 1:
+            result.sort()
+        return result
+
+    def expand(self, term):
+        """
+        Resolve a query term to a list of sign ids.
+
+        Terms containing `*`, `?` or `[` are glob patterns over the
+        vocabulary; anything else is normalized like indexed signs.
+        """
+        if any(ch in term for ch in '*?['):
+            pattern = term.lower()
+            return [self.sign_ids[s] for s in fnmatch.filter(self.signs, pattern)]
+        sign = normalize_sign(term)
+        return [self.sign_ids[sign]] if sign in self.sign_ids else []
+
+    def search(self, query, limit=None):
+        """
+        Find a sign, wildcard pattern or sequence of signs on a single line.
+
+        Args:
+            query (str): Whitespace-separated terms; a bare `*` matches any
+                single sign between two others (e.g. "|giszxdin| * lugal")
+            limit (int): Optional maximum number of hits
+
+        Returns:
+            list[tuple[int, int, int, int]]: (doc, surface, line, position)
+            of the first sign of every match, in corpus order
+
+        Raises:
+            ValueError: If the query starts or ends with a bare `*`; only
+                signs are indexed, not line ends, so the wildcard must be
+                bounded by a sign on both sides
+        """
+        terms = query.split()
+        if not terms:
+            return []
+        if terms[0] == '*' or terms[-1] == '*':
+            raise ValueError(f"A bare * must have a sign on both sides: {query!r}")
+        elements = [(i, ANY if term == '*' else self.expand(term)) for i, term in enumerate(terms)]
+        elements = [(i, ids) for i, ids in elements if ids is not ANY]
+        if any(not ids for _, ids in elements):
+            return []
+
+        # Doc-level intersection, rarest element first
+        doc_sets = []
+        for i, ids in elements:
+            docs = set()
+            for sign_id in ids:
+                docs.update(self._doc_list(sign_id)[0])
+            doc_sets.append((len(docs), i, ids, docs))
+        doc_sets.sort(key=lambda item: item[0])
+        candidates = doc_sets[0][3] - self.deleted
+        for _, _, _, docs in doc_sets[1:]:
+            candidates &= docs
+            if not candidates:
+                return []
+
+        # Position-level check anchored on the rarest element, decoded
+        # lazily per doc so `limit` stops early
+        _, anchor_offset, anchor_ids, _ = doc_sets[0]
+        others = [(i, ids) for _, i, ids, _ in doc_sets[1:]]
+        hits = []
+        for doc in sorted(candidates):
+            other_occ = [(i, set(self._occurrences(ids, doc))) for i, ids in others]
+            for surface, line, pos in self._occurrences(anchor_ids, doc):
+                start = pos - anchor_offset
+                if start < 0:
+                    continue
+                if all((surface, line, start + i) in occ for i, occ in other_occ):
+                    hits.append((doc, surface, line, start))
+                    if limit is not None and len(hits) >= limit:
+                        return hits
+        return hits
+
+    def describe(self, hit):
+        """Human-readable location of a search hit."""
+        doc, surface, line, pos = hit
+        name, file_id, offset = self.docs[doc]
+        return {
+            'tablet': name,
+            'path': self.file_paths[file_id],
+            'offset': offset,
+            'surface': SURFACES[surface],
+            'line': line,
+            'position': pos,
+        }
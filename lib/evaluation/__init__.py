@@ -0,0 +1,14 @@
+"""
+OCR evaluation: ATF normalization, vectorized edit distance and error rates.
+"""
+
+from .ocr_metrics import normalize_atf, edit_distance, distance_matrix, align, score_pair, evaluate
+
+__all__ = [
+    'normalize_atf',
+    'edit_distance',
+    'distance_matrix',
+    'align',
+    'score_pair',
+    'evaluate'
+]
@@ -0,0 +1,203 @@
+"""
+OCR scoring of predicted against gold ATF.
+
+Both sides are normalized with the corpus ATF parser (numbered lines only,
+breakage brackets and flags removed, case-folded signs), so formatting
+differences do not count as errors. Metrics:
+
+- sign error rate (SER): sign-level edit distance over the whole text,
+  divided by the number of gold signs
+- line error rate (LER): edit distance over lines, a line counting as
+  correct only if all of its signs match, divided by the number of gold lines
+- confusion counts of aligned (gold, predicted) signs, with `<del>` and
+  `<ins>` for deletions and insertions
+
+Edit distances are computed one DP row at a time with NumPy: a row's
+substitution/deletion candidates are elementwise, and the insertion chain
+along the row is a running minimum of `candidate - j` (plus `j`).
+"""
+
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from corpus.atf_reader import parse_tablet, tokenize_line
+
+DELETION = '<del>'
+INSERTION = '<ins>'
+MIN_CHUNK = 16
+
+
+def normalize_atf(text):
+    """
+    Normalized lines of an ATF text.
+
+    Numbered lines are used when there are any; otherwise (model output
+    without line numbers) every non-structure line counts.
+
+    Returns:
+        list[list[str]]: Signs per line
+    """
+    lines = [signs for _, _, signs in parse_tablet(text)]
+    if lines:
+        return lines
+    fallback = []
+    for raw in text.split('\n'):
+        line = raw.strip()
+        if line and not line.startswith(('@', '$', '#', '&', '>>')):
+            signs = tokenize_line(line)
+            if signs:
+                fallback.append(signs)
+    return fallback
+
+
+def distance_matrix(a, b):
+    """
+    Levenshtein DP matrix of two integer sequences.
+
+    Returns:
+        np.ndarray: (len(a) + 1, len(b) + 1) int32; the distance is the
+        bottom-right entry
+    """
+    a, b = np.asarray(a), np.asarray(b)
+    cols = np.arange(len(b) + 1, dtype=np.int32)
+    matrix = np.empty((len(a) + 1, len(b) + 1), dtype=np.int32)
+    matrix[0] = cols
+    candidate = np.empty(len(b) + 1, dtype=np.int32)
+    for i in range(1, len(a) + 1):
+        previous = matrix[i - 1]
+        candidate[0] = i
+        np.minimum(previous[1:] + 1, previous[:-1] + (b != a[i - 1]), out=candidate[1:])
+        matrix[i] = np.minimum.accumulate(candidate - cols) + cols
+    return matrix
+
+
+def edit_distance(a, b):
+    """Levenshtein distance of two integer sequences, keeping only two DP rows."""
+    a, b = np.asarray(a), np.asarray(b)
+    if len(a) < len(b):
+        a, b = b, a
+    cols = np.arange(len(b) + 1, dtype=np.int32)
+    row = cols.copy()
+    candidate = np.empty(len(b) + 1, dtype=np.int32)
+    for i in range(1, len(a) + 1):
+        candidate[0] = i
+        np.minimum(row[1:] + 1, row[:-1] + (b != a[i - 1]), out=candidate[1:])
+        row = np.minimum.accumulate(candidate - cols) + cols
+    return int(row[-1])
+
+
+def align(a, b):
+    """
+    Minimum-edit alignment of two integer sequences.
+
+    Returns:
+        list[tuple[int | None, int | None]]: (index in a, index in b) pairs in
+        order; None marks a deletion (b side) or insertion (a side)
+    """
+    a, b = np.asarray(a), np.asarray(b)
+    matrix = distance_matrix(a, b)
+    i, j = len(a), len(b)
+    pairs = []
+    while i > 0 or j > 0:
+        if i > 0 and j > 0 and matrix[i, j] == matrix[i - 1, j - 1] + (a[i - 1] != b[j - 1]):
+            i, j = i - 1, j - 1
+            pairs.append((i, j))
+        elif i > 0 and matrix[i, j] == matrix[i - 1, j] + 1:
+            i -= 1
+            pairs.append((i, None))
+        else:
+            j -= 1
+            pairs.append((None, j))
+    pairs.reverse()
+    return pairs
+
+
+def _encode(items, ids):
+    return np.array([ids.setdefault(item, len(ids)) for item in items], dtype=np.int64)
+
+
+def score_pair(prediction, gold):
+    """
+    Scores of one predicted ATF text against its gold text.
+
+    Returns:
+        dict: gold_signs, pred_signs, substitutions, deletions, insertions,
+        sign_errors, gold_lines, pred_lines, line_errors and confusion
+        (Counter of (gold sign, predicted sign) for every aligned pair that
+        is not a match)
+    """
+    gold_lines, pred_lines = normalize_atf(gold), normalize_atf(prediction)
+    gold_signs = [sign for line in gold_lines for sign in line]
+    pred_signs = [sign for line in pred_lines for sign in line]
+
+    ids = {}
+    gold_ids, pred_ids = _encode(gold_signs, ids), _encode(pred_signs, ids)
+    confusion = Counter()
+    substitutions = deletions = insertions = 0
+    for g, p in align(gold_ids, pred_ids):
+        if p is None:
+            deletions += 1
+            confusion[(gold_signs[g], DELETION)] += 1
+        elif g is None:
+            insertions += 1
+            confusion[(INSERTION, pred_signs[p])] += 1
+        elif gold_ids[g] != pred_ids[p]:
+            substitutions += 1
+            confusion[(gold_signs[g], pred_signs[p])] += 1
+
+    line_ids = {}
+    line_errors = edit_distance(_encode(map(tuple, gold_lines), line_ids), _encode(map(tuple, pred_lines), line_ids))
+    return {
+        'gold_signs': len(gold_signs), 'pred_signs': len(pred_signs),
+        'substitutions': substitutions, 'deletions': deletions, 'insertions': insertions,
+        'sign_errors': substitutions + deletions + insertions,
+        'gold_lines': len(gold_lines), 'pred_lines': len(pred_lines), 'line_errors': line_errors,
+        'confusion': confusion,
+    }
+
+
+def _score_job(job):
+    key, prediction, gold = job
+    return key, score_pair(prediction, gold)
+
+
+def _rate(errors, total):
+    return round(errors / total, 4) if total else None
+
+
+def evaluate(pairs, workers=None, top_confusions=100):
+    """
+    Score many (key, prediction, gold) triples in a process pool.
+
+    Returns:
+        dict: 'summary' (totals, ser, ler), 'samples' (per-key scores and
+        rates) and 'confusion' (most frequent errors as {gold, pred, count})
+    """
+    pairs = list(pairs)
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(pairs) > MIN_CHUNK:
+        chunksize = max(1, len(pairs) // (4 * workers))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_score_job, pairs, chunksize=chunksize))
+    else:
+        results = [_score_job(job) for job in pairs]
+
+    totals = Counter()
+    confusion = Counter()
+    samples = []
+    for key, scores in results:
+        confusion.update(scores.pop('confusion'))
+        totals.update(scores)
+        samples.append(dict(scores, key=key, ser=_rate(scores['sign_errors'], scores['gold_signs']),
+                            ler=_rate(scores['line_errors'], scores['gold_lines'])))
+    summary = dict(totals, samples=len(results), ser=_rate(totals['sign_errors'], totals['gold_signs']),
+                   ler=_rate(totals['line_errors'], totals['gold_lines']))
+    return {
+        'summary': summary,
+        'samples': samples,
+        'confusion': [{'gold': gold, 'pred': pred, 'count': count}
+                      for (gold, pred), count in confusion.most_common(top_confusions)],
+    }
@@ -0,0 +1,39 @@
+"""
+Tablet image processing: perceptual hashing, near-duplicate index,
+memory-mapped preprocessed image store, face segmentation, text-line
+detection and synthetic line rendering.
+"""
+
+from .perceptual_hash import dhash, phash, hash_image, hash_bytes, hash_file, hash_files, popcount64
+from .hash_index import ImageHashIndex
+from .image_store import ImageStore, build_image_store, open_image_store, load_pixels, normalize
+from .face_segmentation import Face, segment_image, segment_files, segment_cached
+from .line_detection import detect_lines, estimate_line_counts, find_bands, text_profile
+from .synthetic_lines import GlyphCache, render_line, generate as generate_synthetic_lines
+
+__all__ = [
+    'dhash',
+    'phash',
+    'hash_image',
+    'hash_bytes',
+    'hash_file',
+    'hash_files',
+    'popcount64',
+    'ImageHashIndex',
+    'ImageStore',
+    'build_image_store',
+    'open_image_store',
+    'load_pixels',
+    'normalize',
+    'Face',
+    'segment_image',
+    'segment_files',
+    'segment_cached',
+    'detect_lines',
+    'estimate_line_counts',
+    'find_bands',
+    'text_profile',
+    'GlyphCache',
+    'render_line',
+    'generate_synthetic_lines'
+]
@@ -0,0 +1,292 @@
+"""
+Tablet face segmentation for CDLI "fatcross" photos.
+
+CDLI composites show the obverse with the reverse below it and the edges
+around them, on a flat (usually black) background. Faces are found on a
+downscaled grayscale copy with NumPy only:
+
+1. Otsu threshold, polarity chosen from the border (background) brightness
+2. Binary opening/closing with box filters to drop labels and noise
+3. Connected components by row-run union-find
+4. The largest components are assigned to surfaces by layout: a stacked
+   pair of similar size is obverse (top) / reverse (bottom); a lone large
+   component is a single face; smaller ones are edges
+"""
+
+import json
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+SEGMENT_CACHE_DIR = 'data/cache/faces/segments'
+ANALYSIS_SIZE = 384
+# Components smaller than this fraction of the frame are labels, rulers, dust
+MIN_AREA_FRACTION = 0.01
+# Second face must be at least this fraction of the largest to form a pair
+PAIR_AREA_RATIO = 0.3
+EDGE_AREA_RATIO = 0.05
+MORPH_RADIUS = 2
+LIGHT_BACKGROUND_MARGIN = 24
+
+Face = namedtuple('Face', ['surface', 'box', 'area'])
+Face.__doc__ = "One segmented tablet face: surface name, (left, top, right, bottom) box in image pixels, area fraction."
+
+
+def otsu_threshold(gray):
+    """Otsu threshold of a uint8 image (vectorized over all 256 candidates)."""
+    hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    total = hist.sum()
+    weight_bg = np.cumsum(hist)
+    weight_fg = total - weight_bg
+    cum_mean = np.cumsum(hist * np.arange(256))
+    mean_bg = cum_mean / np.maximum(weight_bg, 1)
+    mean_fg = (cum_mean[-1] - cum_mean) / np.maximum(weight_fg, 1)
+    between = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+    return int(np.argmax(between))
+
+
+def _box_sum(mask, radius):
+    """Sum of a binary mask over (2r+1)^2 windows via a 2D cumulative sum."""
+    size = 2 * radius + 1
+    padded = np.pad(mask.astype(np.int32), radius + 1)[:-1, :-1]
+    integral = padded.cumsum(0).cumsum(1)
+    return (integral[size:, size:] - integral[:-size, size:] - integral[size:, :-size] + integral[:-size, :-size])
+
+
+def dilate(mask, radius=MORPH_RADIUS):
+    return _box_sum(mask, radius) > 0
+
+
+def erode(mask, radius=MORPH_RADIUS):
+    return _box_sum(mask, radius) == (2 * radius + 1) ** 2
+
+
+def foreground_mask(gray):
+    """Tablet pixels of a uint8 grayscale image, cleaned with opening then closing."""
+    border = np.concatenate([gray[0], gray[-1], gray[:, 0], gray[:, -1]])
+    threshold = otsu_threshold(gray)
+    background = np.median(border)
+    if background <= threshold:
+        mask = gray > threshold
+    else:
+        # Light background (scanned plates): the tablet is anything visibly
+        # darker than the paper, which Otsu would split at its own shading
+        mask = gray < background - LIGHT_BACKGROUND_MARGIN
+    mask = dilate(erode(mask))
+    return erode(dilate(mask))
+
+
+def _row_runs(mask):
+    """Horizontal foreground runs: (row, start, end) arrays, ordered by row then start."""
+    height, width = mask.shape
+    padded = np.zeros((height, width + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    edges = np.diff(padded, axis=1)
+    rows, starts = np.nonzero(edges == 1)
+    _, ends = np.nonzero(edges == -1)
+    return rows, starts, ends
+
+
+def label_components(mask):
+    """
+    4-connected component labels of a binary mask.
+
+    Runs of foreground pixels are found per row with NumPy; runs on
+    adjacent rows that overlap are merged with union-find, which only
+    touches the (few thousand) runs instead of every pixel.
+
+    Returns:
+        tuple[np.ndarray, int]: (int32 labels with 0 = background, component count)
+    """
+    height, width = mask.shape
+    rows, starts, ends = _row_runs(mask)
+    if not len(rows):
+        return np.zeros(mask.shape, dtype=np.int32), 0
+
+    # Run b on row r overlaps runs a on row r - 1 with end_a > start_b and
+    # start_a < end_b; runs of a row are sorted, so these form a contiguous range.
+    stride = width + 1
+    start_keys = rows * stride + starts
+    end_keys = rows * stride + ends
+    lo = np.searchsorted(end_keys, (rows - 1) * stride + starts, side='right')
+    hi = np.searchsorted(start_keys, (rows - 1) * stride + ends, side='left')
+    counts = np.maximum(hi - lo, 0)
+    run_b = np.repeat(np.arange(len(rows)), counts)
+    run_a = np.repeat(lo - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+
+    parent = list(range(len(rows)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for a, b in zip(run_a.tolist(), run_b.tolist()):
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parent[max(root_a, root_b)] = min(root_a, root_b)
+    roots = np.array([find(i) for i in range(len(rows))])
+    _, run_labels = np.unique(roots, return_inverse=True)
+
+    labels = np.zeros(height * (width + 1), dtype=np.int32)
+    # Paint runs with a +label at their start and -label at their end, then cumsum per row
+    np.add.at(labels, rows * stride + starts, run_labels + 1)
+    np.add.at(labels, rows * stride + ends, -(run_labels + 1))
+    labels = labels.reshape(height, width + 1).cumsum(axis=1)[:, :width].astype(np.int32)
+    return labels, int(run_labels.max()) + 1
+
+
+def component_boxes(labels, count):
+    """(left, top, right, bottom, area) per component label 1..count."""
+    ys, xs = np.nonzero(labels)
+    ids = labels[ys, xs] - 1
+    boxes = np.empty((count, 5), dtype=np.int64)
+    boxes[:, 0] = np.full(count, labels.shape[1])
+    boxes[:, 1] = np.full(count, labels.shape[0])
+    boxes[:, 2:4] = -1
+    np.minimum.at(boxes[:, 0], ids, xs)
+    np.minimum.at(boxes[:, 1], ids, ys)
+    np.maximum.at(boxes[:, 2], ids, xs + 1)
+    np.maximum.at(boxes[:, 3], ids, ys + 1)
+    boxes[:, 4] = np.bincount(ids, minlength=count)
+    return boxes
+
+
+def _overlap(a0, a1, b0, b1):
+    return max(0, min(a1, b1) - max(a0, b0)) / max(1, min(a1 - a0, b1 - b0))
+
+
+def assign_surfaces(boxes, frame_area):
+    """
+    Name components by fatcross layout.
+
+    Returns:
+        tuple[str, list[tuple[str, box, float]]]: (layout, faces); layout is
+        'fatcross' (obverse/reverse pair found), 'single' or 'empty'
+    """
+    keep = boxes[boxes[:, 4] >= MIN_AREA_FRACTION * frame_area]
+    keep = keep[np.argsort(-keep[:, 4], kind='stable')]
+    if not len(keep):
+        return 'empty', []
+    main = keep[0]
+    faces = []
+    pair = None
+    for other in keep[1:]:
+        if other[4] < PAIR_AREA_RATIO * main[4]:
+            break
+        # Stacked vertically with overlapping columns
+        if _overlap(main[0], main[2], other[0], other[2]) > 0.5 and _overlap(main[1], main[3], other[1], other[3]) < 0.2:
+            pair = other
+            break
+    if pair is not None:
+        obverse, reverse = (main, pair) if main[1] <= pair[1] else (pair, main)
+        faces += [('obverse', obverse), ('reverse', reverse)]
+        layout = 'fatcross'
+    else:
+        obverse, reverse = main, None
+        faces.append(('obverse', main))
+        layout = 'single'
+
+    used = {tuple(box) for _, box in faces}
+    for box in keep:
+        if tuple(box) in used or box[4] < EDGE_AREA_RATIO * obverse[4]:
+            continue
+        center_x, center_y = (box[0] + box[2]) / 2, (box[1] + box[3]) / 2
+        if center_x < obverse[0]:
+            surface = 'left'
+        elif center_x > obverse[2]:
+            surface = 'right'
+        elif center_y < obverse[1]:
+            surface = 'top'
+        elif reverse is not None and obverse[3] <= center_y <= reverse[1]:
+            surface = 'bottom'
+        else:
+            surface = 'other'
+        faces.append((surface, box))
+    return layout, [(surface, box, float(box[4]) / frame_area) for surface, box in faces]
+
+
+def segment_image(image, analysis_size=ANALYSIS_SIZE):
+    """
+    Segment the faces of a PIL image.
+
+    Returns:
+        tuple[str, list[Face]]: (layout, faces) with boxes in full-resolution pixels
+    """
+    width, height = image.size
+    small = image.convert('L')
+    small.thumbnail((analysis_size, analysis_size), Image.BILINEAR)
+    gray = np.asarray(small, dtype=np.uint8)
+    labels, count = label_components(foreground_mask(gray))
+    scale_x, scale_y = width / gray.shape[1], height / gray.shape[0]
+    layout, named = assign_surfaces(component_boxes(labels, count), gray.size)
+    faces = []
+    for surface, box, area in named:
+        full_box = (int(box[0] * scale_x), int(box[1] * scale_y),
+                    min(width, int(np.ceil(box[2] * scale_x))), min(height, int(np.ceil(box[3] * scale_y))))
+        faces.append(Face(surface, full_box, area))
+    return layout, faces
+
+
+def segment_file(path):
+    """Worker: (path, layout, faces as dicts) or (path, None, []) if unreadable."""
+    try:
+        with Image.open(path) as image:
+            image.draft('RGB', (ANALYSIS_SIZE * 2, ANALYSIS_SIZE * 2))
+            size = image.size
+            layout, faces = segment_image(image)
+        # draft() may have decoded at reduced scale; boxes are stored as fractions
+        return path, layout, [{'surface': f.surface, 'box': [f.box[0] / size[0], f.box[1] / size[1],
+                                                             f.box[2] / size[0], f.box[3] / size[1]],
+                               'area': round(f.area, 4)} for f in faces]
+    except (OSError, ValueError):
+        return path, None, []
+
+
+def segment_files(paths, workers=None):
+    """Segment many images in a process pool, yielding segment_file() results."""
+    if not paths:
+        return
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        yield from pool.map(segment_file, paths, chunksize=4)
+
+
+def _stat(path):
+    stat = os.stat(path)
+    return [stat.st_mtime, stat.st_size]
+
+
+def segment_cached(paths, cache_dir=SEGMENT_CACHE_DIR, workers=None):
+    """
+    Segment images, reusing per-image JSON results whose image is unchanged.
+
+    Returns:
+        dict[str, dict]: path -> {'layout', 'faces'} with boxes as fractions
+        of the image size; unreadable images are left out
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    results, todo = {}, []
+    for path in paths:
+        cache_file = os.path.join(cache_dir, os.path.splitext(os.path.basename(path))[0] + '.json')
+        if os.path.exists(cache_file):
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if cached.get('stat') == _stat(path):
+                results[path] = cached
+                continue
+        todo.append(path)
+
+    for path, layout, faces in segment_files(todo, workers):
+        if layout is None:
+            print(f"Skipping unreadable image: {path}")
+            continue
+        entry = {'stat': _stat(path), 'layout': layout, 'faces': faces}
+        cache_file = os.path.join(cache_dir, os.path.splitext(os.path.basename(path))[0] + '.json')
+        with open(cache_file, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        results[path] = entry
+    return results
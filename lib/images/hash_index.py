@@ -0,0 +1,219 @@
+"""
+Hamming-distance index over perceptual image hashes.
+
+Near-duplicate search uses multi-index bucketing: 64-bit hashes are split
+into `max_distance + 1` bit bands, and by the pigeonhole principle any two
+hashes within `max_distance` bits agree exactly on at least one band. Only
+hashes sharing a band value are compared (vectorized XOR + popcount).
+"""
+
+import os
+
+import numpy as np
+
+from .perceptual_hash import hash_bytes, hash_files, popcount64
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+# pHash bits for listing candidates to review. On the bundled photos JPEG
+# re-encodes stay within 2 bits and half-size resizes within 4, but slight
+# crops or rotations reach 8-14 while the closest distinct tablets are 12
+# apart (dHash: 3), so a match at this distance is not proof of a duplicate
+DEFAULT_MAX_DISTANCE = 6
+# Re-encodes/resizes of the same photo; the only distance safe to act on unreviewed
+EXACT_MAX_DISTANCE = 2
+HASH_KINDS = ('phash', 'dhash')
+BLOCK_ROWS = 1024
+
+
+def _band_slices(max_distance):
+    """Split 64 bits into max_distance + 1 contiguous (shift, mask) bands."""
+    bands = max_distance + 1
+    if bands > 64:
+        raise ValueError(f"max_distance must be < 64, got {max_distance}")
+    sizes = [64 // bands + (1 if i < 64 % bands else 0) for i in range(bands)]
+    slices = []
+    shift = 0
+    for size in sizes:
+        slices.append((np.uint64(shift), np.uint64((1 << size) - 1)))
+        shift += size
+    return slices
+
+
+class ImageHashIndex:
+    """Perceptual hashes of a set of images, keyed by path."""
+
+    def __init__(self):
+        self.paths = []
+        self.dhashes = np.zeros(0, dtype=np.uint64)
+        self.phashes = np.zeros(0, dtype=np.uint64)
+        self.mtimes = np.zeros(0, dtype=np.float64)
+        self.sizes = np.zeros(0, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.paths)
+
+    def hashes(self, kind='phash'):
+        if kind not in HASH_KINDS:
+            raise ValueError(f"Unknown hash kind {kind}, expected one of {HASH_KINDS}")
+        return self.phashes if kind == 'phash' else self.dhashes
+
+    # ------------------------------------------------------------------
+    # Building
+    # ------------------------------------------------------------------
+    def add(self, path, dhash_value, phash_value, mtime=0.0, size=0):
+        """Add (or replace) one image's hashes."""
+        if path in self.paths:
+            i = self.paths.index(path)
+            self.dhashes[i], self.phashes[i] = dhash_value, phash_value
+            self.mtimes[i], self.sizes[i] = mtime, size
+            return
+        self.paths.append(path)
+        self.dhashes = np.append(self.dhashes, np.uint64(dhash_value))
+        self.phashes = np.append(self.phashes, np.uint64(phash_value))
+        self.mtimes = np.append(self.mtimes, mtime)
+        self.sizes = np.append(self.sizes, size)
+
+    def update(self, image_dir, workers=None):
+        """
+        Hash new or changed images of a directory in a process pool.
+
+        Returns:
+            int: Number of images (re)hashed
+        """
+        known = {path: i for i, path in enumerate(self.paths)}
+        todo = []
+        stats = {}
+        for name in sorted(os.listdir(image_dir)):
+            if not name.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            path = os.path.join(image_dir, name)
+            stat = os.stat(path)
+            stats[path] = (stat.st_mtime, stat.st_size)
+            i = known.get(path)
+            if i is None or self.mtimes[i] != stat.st_mtime or self.sizes[i] != stat.st_size:
+                todo.append(path)
+
+        new_paths, new_d, new_p = [], [], []
+        for path, d, p in hash_files(todo, workers=workers):
+            if d is None:
+                print(f"Skipping unreadable image: {path}")
+                continue
+            if path in known:
+                i = known[path]
+                self.dhashes[i], self.phashes[i] = d, p
+                self.mtimes[i], self.sizes[i] = stats[path]
+            else:
+                new_paths.append(path)
+                new_d.append(d)
+                new_p.append(p)
+        if new_paths:
+            self.paths.extend(new_paths)
+            self.dhashes = np.concatenate([self.dhashes, np.array(new_d, dtype=np.uint64)])
+            self.phashes = np.concatenate([self.phashes, np.array(new_p, dtype=np.uint64)])
+            self.mtimes = np.concatenate([self.mtimes, [stats[p][0] for p in new_paths]])
+            self.sizes = np.concatenate([self.sizes, np.array([stats[p][1] for p in new_paths], dtype=np.int64)])
+
+        # Forget images deleted from disk
+        keep = [i for i, path in enumerate(self.paths) if os.path.exists(path)]
+        if len(keep) != len(self.paths):
+            self.paths = [self.paths[i] for i in keep]
+            self.dhashes, self.phashes = self.dhashes[keep], self.phashes[keep]
+            self.mtimes, self.sizes = self.mtimes[keep], self.sizes[keep]
+        return len(todo)
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'wb') as f:
+            np.savez(f, paths=np.array(self.paths, dtype=str), dhashes=self.dhashes,
+                     phashes=self.phashes, mtimes=self.mtimes, sizes=self.sizes)
+
+    @classmethod
+    def load(cls, path):
+        """Load an index written by save(); returns an empty index if missing."""
+        index = cls()
+        if not os.path.exists(path):
+            return index
+        with np.load(path) as data:
+            index.paths = [str(p) for p in data['paths']]
+            index.dhashes = data['dhashes'].astype(np.uint64)
+            index.phashes = data['phashes'].astype(np.uint64)
+            index.mtimes = data['mtimes']
+            index.sizes = data['sizes']
+        return index
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    def query(self, hash_value, max_distance=DEFAULT_MAX_DISTANCE, kind='phash'):
+        """
+        Images within `max_distance` bits of a hash.
+
+        Returns:
+            list[tuple[str, int]]: (path, distance), closest first
+        """
+        hashes = self.hashes(kind)
+        if not len(hashes):
+            return []
+        distances = popcount64(hashes ^ np.uint64(hash_value))
+        matches = np.flatnonzero(distances <= max_distance)
+        matches = matches[np.argsort(distances[matches], kind='stable')]
+        return [(self.paths[i], int(distances[i])) for i in matches]
+
+    def query_bytes(self, data, max_distance=DEFAULT_MAX_DISTANCE, kind='phash'):
+        """query() for encoded image bytes, e.g. a fresh download."""
+        d, p = hash_bytes(data)
+        return self.query(p if kind == 'phash' else d, max_distance, kind)
+
+    def near_duplicate_pairs(self, max_distance=DEFAULT_MAX_DISTANCE, kind='phash'):
+        """
+        All pairs of images within `max_distance` bits, via band bucketing.
+
+        Returns:
+            list[tuple[int, int, int]]: (i, j, distance) with i < j
+        """
+        hashes = self.hashes(kind)
+        found = set()
+        pairs = []
+        for shift, mask in _band_slices(max_distance):
+            values = (hashes >> shift) & mask
+            order = np.argsort(values, kind='stable')
+            sorted_values = values[order]
+            boundaries = np.flatnonzero(np.diff(sorted_values)) + 1
+            for group in np.split(order, boundaries):
+                if len(group) < 2:
+                    continue
+                group_hashes = hashes[group]
+                # Row blocks bound memory for large buckets (e.g. dark, featureless photos)
+                for start in range(0, len(group), BLOCK_ROWS):
+                    block = group[start:start + BLOCK_ROWS]
+                    distances = popcount64(group_hashes[start:start + BLOCK_ROWS, None] ^ group_hashes[None, :])
+                    rows, cols = np.nonzero(distances <= max_distance)
+                    for r, c in zip(rows, cols):
+                        i, j = int(block[r]), int(group[c])
+                        if i < j and (i, j) not in found:
+                            found.add((i, j))
+                            pairs.append((i, j, int(distances[r, c])))
+        pairs.sort()
+        return pairs
+
+    def duplicate_clusters(self, max_distance=DEFAULT_MAX_DISTANCE, kind='phash'):
+        """Group near-duplicate images with union-find. Returns lists of paths."""
+        parent = list(range(len(self.paths)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for i, j, distance in self.near_duplicate_pairs(max_distance, kind):
+            root_i, root_j = find(i), find(j)
+            if root_i != root_j:
+                parent[max(root_i, root_j)] = min(root_i, root_j)
+        groups = {}
+        for i in range(len(self.paths)):
+            groups.setdefault(find(i), []).append(self.paths[i])
+        return [paths for paths in groups.values() if len(paths) > 1]
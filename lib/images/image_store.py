@@ -0,0 +1,156 @@
+"""
+Memory-mapped store of preprocessed tablet images.
+
+All images are decoded once, resized (shortest edge) and center-cropped to
+the model's input resolution, and written into a single `uint8` array of
+shape (N, size, size, 3). The data loader slices it by P-number with zero
+copies and only normalizes to float at collation time.
+
+Layout of a store directory:
+
+    images.npy    uint8 (N, size, size, 3), opened with mmap_mode='r'
+    index.json    {'size', 'keys', 'paths', 'stats'}
+"""
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+STORE_DIR = 'data/cache/image_store'
+DEFAULT_SIZE = 224  # CLIP ViT-L/14 input resolution used by train.py
+# CLIPImageProcessor normalization constants
+CLIP_MEAN = (0.48145466, 0.4578275, 0.40821073)
+CLIP_STD = (0.26862954, 0.26130258, 0.27577711)
+
+
+def resize_and_crop(image, size=DEFAULT_SIZE):
+    """Resize the shortest edge to `size` (bicubic) and center-crop to size x size, like CLIPImageProcessor."""
+    image = image.convert('RGB')
+    width, height = image.size
+    scale = size / min(width, height)
+    new_w, new_h = max(size, round(width * scale)), max(size, round(height * scale))
+    # JPEG draft mode lets libjpeg decode at a reduced scale first
+    image.draft('RGB', (new_w, new_h))
+    image = image.resize((new_w, new_h), Image.BICUBIC)
+    left, top = (new_w - size) // 2, (new_h - size) // 2
+    return np.asarray(image.crop((left, top, left + size, top + size)), dtype=np.uint8)
+
+
+def load_pixels(path, size=DEFAULT_SIZE):
+    """Decode one image file into a (size, size, 3) uint8 array."""
+    with Image.open(path) as image:
+        image.draft('RGB', (size * 2, size * 2))
+        return resize_and_crop(image, size)
+
+
+def normalize(batch, mean=CLIP_MEAN, std=CLIP_STD):
+    """uint8 (B, H, W, 3) -> float32 (B, 3, H, W) normalized like the image processor."""
+    pixels = np.asarray(batch, dtype=np.float32) * (1.0 / 255.0)
+    pixels = (pixels - np.asarray(mean, dtype=np.float32)) / np.asarray(std, dtype=np.float32)
+    return np.ascontiguousarray(pixels.transpose(0, 3, 1, 2))
+
+
+def _stat(path):
+    stat = os.stat(path)
+    return [stat.st_mtime, stat.st_size]
+
+
+def _write_row(args):
+    """Worker: decode one image straight into its row of the memmap."""
+    array_path, row, image_path, size = args
+    store = np.load(array_path, mmap_mode='r+')
+    try:
+        store[row] = load_pixels(image_path, size)
+        ok = True
+    except (OSError, ValueError):
+        ok = False
+    store.flush()
+    del store
+    return row, ok
+
+
+def build_image_store(image_paths, store_dir=STORE_DIR, size=DEFAULT_SIZE, workers=None):
+    """
+    Convert images into a memory-mapped uint8 store in a process pool.
+
+    Keys are the image file stems (e.g. `cdli_P000001`), matching the
+    sample keys of the training dataset.
+
+    Returns:
+        ImageStore: The new store
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    array_path = os.path.join(store_dir, 'images.npy')
+    store = np.lib.format.open_memmap(array_path, mode='w+', dtype=np.uint8, shape=(len(image_paths), size, size, 3))
+    del store
+
+    jobs = [(array_path, row, path, size) for row, path in enumerate(image_paths)]
+    failed = []
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        for row, ok in pool.map(_write_row, jobs, chunksize=8):
+            if not ok:
+                failed.append(image_paths[row])
+    for path in failed:
+        print(f"Failed to decode {path}; stored as black image")
+
+    index = {
+        'size': size,
+        'keys': [os.path.splitext(os.path.basename(p))[0] for p in image_paths],
+        'paths': list(image_paths),
+        'stats': [_stat(p) for p in image_paths],
+    }
+    with open(os.path.join(store_dir, 'index.json'), 'w', encoding='utf-8') as f:
+        json.dump(index, f)
+    return ImageStore(store_dir)
+
+
+class ImageStore:
+    """Read-only, memory-mapped view of a store built by build_image_store()."""
+
+    def __init__(self, store_dir=STORE_DIR):
+        with open(os.path.join(store_dir, 'index.json'), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        self.size = index['size']
+        self.keys = index['keys']
+        self.paths = index['paths']
+        self.stats = index.get('stats', [])
+        self.rows = {key: i for i, key in enumerate(self.keys)}
+        self.array = np.load(os.path.join(store_dir, 'images.npy'), mmap_mode='r')
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self.rows
+
+    def __getitem__(self, key):
+        """Zero-copy (size, size, 3) uint8 view of one image."""
+        return self.array[self.rows[key]]
+
+    def batch(self, keys):
+        """Gather several images into one contiguous uint8 batch."""
+        return self.array[[self.rows[key] for key in keys]]
+
+    def is_current(self, image_paths, size):
+        """True if the store holds exactly these (unchanged) files at this size."""
+        if self.size != size or self.paths != list(image_paths):
+            return False
+        return all(os.path.exists(p) and _stat(p) == stat for p, stat in zip(self.paths, self.stats))
+
+    @staticmethod
+    def exists(store_dir=STORE_DIR):
+        return os.path.exists(os.path.join(store_dir, 'index.json'))
+
+
+def open_image_store(image_paths, store_dir=STORE_DIR, size=DEFAULT_SIZE, workers=None):
+    """Load the store if it is current for `image_paths`, otherwise (re)build it."""
+    if ImageStore.exists(store_dir):
+        store = ImageStore(store_dir)
+        if store.is_current(image_paths, size):
+            return store
+        del store
+    print(f"Building image store for {len(image_paths)} images at {size}x{size} -> {store_dir}")
+    return build_image_store(image_paths, store_dir, size, workers)
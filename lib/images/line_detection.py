@@ -0,0 +1,273 @@
+"""
+Projection-profile text-line detection on tablet face crops.
+
+Wedge impressions leave strong horizontal intensity changes (their vertical
+strokes and shadows), while the gaps and horizontal rulings between lines
+have few. Summing |dI/dx| over the tablet's pixels in each row gives a
+profile with high bands on text lines and valleys between them; columns
+are found the same way with |dI/dy| across the width.
+
+The number of lines is known from the ATF, so instead of thresholding the
+profile, `count - 1` cuts are placed by dynamic programming: each cut pays
+the (normalized) profile height at its row, and each band pays for
+deviating from the mean band height. Every band gets a confidence from how
+clearly its boundaries sit in valleys, how regular its height is and how
+well the number of natural valleys matches the expected count; line
+confidences are scaled by the confidence of their column.
+
+Without an ATF (at inference time) the number of lines per column is
+estimated from the line pitch, the dominant period of the row profile's
+autocorrelation. Column counts cannot be estimated reliably on worn tablets
+(rulings are faint), so they are given by the caller.
+"""
+
+import numpy as np
+from PIL import Image
+
+from .face_segmentation import foreground_mask
+
+ANALYSIS_HEIGHT = 512
+# Profile smoothing window, as a fraction of the tablet extent
+SMOOTH_FRACTION = 0.01
+# Weight of band-height regularity against cutting in valleys
+REGULARITY_WEIGHT = 0.5
+MIN_BAND = 4
+# Rows whose tablet width is below this fraction of the widest row are ignored
+EXTENT_FRACTION = 0.2
+# Line pitch estimation: autocorrelation peaks below this are not line periods
+MIN_PERIODICITY = 0.2
+
+
+def smooth(profile, width):
+    width = max(1, int(width))
+    if width == 1:
+        return profile
+    kernel = np.ones(width) / width
+    return np.convolve(np.pad(profile, width // 2, mode='edge'), kernel, mode='valid')[:len(profile)]
+
+
+def text_profile(gray, mask, axis=0):
+    """
+    Text energy per row (axis=0) or per column (axis=1) of the tablet.
+
+    Returns:
+        tuple[np.ndarray, int, int]: (smoothed profile, first, last) where
+        first/last bound the tablet's extent along that axis
+    """
+    gray = gray.astype(np.float32)
+    if axis == 0:
+        grad = np.abs(np.diff(gray, axis=1))
+        inside = mask[:, 1:] & mask[:, :-1]
+        energy = (grad * inside).sum(1) / np.maximum(inside.sum(1), 1)
+        coverage = inside.sum(1)
+    else:
+        grad = np.abs(np.diff(gray, axis=0))
+        inside = mask[1:] & mask[:-1]
+        energy = (grad * inside).sum(0) / np.maximum(inside.sum(0), 1)
+        coverage = inside.sum(0)
+    extent = np.flatnonzero(coverage >= EXTENT_FRACTION * max(1, coverage.max()))
+    if not len(extent):
+        return energy, 0, len(energy) - 1
+    first, last = int(extent[0]), int(extent[-1])
+    return smooth(energy, SMOOTH_FRACTION * (last - first + 1)), first, last
+
+
+def find_bands(profile, count, first, last, regularity=REGULARITY_WEIGHT):
+    """
+    Split [first, last] into `count` bands with cuts in profile valleys.
+
+    Returns:
+        list[tuple[int, int]]: (start, end) of each band, or [] if the
+        extent is too small for `count` bands
+    """
+    length = last - first + 1
+    if count < 1 or length < count * MIN_BAND:
+        return []
+    if count == 1:
+        return [(first, last + 1)]
+    segment = profile[first:last + 1]
+    cost_at = segment / max(float(segment.mean()), 1e-6)
+    target = length / count
+    positions = np.arange(length + 1)
+    steps = positions[None, :] - positions[:, None]  # steps[i, j] = j - i
+    transition = regularity * ((steps - target) / target) ** 2
+    transition[steps < MIN_BAND] = np.inf
+
+    cost = np.full(length + 1, np.inf)
+    cost[0] = 0.0
+    back = []
+    cut_cost = np.append(cost_at, 0.0)
+    for _ in range(count - 1):
+        total = cost[:, None] + transition
+        best = np.argmin(total, axis=0)
+        cost = total[best, positions] + cut_cost
+        cost[length] = np.inf  # internal cuts only
+        back.append(best)
+    final = cost + transition[:, length]
+    position = int(np.argmin(final))
+    if not np.isfinite(final[position]):
+        return []
+    cuts = [length]
+    for best in reversed(back):
+        cuts.append(position)
+        position = int(best[position])
+    cuts.append(0)
+    cuts.reverse()
+    return [(first + a, first + b) for a, b in zip(cuts[:-1], cuts[1:])]
+
+
+def count_valleys(profile, first, last, scale=1, level=0.5):
+    """
+    Number of gaps between text bands within [first, last].
+
+    The profile is smoothed further at `scale` (about an eighth of the
+    expected band height) so texture inside a line does not count, then
+    split at `level` times its 90th percentile; every low run with a high
+    run on both sides is a gap.
+    """
+    segment = smooth(profile[first:last + 1], scale)
+    if len(segment) < 3:
+        return 0
+    high = segment > level * np.percentile(segment, 90)
+    changes = np.flatnonzero(np.diff(high.astype(np.int8)) == -1)  # high -> low
+    high_idx = np.flatnonzero(high)
+    if not len(high_idx):
+        return 0
+    return int((changes < high_idx[-1]).sum())
+
+
+def band_confidence(profile, bands):
+    """
+    Confidence in [0, 1] per band.
+
+    Geometric mean of valley contrast (boundary vs. band energy) and height
+    regularity, scaled by agreement between natural valleys and band count.
+    """
+    if not bands:
+        return []
+    first, last = bands[0][0], bands[-1][1] - 1
+    heights = np.array([end - start for start, end in bands], dtype=np.float64)
+    target = heights.mean()
+    valleys = count_valleys(profile, first, last, scale=target / 8)
+    expected = len(bands) - 1
+    if expected == 0:
+        # A single band is only plausible if the profile has no clear gaps
+        return [1.0 / (1 + valleys)]
+    agreement = (1 + min(valleys, expected)) / (1 + max(valleys, expected))
+    confidences = []
+    for i, (start, end) in enumerate(bands):
+        inside = float(profile[start:end].mean())
+        cuts = [profile[start]] if i > 0 else []
+        if i < len(bands) - 1:
+            cuts.append(profile[min(end, len(profile) - 1)])
+        contrast = np.clip(1.0 - float(np.mean(cuts)) / max(inside, 1e-6), 0.0, 1.0)
+        regular = np.clip(1.0 - abs(heights[i] - target) / target, 0.0, 1.0)
+        confidences.append(float(np.sqrt(contrast * regular) * agreement))
+    return confidences
+
+
+def _analysis_image(image):
+    """(uint8 grayscale at most ANALYSIS_HEIGHT rows, tablet mask)."""
+    gray_image = image.convert('L')
+    scale = min(1.0, ANALYSIS_HEIGHT / gray_image.height)
+    if scale < 1.0:
+        gray_image = gray_image.resize((max(1, round(gray_image.width * scale)), ANALYSIS_HEIGHT), Image.BILINEAR)
+    gray = np.asarray(gray_image, dtype=np.uint8)
+    return gray, foreground_mask(gray)
+
+
+def line_pitch(profile, first, last):
+    """
+    Dominant line spacing in rows within [first, last], or None.
+
+    The first autocorrelation peak that reaches at least half of the
+    highest one (so a multiple of the pitch is not chosen over the pitch).
+    """
+    segment = profile[first:last + 1] - profile[first:last + 1].mean()
+    length = len(segment)
+    if length < 4 * MIN_BAND:
+        return None
+    spectrum = np.fft.rfft(segment, 2 * length)
+    acf = np.fft.irfft(spectrum * np.conj(spectrum))[:length]
+    if acf[0] <= 0:
+        return None
+    acf = acf / acf[0]
+    lags = np.arange(2 * MIN_BAND, length // 2 + 1)
+    if not len(lags):
+        return None
+    values = acf[lags]
+    peaks = np.flatnonzero((values[1:-1] > values[:-2]) & (values[1:-1] >= values[2:])) + 1
+    peaks = peaks[values[peaks] >= MIN_PERIODICITY]
+    if not len(peaks):
+        return None
+    strong = peaks[values[peaks] >= 0.5 * values[peaks].max()]
+    return int(lags[strong[0]])
+
+
+def estimate_line_counts(image, columns=1, right_to_left=False):
+    """
+    Estimate the number of lines in each column of a face crop, for detect_lines().
+
+    Args:
+        image (PIL.Image.Image): Face crop
+        columns (int): Number of columns
+        right_to_left (bool): Columns run right to left (e.g. reverse faces)
+
+    Returns:
+        list[int]: Lines per column in ATF order, as detect_lines() takes
+        them; 1 where no line period was found
+    """
+    gray, mask = _analysis_image(image)
+    bands = [(0, gray.shape[1])]
+    if columns > 1:
+        col_profile, col_first, col_last = text_profile(gray, mask, axis=1)
+        bands = find_bands(col_profile, columns, col_first, col_last) or [(0, gray.shape[1])] * columns
+
+    counts = []
+    for left, right in bands:
+        column_mask = np.zeros_like(mask)
+        column_mask[:, left:right] = mask[:, left:right]
+        profile, first, last = text_profile(gray, column_mask, axis=0)
+        pitch = line_pitch(profile, first, last)
+        counts.append(max(1, round((last - first + 1) / pitch)) if pitch else 1)
+    return counts[::-1] if right_to_left else counts
+
+
+def detect_lines(image, column_counts, right_to_left=False):
+    """
+    Find text-line boxes on a face crop.
+
+    Args:
+        image (PIL.Image.Image): Face crop
+        column_counts (list[int]): Number of lines in each column, in ATF order
+        right_to_left (bool): Columns run right to left (e.g. reverse faces)
+
+    Returns:
+        list[list[tuple[tuple[float, float, float, float], float]]]: Per
+        column, (box as fractions of the crop, confidence) per line; empty
+        lists where a column could not be split
+    """
+    gray, mask = _analysis_image(image)
+    height, width = gray.shape
+
+    if len(column_counts) > 1:
+        col_profile, col_first, col_last = text_profile(gray, mask, axis=1)
+        columns = find_bands(col_profile, len(column_counts), col_first, col_last)
+        column_confidences = band_confidence(col_profile, columns)
+        if right_to_left:
+            columns, column_confidences = columns[::-1], column_confidences[::-1]
+    else:
+        columns, column_confidences = [(0, width)], [1.0]
+    if not columns:
+        return [[] for _ in column_counts]
+
+    results = []
+    for (left, right), column_confidence, count in zip(columns, column_confidences, column_counts):
+        column_mask = np.zeros_like(mask)
+        column_mask[:, left:right] = mask[:, left:right]
+        profile, first, last = text_profile(gray, column_mask, axis=0)
+        bands = find_bands(profile, count, first, last)
+        confidences = band_confidence(profile, bands)
+        results.append([((left / width, start / height, right / width, end / height), confidence * column_confidence)
+                        for (start, end), confidence in zip(bands, confidences)])
+    return results
@@ -0,0 +1,327 @@
+"""
+Synthetic cuneiform line images for pretraining.
+
+Numbered ATF lines from the corpus are converted sign by sign with
+atf_to_cuneiform; signs that map to Unicode cuneiform are rendered with a
+random bundled font and size onto clay-like backgrounds (tinted base,
+low-frequency mottling, impressed wedges with shadow and highlight, grain,
+blur and a slight rotation). The target is the ATF of exactly the signs that
+were rendered, space-separated.
+
+Only part of the corpus maps to Unicode (proto-cuneiform numerals and
+`~a` variants do not), so a share of samples are random sign sequences
+drawn from the mapped inventory, weighted by corpus frequency; with no
+renderable corpus lines every sample is such a sequence.
+
+Generation is deterministic: sample `i` of a run is drawn from
+`numpy.random.default_rng([seed, i])`, regardless of how samples are
+spread over worker processes. Output is written as tar shards of
+`<key>.jpg`, `<key>.atf` and `<key>.json` members.
+"""
+
+import io
+import json
+import os
+import re
+import tarfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+from atf2unicode.main import MAPPINGS, atf_to_cuneiform
+from corpus.atf_reader import LINE_RE, iter_atf_files, iter_tablets
+
+FONT_DIR = 'data/fonts'
+OUTPUT_DIR = 'data/synthetic'
+SHARD_SIZE = 1000
+# Font sizes in steps, so the glyph cache stays small enough to always hit
+FONT_SIZES = (28, 72)
+FONT_SIZE_STEP = 4
+MIN_SIGNS = 2
+# Share of samples taken from corpus lines (the rest are random sign sequences)
+CORPUS_FRACTION = 0.5
+RANDOM_LINE_SIGNS = (2, 12)
+# Unicode Cuneiform, Cuneiform Numbers and Punctuation, Early Dynastic Cuneiform
+CUNEIFORM_RANGES = ((0x12000, 0x123FF), (0x12400, 0x1247F), (0x12480, 0x1254F))
+STRIP_RE = re.compile(r'[\[\]⸢⸣<>_#?!*]')
+# Probe size for deciding whether a font covers a glyph
+PROBE_SIZE = 32
+
+
+def is_cuneiform(text):
+    return bool(text) and all(any(lo <= ord(ch) <= hi for lo, hi in CUNEIFORM_RANGES) for ch in text)
+
+
+def line_glyphs(atf_line):
+    """
+    (tokens, glyphs) of the renderable signs of one transliteration line.
+
+    Tokens are split on whitespace and hyphens like atf_to_cuneiform does,
+    with breakage brackets and flags removed.
+    """
+    tokens, glyphs = [], []
+    for token in re.split(r'[\s\-]+', atf_line):
+        token = STRIP_RE.sub('', token)
+        if not token or token in (',', '...'):
+            continue
+        glyph, _ = atf_to_cuneiform(token)
+        if is_cuneiform(glyph):
+            tokens.append(token)
+            glyphs.append(glyph)
+    return tokens, glyphs
+
+
+def load_lines(sources, min_signs=MIN_SIGNS):
+    """
+    Renderable corpus lines, deduplicated in corpus order.
+
+    Returns:
+        list[tuple[tuple[str], tuple[str]]]: (tokens, glyphs) per line
+    """
+    seen = set()
+    lines = []
+    for path in iter_atf_files(sources):
+        for _, _, text in iter_tablets(path):
+            for raw in text.split('\n'):
+                match = LINE_RE.match(raw.strip())
+                if not match:
+                    continue
+                tokens, glyphs = line_glyphs(match.group(2))
+                key = tuple(tokens)
+                if len(tokens) >= min_signs and key not in seen:
+                    seen.add(key)
+                    lines.append((key, tuple(glyphs)))
+    return lines
+
+
+def sign_inventory(sources=()):
+    """
+    Renderable simple signs with sampling weights.
+
+    Weights are 1 + the sign's count in the corpus `sources`.
+
+    Returns:
+        tuple[list[tuple[str, str]], np.ndarray]: (reading, glyph) pairs and
+        their probabilities
+    """
+    counts = {}
+    for path in iter_atf_files(sources):
+        for _, _, text in iter_tablets(path):
+            for raw in text.split('\n'):
+                match = LINE_RE.match(raw.strip())
+                if match:
+                    for token in line_glyphs(match.group(2))[0]:
+                        counts[token] = counts.get(token, 0) + 1
+    signs = sorted((reading, glyph) for reading, glyph in MAPPINGS.get('simple', {}).items() if is_cuneiform(glyph))
+    weights = np.array([1 + counts.get(reading, 0) for reading, _ in signs], dtype=np.float64)
+    return signs, weights / max(weights.sum(), 1)
+
+
+def sample_text(rng, lines, signs, weights, corpus_fraction=CORPUS_FRACTION):
+    """(tokens, glyphs) for one sample: a corpus line or a random sign sequence."""
+    if lines and (not signs or rng.random() < corpus_fraction):
+        return lines[rng.integers(len(lines))]
+    count = int(rng.integers(RANDOM_LINE_SIGNS[0], RANDOM_LINE_SIGNS[1] + 1))
+    picks = rng.choice(len(signs), size=count, p=weights)
+    return tuple(signs[i][0] for i in picks), tuple(signs[i][1] for i in picks)
+
+
+def list_fonts(font_dir=FONT_DIR):
+    return sorted(os.path.join(font_dir, name) for name in os.listdir(font_dir)
+                  if name.lower().endswith(('.ttf', '.otf')))
+
+
+class GlyphCache:
+    """
+    Rasterised glyphs per (font, size, glyph), so each is drawn once per process.
+
+    Also records which fonts cover which glyphs: a glyph is missing if it
+    renders empty or identical to the font's .notdef box.
+    """
+
+    def __init__(self, font_paths):
+        self.font_paths = list(font_paths)
+        self.fonts = {}
+        self.glyphs = {}
+        self.coverage = {}
+        self.notdef = {path: self._raster(path, PROBE_SIZE, '\U0010FFFD')[0].tobytes() for path in self.font_paths}
+
+    def font(self, path, size):
+        key = (path, size)
+        if key not in self.fonts:
+            self.fonts[key] = ImageFont.truetype(path, size)
+        return self.fonts[key]
+
+    def _raster(self, path, size, glyph):
+        font = self.font(path, size)
+        left, top, right, bottom = font.getbbox(glyph)
+        width, height = max(1, right - left), max(1, bottom - top)
+        image = Image.new('L', (width, height))
+        ImageDraw.Draw(image).text((-left, -top), glyph, font=font, fill=255)
+        return np.asarray(image, dtype=np.uint8), left, top, font.getlength(glyph)
+
+    def get(self, path, size, glyph):
+        """(mask, left, top, advance) for a glyph; top is relative to the ascender line."""
+        key = (path, size, glyph)
+        cached = self.glyphs.get(key)
+        if cached is None:
+            cached = self.glyphs[key] = self._raster(path, size, glyph)
+        return cached
+
+    def covers(self, path, glyph):
+        key = (path, glyph)
+        if key not in self.coverage:
+            mask = self._raster(path, PROBE_SIZE, glyph)[0]
+            self.coverage[key] = bool(mask.any()) and mask.tobytes() != self.notdef[path]
+        return self.coverage[key]
+
+    def fonts_for(self, glyphs):
+        """Fonts that cover every glyph of a line."""
+        return [path for path in self.font_paths if all(self.covers(path, g) for g in glyphs)]
+
+
+def _low_frequency(rng, height, width, cell=24):
+    grid = rng.random((height // cell + 2, width // cell + 2)).astype(np.float32)
+    image = Image.fromarray((grid * 255).astype(np.uint8)).resize((width, height), Image.BICUBIC)
+    return np.asarray(image, dtype=np.float32) / 255.0 - 0.5
+
+
+def render_line(glyphs, cache, rng):
+    """
+    Render one line of glyphs as a clay-like RGB image.
+
+    Returns:
+        tuple[PIL.Image.Image, dict]: Image and its render parameters
+    """
+    fonts = cache.fonts_for(glyphs)
+    if not fonts:
+        return None, None
+    font_path = fonts[rng.integers(len(fonts))]
+    size = FONT_SIZES[0] + FONT_SIZE_STEP * int(rng.integers((FONT_SIZES[1] - FONT_SIZES[0]) // FONT_SIZE_STEP + 1))
+    spacing = rng.uniform(0.05, 0.4) * size
+    margin = int(rng.uniform(0.2, 0.6) * size)
+    pieces = [cache.get(font_path, size, glyph) for glyph in glyphs]
+
+    height = int(size * 1.5) + 2 * margin
+    width = int(sum(advance for *_, advance in pieces) + spacing * (len(pieces) - 1)) + 2 * margin
+    ink = np.zeros((height, width), dtype=np.uint8)
+    x = float(margin)
+    for mask, left, top, advance in pieces:
+        y0 = margin + top + int(rng.normal(0, 0.04 * size))
+        x0 = int(x) + left
+        y0, x0 = max(0, y0), max(0, x0)
+        h, w = min(mask.shape[0], height - y0), min(mask.shape[1], width - x0)
+        if h > 0 and w > 0:
+            np.maximum(ink[y0:y0 + h, x0:x0 + w], mask[:h, :w], out=ink[y0:y0 + h, x0:x0 + w])
+        x += advance + spacing
+
+    # Rotation and blur act on the single-channel ink map, before colouring
+    angle = rng.normal(0, 1.5)
+    blur = rng.uniform(0, 1.2)
+    ink_image = Image.fromarray(ink).rotate(angle, resample=Image.BILINEAR)
+    if blur > 0.3:
+        ink_image = ink_image.filter(ImageFilter.GaussianBlur(blur))
+    ink = np.asarray(ink_image, dtype=np.float32) / 255.0
+
+    # Impressions: shadow inside the wedge, highlight on the lit rim
+    depth = rng.uniform(0.25, 0.6)
+    shift = max(1, size // 24)
+    highlight = np.zeros_like(ink)
+    highlight[:-shift, :-shift] = np.clip(ink[shift:, shift:] - ink[:-shift, :-shift], 0, 1)
+    relief = 1.0 - depth * ink + 0.5 * depth * highlight
+
+    red = rng.uniform(140, 220)
+    base = np.array([red, red * rng.uniform(0.82, 0.95), red * rng.uniform(0.62, 0.82)], dtype=np.float32)
+    if rng.random() < 0.3:  # grey plates / old photos
+        base[:] = base.mean()
+    mottling = 1.0 + rng.uniform(0.1, 0.3) * _low_frequency(rng, height, width)
+    shade = relief * mottling
+    shade += rng.standard_normal((height, width), dtype=np.float32) * np.float32(rng.uniform(0.01, 0.05))
+    pixels = base[None, None, :] * shade[:, :, None]
+    image = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+    params = {'font': os.path.basename(font_path), 'size': size, 'angle': round(float(angle), 2),
+              'blur': round(float(blur), 2), 'depth': round(float(depth), 2)}
+    return image, params
+
+
+# Per-process state for the pool workers
+_TEXT = None
+_CACHE = None
+
+
+def _init_worker(text, font_paths):
+    global _TEXT, _CACHE
+    _TEXT = text
+    _CACHE = GlyphCache(font_paths)
+
+
+def _add_member(tar, name, data):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mtime = 0
+    tar.addfile(info, io.BytesIO(data))
+
+
+def render_shard(args):
+    """Worker: render samples [start, stop) of a run into one tar shard; returns the sample count."""
+    shard_path, start, stop, seed = args
+    count = 0
+    tmp_path = shard_path + '.tmp'
+    with tarfile.open(tmp_path, 'w') as tar:
+        for index in range(start, stop):
+            rng = np.random.default_rng([seed, index])
+            tokens, glyphs = sample_text(rng, *_TEXT)
+            image, params = render_line(glyphs, _CACHE, rng)
+            if image is None:
+                continue
+            key = f"syn{seed}-{index:09d}"
+            buffer = io.BytesIO()
+            image.save(buffer, format='JPEG', quality=int(rng.integers(75, 96)))
+            _add_member(tar, f"{key}.jpg", buffer.getvalue())
+            _add_member(tar, f"{key}.atf", (' '.join(tokens) + '\n').encode('utf-8'))
+            _add_member(tar, f"{key}.json", json.dumps(dict(params, index=index, seed=seed)).encode('utf-8'))
+            count += 1
+    os.replace(tmp_path, shard_path)
+    return count
+
+
+def generate(sources, num_samples, output_dir=OUTPUT_DIR, shard_size=SHARD_SIZE, seed=0, workers=None,
+             font_dir=FONT_DIR, corpus_fraction=CORPUS_FRACTION):
+    """
+    Render `num_samples` synthetic lines into tar shards in a process pool.
+
+    Existing shards are kept, so an interrupted run can be resumed with the
+    same arguments.
+
+    Args:
+        sources (list[str]): ATF files or directories for line text and sign frequencies
+
+    Returns:
+        dict: samples, corpus lines, shards, skipped (existing) shards and elapsed seconds
+    """
+    lines = load_lines(sources)
+    signs, weights = sign_inventory(sources)
+    if not lines and not signs:
+        raise ValueError("Nothing to render: no corpus line or mapped sign converts to Unicode cuneiform")
+    print(f"Text: {len(lines)} renderable corpus lines, {len(signs)} mapped signs")
+    os.makedirs(output_dir, exist_ok=True)
+    jobs, skipped = [], 0
+    for shard, start in enumerate(range(0, num_samples, shard_size)):
+        path = os.path.join(output_dir, f"synthetic-{seed}-{shard:05d}.tar")
+        if os.path.exists(path):
+            skipped += 1
+            continue
+        jobs.append((path, start, min(start + shard_size, num_samples), seed))
+
+    started = time.perf_counter()
+    samples = 0
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker,
+                             initargs=((lines, signs, weights, corpus_fraction), list_fonts(font_dir))) as pool:
+        for done, count in enumerate(pool.map(render_shard, jobs), 1):
+            samples += count
+            elapsed = time.perf_counter() - started
+            print(f"  shard {done}/{len(jobs)}: {samples} samples, {samples / elapsed:.0f}/s "
+                  f"({3600 * samples / elapsed:,.0f}/h)")
+    return {'samples': samples, 'lines': len(lines), 'shards': len(jobs), 'skipped': skipped, 'elapsed': time.perf_counter() - started}
@@ -0,0 +1,23 @@
+"""
+OCR inference against the OpenAI-compatible serving endpoint.
+"""
+
+from .client import OCRClient, chat_messages, BASE_MODEL, FINETUNED_MODEL, PROMPT
+from .payload import Payload, encode_image, NATIVE_SIZE
+from .enrichment import warm_translators, enrich_atf
+from .result_cache import ResultCache, result_key
+
+__all__ = [
+    'OCRClient',
+    'chat_messages',
+    'BASE_MODEL',
+    'FINETUNED_MODEL',
+    'PROMPT',
+    'Payload',
+    'encode_image',
+    'NATIVE_SIZE',
+    'warm_translators',
+    'enrich_atf',
+    'ResultCache',
+    'result_key'
+]
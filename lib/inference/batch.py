@@ -0,0 +1,149 @@
+"""
+Resumable batch OCR against the OpenAI-compatible endpoint.
+
+Images come from a directory or from tar shards and are processed by a
+fixed number of workers, so memory stays flat however many images there
+are. Each worker decodes and encodes its image off the event loop, sends
+the request through a shared OCRClient and appends one JSON line per image
+to the output as soon as it completes. Rerunning with the same output skips
+every key that already has a prediction; failed requests are recorded with
+an `error` and retried on the next run.
+"""
+
+import asyncio
+import io
+import json
+import os
+import time
+
+from PIL import Image
+
+from .client import BASE_MODEL, MAX_TOKENS, PROMPT
+from .payload import JPEG_QUALITY, MAX_PAYLOAD_BYTES, NATIVE_SIZE, encode_image
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.tif', '.tiff', '.webp')
+# Seconds between progress lines
+PROGRESS_INTERVAL = 10.0
+
+
+def iter_image_dir(images_dir):
+    """Yield (key, image bytes) for the images in a directory, keyed by file name without extension."""
+    for name in sorted(os.listdir(images_dir)):
+        if name.lower().endswith(IMAGE_EXTENSIONS):
+            with open(os.path.join(images_dir, name), 'rb') as f:
+                yield os.path.splitext(name)[0], f.read()
+
+
+def iter_shard_images(paths):
+    """Yield (key, image bytes) from tar shards."""
+    # The training package pulls in torch/transformers; only shard input needs it
+    from training.tar_shards import iter_shard
+
+    for path in paths:
+        for sample in iter_shard(path):
+            yield sample['key'], sample['image']
+
+
+def completed_keys(out_path):
+    """Keys with a prediction in an existing JSONL output (a torn last line is ignored)."""
+    done = set()
+    if not os.path.exists(out_path):
+        return done
+    with open(out_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get('atf') is not None:
+                done.add(record['key'])
+    return done
+
+
+def _ends_with_newline(path):
+    with open(path, 'rb') as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b'\n'
+
+
+def _payload(data, max_side, quality, max_bytes):
+    with Image.open(io.BytesIO(data)) as image:
+        image.draft('RGB', (max_side, max_side))
+        return encode_image(image, max_side, quality, max_bytes)
+
+
+async def run_batch(client, items, out_path, model=BASE_MODEL, prompt=PROMPT, max_tokens=MAX_TOKENS,
+                    concurrency=None, max_side=NATIVE_SIZE, quality=JPEG_QUALITY, max_bytes=MAX_PAYLOAD_BYTES,
+                    progress_interval=PROGRESS_INTERVAL):
+    """
+    OCR every (key, image bytes) item not yet in `out_path`, appending results.
+
+    Args:
+        client (OCRClient): Shared client; its max_in_flight bounds the requests
+        items (iterable): (key, image bytes) pairs, consumed lazily
+        out_path (str): JSONL output, one {'key', 'atf', ...} record per image
+        concurrency (int): Workers (default: client.max_in_flight)
+        progress_interval (float): Seconds between progress lines; None for quiet
+
+    Returns:
+        dict: images, skipped, errors, prompt/completion tokens, seconds,
+        images_per_s and tokens_per_s for this run
+    """
+    done = completed_keys(out_path)
+    os.makedirs(os.path.dirname(out_path) or '.', exist_ok=True)
+    stats = {'images': 0, 'skipped': 0, 'errors': 0, 'prompt_tokens': 0, 'completion_tokens': 0}
+    iterator = iter(items)
+    start = time.perf_counter()
+    last_report = start
+
+    def next_item():
+        # Skipping and reading happen in the caller's worker, one item at a time
+        for key, data in iterator:
+            if key in done:
+                stats['skipped'] += 1
+                continue
+            return key, data
+        return None
+
+    def report(final=False):
+        elapsed = time.perf_counter() - start
+        print(f"{'Done' if final else '  ...'}: {stats['images']} images ({stats['errors']} errors, "
+              f"{stats['skipped']} already done) in {elapsed:.1f}s, {stats['images'] / max(elapsed, 1e-9):.2f} images/s, "
+              f"{stats['completion_tokens'] / max(elapsed, 1e-9):.1f} tokens/s")
+
+    async def worker(out):
+        nonlocal last_report
+        while True:
+            item = next_item()
+            if item is None:
+                return
+            key, data = item
+            request_start = time.perf_counter()
+            record = {'key': key, 'model': model}
+            try:
+                payload = await asyncio.to_thread(_payload, data, max_side, quality, max_bytes)
+                atf, usage = await client.transcribe(payload.url, model, prompt, max_tokens)
+                record.update(atf=atf, usage=usage, bytes=payload.bytes)
+                stats['prompt_tokens'] += usage.get('prompt_tokens') or 0
+                stats['completion_tokens'] += usage.get('completion_tokens') or 0
+            except Exception as e:
+                # Any per-image failure (bad file, HTTP error, timeout) is recorded and retried next run
+                record.update(atf=None, error=f"{type(e).__name__}: {e}")
+                stats['errors'] += 1
+            record['seconds'] = round(time.perf_counter() - request_start, 3)
+            out.write(json.dumps(record, ensure_ascii=False) + '\n')
+            out.flush()
+            stats['images'] += 1
+            if progress_interval and time.perf_counter() - last_report >= progress_interval:
+                last_report = time.perf_counter()
+                report()
+
+    with open(out_path, 'a', encoding='utf-8') as out:
+        if out.tell() and not _ends_with_newline(out_path):
+            out.write('\n')  # close a line torn by an interrupted run
+        await asyncio.gather(*(worker(out) for _ in range(concurrency or client.max_in_flight)))
+    elapsed = time.perf_counter() - start
+    if progress_interval:
+        report(final=True)
+    return dict(stats, seconds=round(elapsed, 3), images_per_s=round(stats['images'] / max(elapsed, 1e-9), 3),
+                tokens_per_s=round(stats['completion_tokens'] / max(elapsed, 1e-9), 1))
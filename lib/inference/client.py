@@ -0,0 +1,117 @@
+"""
+Async client for the OpenAI-compatible OCR endpoint (vLLM started by serve.py).
+
+One AsyncOpenAI client, and with it one HTTP connection pool, is shared by
+all requests. A semaphore bounds the requests in flight to roughly the
+server's batch capacity: excess requests wait here instead of piling up in
+the server queue. Every request has a timeout, and cancelling the awaiting
+task (e.g. a Gradio user pressing Cancel or leaving) closes its connection,
+which makes vLLM abort the generation. stream() yields the text as it is
+generated, so callers can show output after the prefill instead of after
+the whole generation.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+
+from openai import AsyncOpenAI
+
+BASE_URL = 'http://localhost:8000/v1'
+API_KEY = 'fake'
+BASE_MODEL = 'unsloth/DeepSeek-OCR'
+FINETUNED_MODEL = 'models/sumerian-deepseek-ocr'
+PROMPT = '<image>\nExtract cuneiform signs as CDLI ATF transliteration format. Output only the ATF lines.'
+MAX_TOKENS = 1024
+MAX_IN_FLIGHT = 16
+REQUEST_TIMEOUT = 120.0
+
+
+def chat_messages(image_url, prompt=PROMPT):
+    return [{'role': 'user', 'content': [
+        {'type': 'text', 'text': prompt},
+        {'type': 'image_url', 'image_url': {'url': image_url}},
+    ]}]
+
+
+class OCRClient:
+    """
+    Concurrency-limited async OCR requests.
+
+    Args:
+        max_in_flight (int): Requests sent to the server at once
+        timeout (float): Seconds per request, including generation
+    """
+
+    def __init__(self, base_url=BASE_URL, api_key=API_KEY, max_in_flight=MAX_IN_FLIGHT, timeout=REQUEST_TIMEOUT):
+        self.client = AsyncOpenAI(base_url=base_url, api_key=api_key, timeout=timeout, max_retries=0)
+        self.max_in_flight = max_in_flight
+        self._semaphore = None
+        self.in_flight = 0
+        self.waiting = 0
+
+    @property
+    def semaphore(self):
+        # Created on first use so it binds to the event loop that serves requests
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        return self._semaphore
+
+    @asynccontextmanager
+    async def _slot(self):
+        """Hold one of the `max_in_flight` request slots."""
+        self.waiting += 1
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self.semaphore.release()
+
+    async def transcribe(self, image_url, model=BASE_MODEL, prompt=PROMPT, max_tokens=MAX_TOKENS):
+        """
+        ATF for one image.
+
+        Raises:
+            openai.APITimeoutError, openai.APIConnectionError, openai.APIStatusError
+
+        Returns:
+            tuple[str, dict]: (text, usage with prompt_tokens/completion_tokens)
+        """
+        async with self._slot():
+            response = await self.client.chat.completions.create(
+                model=model, messages=chat_messages(image_url, prompt), max_tokens=max_tokens,
+            )
+        usage = response.usage.model_dump() if response.usage else {}
+        return (response.choices[0].message.content or '').strip(), usage
+
+    async def stream(self, image_url, model=BASE_MODEL, prompt=PROMPT, max_tokens=MAX_TOKENS):
+        """
+        Stream the ATF for one image as it is generated.
+
+        Raises:
+            openai.APITimeoutError, openai.APIConnectionError, openai.APIStatusError
+
+        Yields:
+            tuple[str, dict | None]: (text delta, usage on the final chunk, else None)
+        """
+        async with self._slot():
+            response = await self.client.chat.completions.create(
+                model=model, messages=chat_messages(image_url, prompt), max_tokens=max_tokens,
+                stream=True, stream_options={'include_usage': True},
+            )
+            try:
+                async for chunk in response:
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    usage = chunk.usage.model_dump() if chunk.usage else None
+                    if delta or usage:
+                        yield delta or '', usage
+            finally:
+                # Closing the connection early (cancel/aclose) aborts the generation on the server
+                await response.close()
+
+    def stats(self):
+        return {'in_flight': self.in_flight, 'waiting': self.waiting, 'max_in_flight': self.max_in_flight}
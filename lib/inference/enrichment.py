@@ -0,0 +1,67 @@
+"""
+Post-OCR enrichment: Unicode glyphs, glosses and unknown signs per ATF line.
+
+Translators load their dictionaries once (warm_translators()) and are then
+shared by every request; lookups only read them, so one set serves a whole
+thread pool. The language of each line comes from route_atf(), the
+per-line form of detect_language(): `#atf: lang` tags, Sumerograms inside
+Akkadian lines and the period fallback.
+"""
+
+import re
+
+from atf2unicode.main import atf_to_cuneiform
+from corpus.atf_reader import LINE_RE
+from translators.language_router import TRANSLATOR_CLASSES, route_atf
+
+# Placeholders atf_to_cuneiform() leaves for signs it cannot map
+UNMAPPED_RE = re.compile(r'\[(?:UNKNOWN|COMPOUND):([^\]]*)\]')
+
+
+def warm_translators():
+    """One instance per language, with dictionaries loaded (language -> translator)."""
+    return {language: cls() for language, cls in TRANSLATOR_CLASSES.items()}
+
+
+def enrich_atf(atf_text, translators, period=''):
+    """
+    Glyphs, glosses and unknown signs for every transliteration line.
+
+    Args:
+        atf_text (str): ATF text (model output)
+        translators (dict): From warm_translators()
+        period (str): Period for the language fallback
+
+    Returns:
+        list[dict]: Per line, in order: label, atf, language, glyphs (with
+        U+FFFD for unmapped signs), gloss ('?' where the dictionary has no
+        entry), unknown (unmapped sign names) and signs (atf, glyphs, gloss
+        and mapped per sign)
+    """
+    lines = atf_text.split('\n')
+    rows = {}
+    for span in route_atf(atf_text, period):
+        row = rows.get(span.line_no)
+        if row is None:
+            line = lines[span.line_no].strip()
+            match = LINE_RE.match(line)
+            row = rows[span.line_no] = {'label': match.group(1) if match else '', 'atf': match.group(2) if match else line,
+                                        'language': span.language, 'glyphs': '', 'gloss': [], 'unknown': [],
+                                        'signs': []}
+        translator = translators[span.language]
+        for sign in span.text.split():
+            if sign.startswith('>>') or sign == '[...]':
+                continue
+            # Sumerogram markers (`_..._`) are not part of the sign name
+            glyphs, _ = atf_to_cuneiform(sign.replace('_', ''))
+            unknown = UNMAPPED_RE.findall(glyphs)
+            glyphs = UNMAPPED_RE.sub('�', glyphs)
+            gloss, _ = translator.translate_sign(sign)
+            gloss = UNMAPPED_RE.sub('?', gloss)
+            row['unknown'].extend(unknown)
+            row['glyphs'] += glyphs
+            row['gloss'].append(gloss)
+            row['signs'].append({'atf': sign, 'glyphs': glyphs, 'gloss': gloss, 'mapped': not unknown})
+    for row in rows.values():
+        row['gloss'] = ' '.join(row['gloss'])
+    return [rows[line_no] for line_no in sorted(rows)]
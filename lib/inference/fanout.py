@@ -0,0 +1,153 @@
+"""
+Line-parallel OCR for large tablets.
+
+A single request for a whole multi-column tablet generates every line in
+sequence: latency grows with the length of the text, and long tablets run
+into the token limit. Here the photo is segmented into faces and each face
+into line bands (face_segmentation, line_detection). The crops are sent as
+concurrent requests, which vLLM batches, and their ATF is stitched back in
+reading order under `@obverse` / `@reverse` headers, so latency follows the
+slowest crop instead of the sum of all lines.
+"""
+
+import asyncio
+from collections import namedtuple
+
+from corpus.atf_reader import LINE_RE
+from images.face_segmentation import segment_image
+from images.line_detection import detect_lines, estimate_line_counts
+
+from .client import BASE_MODEL, MAX_TOKENS, PROMPT
+
+# ATF surface order; faces named 'other' by the segmentation are skipped
+READING_ORDER = ('obverse', 'bottom', 'reverse', 'top', 'left', 'right')
+# Surfaces split into lines; edges are sent as one crop each
+LINED_SURFACES = ('obverse', 'reverse')
+RIGHT_TO_LEFT_SURFACES = ('reverse',)
+FACE_MARGIN = 0.03
+# Extra height around each band, as a fraction of the band height
+LINE_PADDING = 0.15
+# Token limit for a single-line crop; faces and whole photos get the client's MAX_TOKENS
+LINE_MAX_TOKENS = 128
+
+Crop = namedtuple('Crop', ['surface', 'column', 'line', 'image', 'max_tokens'])
+Crop.__doc__ = "One request image: ATF surface name, column and line number (1-based), PIL image, token limit."
+
+
+def _pad_box(box, size, margin):
+    left, top, right, bottom = box
+    pad_x, pad_y = int((right - left) * margin), int((bottom - top) * margin)
+    return max(0, left - pad_x), max(0, top - pad_y), min(size[0], right + pad_x), min(size[1], bottom + pad_y)
+
+
+def line_crops(image, columns=1):
+    """
+    Segment a tablet photo into line crops in reading order.
+
+    Args:
+        image (PIL.Image.Image): Tablet photo
+        columns (int): Columns on the obverse/reverse
+
+    Returns:
+        list[Crop]: Line crops; one crop per face where lines could not be
+        placed (and per edge), and the whole photo if no face was found
+    """
+    image = image.convert('RGB')
+    _, faces = segment_image(image)
+    faces = sorted((face for face in faces if face.surface in READING_ORDER),
+                   key=lambda face: READING_ORDER.index(face.surface))
+    if not faces:
+        return [Crop('obverse', 1, 1, image, MAX_TOKENS)]
+
+    crops = []
+    for face in faces:
+        face_image = image.crop(_pad_box(face.box, image.size, FACE_MARGIN))
+        if face.surface not in LINED_SURFACES:
+            crops.append(Crop(face.surface, 1, 1, face_image, MAX_TOKENS))
+            continue
+        right_to_left = face.surface in RIGHT_TO_LEFT_SURFACES
+        counts = estimate_line_counts(face_image, columns, right_to_left)
+        detected = detect_lines(face_image, counts, right_to_left)
+        if not all(detected):
+            crops.append(Crop(face.surface, 1, 1, face_image, MAX_TOKENS))
+            continue
+        width, height = face_image.size
+        for column, boxes in enumerate(detected):
+            # A column left in one band (no line pitch found) is a whole column, not a line
+            max_tokens = LINE_MAX_TOKENS if len(boxes) > 1 else MAX_TOKENS
+            for line, (box, _) in enumerate(boxes):
+                left, top, right, bottom = box
+                pad = LINE_PADDING * (bottom - top)
+                crop_box = (int(left * width), max(0, int((top - pad) * height)),
+                            int(right * width), min(height, int((bottom + pad) * height + 0.5)))
+                crops.append(Crop(face.surface, column + 1, line + 1, face_image.crop(crop_box), max_tokens))
+    return crops
+
+
+def stitch(crops, texts):
+    """
+    ATF for per-crop transcriptions in reading order.
+
+    Structure lines from the model (`@...`) are dropped in favour of the
+    crops' surfaces and columns; `$`/`#` lines are kept as they are, and
+    numbered lines are renumbered per column.
+
+    Args:
+        crops (list[Crop]): As returned by line_crops()
+        texts (list[str]): Transcription per crop
+
+    Returns:
+        str: ATF text
+    """
+    multi_column = {crop.surface for crop in crops if crop.column > 1}
+    out = []
+    place = None
+    for crop, text in zip(crops, texts):
+        if place is None or crop.surface != place[0]:
+            out.append(f"@{crop.surface}")
+        if crop.surface in multi_column and (place is None or place != (crop.surface, crop.column)):
+            out.append(f"@column {crop.column}")
+        if place != (crop.surface, crop.column):
+            number = 0
+        place = (crop.surface, crop.column)
+        for raw in text.split('\n'):
+            line = raw.strip()
+            if not line or line.startswith('@'):
+                continue
+            if line[0] in '$#':
+                out.append(line)
+                continue
+            match = LINE_RE.match(line)
+            number += 1
+            out.append(f"{number}. {match.group(2) if match else line}")
+    return '\n'.join(out)
+
+
+async def transcribe_crops(client, urls, model=BASE_MODEL, prompt=PROMPT, max_tokens=LINE_MAX_TOKENS):
+    """
+    Send all crops at once; the client's in-flight limit bounds the concurrency.
+
+    Args:
+        client (OCRClient): Shared client
+        urls (list[str]): Image data URLs, one per crop
+        max_tokens (int | list[int]): Token limit for every crop, or one per
+            crop (Crop.max_tokens)
+
+    Yields:
+        tuple[int, str, dict]: (crop index, text, usage) as requests complete
+    """
+    if isinstance(max_tokens, int):
+        max_tokens = [max_tokens] * len(urls)
+
+    async def one(index, url, limit):
+        text, usage = await client.transcribe(url, model, prompt, limit)
+        return index, text, usage
+
+    tasks = [asyncio.ensure_future(one(index, url, limit)) for index, (url, limit) in enumerate(zip(urls, max_tokens))]
+    try:
+        for done in asyncio.as_completed(tasks):
+            yield await done
+    finally:
+        # Closing early (cancel, error) aborts the remaining generations
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,189 @@
+"""
+Local stand-in for the vLLM OpenAI-compatible server (standard library only).
+
+Implements the subset the client code uses: POST /v1/chat/completions
+(plain and `stream=True` with server-sent events and an optional final
+usage chunk), GET /v1/models, GET /health and GET /stats. Latency follows a
+simple serving model:
+
+- at most `batch_size` requests generate at once; the rest wait in a queue
+- each request waits `prefill` seconds before its first token
+- tokens are then produced at `token_rate` tokens/s per request
+
+Responses are deterministic pseudo-ATF lines, `completion_tokens` words
+long (capped by max_tokens). A client disconnect stops the generation and
+is counted as an abort, as in vLLM.
+"""
+
+import asyncio
+import json
+import time
+
+HOST = '127.0.0.1'
+PORT = 8000
+BATCH_SIZE = 64
+PREFILL = 0.05
+TOKEN_RATE = 200.0
+COMPLETION_TOKENS = 48
+PROMPT_TOKENS = 273
+SIGNS = ('1(disz)', 'lugal', 'e2', 'kur', 'an', 'ki', 'mu', 'u4', '|GISZ.DIN|', 'sza3', 'dumu', 'gal')
+WORDS_PER_LINE = 6
+
+
+def mock_atf(tokens):
+    """Deterministic numbered ATF lines with `tokens` signs in total."""
+    lines = []
+    for start in range(0, tokens, WORDS_PER_LINE):
+        words = [SIGNS[(start + i) * 7 % len(SIGNS)] for i in range(min(WORDS_PER_LINE, tokens - start))]
+        lines.append(f"{start // WORDS_PER_LINE + 1}. {' '.join(words)}")
+    return '\n'.join(lines)
+
+
+class MockServer:
+    """
+    Mock OpenAI/vLLM chat completions server.
+
+    Args:
+        models (list[str]): Served model names; None accepts any name
+        batch_size (int): Requests generating at once
+        prefill (float): Seconds before the first token
+        token_rate (float): Tokens per second per request
+        completion_tokens (int): Tokens per response (before max_tokens)
+        startup (float): Seconds before /health reports ready (model loading)
+    """
+
+    def __init__(self, models=None, batch_size=BATCH_SIZE, prefill=PREFILL, token_rate=TOKEN_RATE,
+                 completion_tokens=COMPLETION_TOKENS, startup=0.0):
+        self.models = list(models) if models else None
+        self.batch_size = batch_size
+        self.prefill = prefill
+        self.token_rate = token_rate
+        self.completion_tokens = completion_tokens
+        self.startup = startup
+        self.started = time.monotonic()
+        self._slots = None
+        self.counts = {'requests': 0, 'completed': 0, 'aborted': 0, 'active': 0, 'waiting': 0, 'peak_active': 0}
+
+    @property
+    def ready(self):
+        return time.monotonic() - self.started >= self.startup
+
+    async def serve(self, host=HOST, port=PORT):
+        """Serve until cancelled."""
+        self._slots = asyncio.Semaphore(self.batch_size)
+        server = await asyncio.start_server(self._connection, host, port)
+        async with server:
+            await server.serve_forever()
+
+    async def _connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+                keep_alive = await self._route(method, path.split('?')[0], body, writer)
+                if not keep_alive or headers.get('connection', '').lower() == 'close':
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    def _send_json(self, writer, status, payload):
+        data = json.dumps(payload).encode('utf-8')
+        writer.write(f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(data)}\r\n\r\n".encode('latin-1') + data)
+
+    async def _route(self, method, path, body, writer):
+        """Handle one request; returns whether the connection stays open."""
+        if method == 'GET' and path == '/health':
+            self._send_json(writer, '200 OK' if self.ready else '503 Service Unavailable', {})
+        elif method == 'GET' and path == '/stats':
+            self._send_json(writer, '200 OK', self.counts)
+        elif method == 'GET' and path == '/v1/models':
+            self._send_json(writer, '200 OK', {'object': 'list', 'data': [
+                {'id': name, 'object': 'model', 'owned_by': 'mock'} for name in self.models or []]})
+        elif method == 'POST' and path == '/v1/chat/completions':
+            return await self._chat(json.loads(body or b'{}'), writer)
+        else:
+            self._send_json(writer, '404 Not Found', {'error': {'message': f"{method} {path} not found"}})
+        await writer.drain()
+        return True
+
+    async def _chat(self, request, writer):
+        model = request.get('model')
+        if not self.ready:
+            self._send_json(writer, '503 Service Unavailable', {'error': {'message': 'model is loading'}})
+            await writer.drain()
+            return True
+        if self.models is not None and model not in self.models:
+            self._send_json(writer, '404 Not Found', {'error': {'message': f"The model `{model}` does not exist."}})
+            await writer.drain()
+            return True
+
+        tokens = min(self.completion_tokens, request.get('max_tokens') or self.completion_tokens)
+        text = mock_atf(tokens)
+        usage = {'prompt_tokens': PROMPT_TOKENS, 'completion_tokens': tokens, 'total_tokens': PROMPT_TOKENS + tokens}
+        created = int(time.time())
+        completion_id = f"chatcmpl-mock-{self.counts['requests']}"
+        self.counts['requests'] += 1
+
+        self.counts['waiting'] += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.counts['waiting'] -= 1
+        self.counts['active'] += 1
+        self.counts['peak_active'] = max(self.counts['peak_active'], self.counts['active'])
+        try:
+            await asyncio.sleep(self.prefill)
+            if not request.get('stream'):
+                await asyncio.sleep(tokens / self.token_rate)
+                self._send_json(writer, '200 OK', {
+                    'id': completion_id, 'object': 'chat.completion', 'created': created, 'model': model,
+                    'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': text},
+                                 'finish_reason': 'length' if tokens == request.get('max_tokens') else 'stop'}],
+                    'usage': usage})
+                await writer.drain()
+                self.counts['completed'] += 1
+                return True
+
+            # Chunked server-sent events keep the connection reusable
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nTransfer-Encoding: chunked\r\n\r\n")
+
+            def event(payload):
+                data = f"data: {payload}\n\n".encode('utf-8')
+                writer.write(f"{len(data):x}\r\n".encode('latin-1') + data + b"\r\n")
+
+            # One chunk per space-separated piece (their concatenation is `text`), paced to `token_rate`
+            pieces = text.split(' ')
+            for i, word in enumerate(pieces):
+                content = word if i == 0 else ' ' + word
+                event(json.dumps({'id': completion_id, 'object': 'chat.completion.chunk', 'created': created,
+                                  'model': model, 'choices': [{'index': 0, 'delta': {'content': content},
+                                                               'finish_reason': None}]}))
+                await writer.drain()
+                await asyncio.sleep(tokens / self.token_rate / len(pieces))
+            if (request.get('stream_options') or {}).get('include_usage'):
+                event(json.dumps({'id': completion_id, 'object': 'chat.completion.chunk', 'created': created,
+                                  'model': model, 'choices': [], 'usage': usage}))
+            event('[DONE]')
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+            self.counts['completed'] += 1
+            return True
+        except ConnectionError:
+            self.counts['aborted'] += 1
+            return False
+        finally:
+            self.counts['active'] -= 1
+            self._slots.release()
@@ -0,0 +1,93 @@
+"""
+Image payloads for OCR requests.
+
+Uploads are often full-resolution camera photos. DeepSeek-OCR sees at most
+NATIVE_SIZE pixels on the long side (its "base" mode), so anything larger
+is only upload and decode cost. Each image is optionally cropped to the
+tablet (face segmentation on a small copy, so the black or paper background
+around the tablet is not sent), downsized to the native resolution, encoded
+once as JPEG and base64-encoded into a data URL. If the encoded image is
+over the size cap, quality and then resolution are lowered until it fits.
+"""
+
+import base64
+import io
+import time
+from collections import namedtuple
+
+from PIL import Image
+
+from images.face_segmentation import segment_image
+
+NATIVE_SIZE = 1024
+JPEG_QUALITY = 88
+MIN_QUALITY = 60
+QUALITY_STEP = 8
+# Encoded JPEG bytes (the base64 URL is 4/3 of this)
+MAX_PAYLOAD_BYTES = 750_000
+# Padding around the tablet, as a fraction of its box
+CROP_MARGIN = 0.03
+
+Payload = namedtuple('Payload', ['url', 'bytes', 'size', 'quality', 'encode_ms'])
+Payload.__doc__ = "An encoded request image: data URL, JPEG bytes, (width, height), JPEG quality, encode milliseconds."
+
+
+def tablet_box(image, margin=CROP_MARGIN):
+    """(left, top, right, bottom) around all segmented faces, or None if nothing was found."""
+    _, faces = segment_image(image)
+    if not faces:
+        return None
+    left = min(face.box[0] for face in faces)
+    top = min(face.box[1] for face in faces)
+    right = max(face.box[2] for face in faces)
+    bottom = max(face.box[3] for face in faces)
+    pad_x, pad_y = int((right - left) * margin), int((bottom - top) * margin)
+    width, height = image.size
+    return max(0, left - pad_x), max(0, top - pad_y), min(width, right + pad_x), min(height, bottom + pad_y)
+
+
+def _jpeg(image, quality):
+    buffered = io.BytesIO()
+    image.save(buffered, format='JPEG', quality=quality, optimize=True)
+    return buffered.getvalue()
+
+
+def encode_image(image, max_side=NATIVE_SIZE, quality=JPEG_QUALITY, max_bytes=MAX_PAYLOAD_BYTES,
+                 crop_background=False):
+    """
+    Encode a PIL image as a JPEG data URL for the OCR endpoint.
+
+    Args:
+        max_side (int): Longest edge after resizing; smaller images are not upscaled
+        quality (int): JPEG quality tried first
+        max_bytes (int): Cap on the encoded JPEG size
+        crop_background (bool): Crop to the segmented tablet first
+
+    Raises:
+        ValueError: If the image cannot be brought under `max_bytes`
+
+    Returns:
+        Payload
+    """
+    start = time.perf_counter()
+    image = image.convert('RGB')
+    if crop_background:
+        box = tablet_box(image)
+        if box is not None:
+            image = image.crop(box)
+    if max(image.size) > max_side:
+        image = image.copy()
+        image.thumbnail((max_side, max_side), Image.BICUBIC, reducing_gap=3.0)
+
+    data = _jpeg(image, quality)
+    while len(data) > max_bytes:
+        if quality - QUALITY_STEP >= MIN_QUALITY:
+            quality -= QUALITY_STEP
+        elif min(image.size) > 64:
+            image = image.resize((int(image.width * 0.8), int(image.height * 0.8)), Image.BICUBIC)
+        else:
+            raise ValueError(f"Image does not fit in {max_bytes} bytes")
+        data = _jpeg(image, quality)
+
+    url = 'data:image/jpeg;base64,' + base64.b64encode(data).decode('ascii')
+    return Payload(url, len(data), image.size, quality, (time.perf_counter() - start) * 1000)
@@ -0,0 +1,140 @@
+"""
+OCR result cache keyed by image content, model and prompt.
+
+The key hashes the decoded RGB pixels and size (so re-encoded or re-saved
+uploads of the same photo still match) together with the model name and
+the prompt. Results live in an in-memory LRU backed by one small JSON file
+per key on disk, which survives restarts. Concurrent requests for the same
+key share one computation.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_DIR = 'data/cache/ocr'
+CAPACITY = 512
+
+
+def result_key(image, model, prompt, options=None):
+    """Hex digest of an image's RGB pixels plus model, prompt and payload options (e.g. resize/crop settings)."""
+    digest = hashlib.blake2b(digest_size=20)
+    rgb = image.convert('RGB')
+    digest.update(f"{model}\0{prompt}\0{rgb.width}x{rgb.height}\0".encode('utf-8'))
+    if options:
+        digest.update(json.dumps(options, sort_keys=True).encode('utf-8'))
+    digest.update(rgb.tobytes())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    In-memory LRU over an on-disk store of OCR results.
+
+    Args:
+        cache_dir (str): Directory for `<key[:2]>/<key>.json`; None keeps results in memory only
+        capacity (int): Entries kept in memory
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, capacity=CAPACITY):
+        self.cache_dir = cache_dir
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.counts = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'shared': 0}
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _remember(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def _lookup(self, key):
+        """(value, 'memory' | 'disk') or (None, None), without counting."""
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key], 'memory'
+        if self.cache_dir and os.path.exists(self._path(key)):
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                value = json.load(f)
+            with self.lock:
+                self._remember(key, value)
+            return value, 'disk'
+        return None, None
+
+    def _count(self, name):
+        with self.lock:
+            self.counts[name] += 1
+
+    def get(self, key):
+        """Cached result dict for `key`, or None; counts a hit or miss."""
+        value, source = self._lookup(key)
+        self._count(f"{source}_hits" if value is not None else 'misses')
+        return value
+
+    def put(self, key, value):
+        value = dict(value, cached_at=time.time())
+        with self.lock:
+            self._remember(key, value)
+        if self.cache_dir:
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(value, f, ensure_ascii=False)
+            os.replace(path + '.tmp', path)
+        return value
+
+    async def get_or_compute(self, key, compute):
+        """
+        Cached result, or await `compute()` once and store its dict result.
+
+        A request for a key that is already being computed waits for that
+        computation; if it gets cancelled, the waiter computes it itself.
+
+        Returns:
+            tuple[dict, bool]: (result, whether it came from the cache)
+        """
+        value, source = self._lookup(key)
+        if value is not None:
+            self._count(f"{source}_hits")
+            return value, True
+        if key in self.pending:
+            self._count('shared')
+            future = self.pending[key]
+            try:
+                return await asyncio.shield(future), True
+            except asyncio.CancelledError:
+                if not future.cancelled() or asyncio.current_task().cancelling():
+                    raise
+            return await self.get_or_compute(key, compute)
+
+        self._count('misses')
+        future = asyncio.get_running_loop().create_future()
+        self.pending[key] = future
+        try:
+            value = self.put(key, await compute())
+            future.set_result(value)
+            return value, False
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved; there may be no waiters
+            raise
+        finally:
+            del self.pending[key]
+
+    def stats(self):
+        hits = self.counts['memory_hits'] + self.counts['disk_hits'] + self.counts['shared']
+        lookups = hits + self.counts['misses']
+        return dict(self.counts, hits=hits, entries=len(self.entries), hit_rate=round(hits / lookups, 3) if lookups else None)
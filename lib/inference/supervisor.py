@@ -0,0 +1,367 @@
+"""
+Supervisor for the OCR backends behind one OpenAI-compatible port.
+
+One backend process is started per model (vLLM, or tools/mock_server.py
+for CPU testing), each on its own port. The supervisor waits until a
+backend answers /health and lists its model, sends warmup requests with
+the OCR prompt (compilation, CUDA graphs, prefix cache) and only then opens
+the public port. Requests are routed by their `model` field and responses,
+streams included, are piped through unchanged; a client disconnect closes
+the backend connection, which aborts the generation. A monitor restarts
+backends that exit or fail consecutive health checks, with backoff; while
+one restarts, its requests get 503. A backend that answers health checks
+but failed its warmup is warmed again before it receives traffic.
+"""
+
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+from openai import OpenAIError
+from PIL import Image
+
+from .client import OCRClient, PROMPT
+from .payload import NATIVE_SIZE, encode_image
+
+HOST = '127.0.0.1'
+PORT = 8000
+GPU_MEMORY_UTILIZATION = 0.9
+# Model load + compilation can take minutes on first start
+STARTUP_TIMEOUT = 900.0
+HEALTH_INTERVAL = 5.0
+HEALTH_TIMEOUT = 5.0
+# Consecutive failed health checks before a running backend is restarted
+HEALTH_FAILURES = 3
+RESTART_BACKOFF = (1.0, 2.0, 5.0, 10.0, 30.0)
+WARMUP_REQUESTS = 2
+WARMUP_TOKENS = 16
+# Failures of a start attempt: process exit, startup timeout, connection or API errors during warmup
+START_ERRORS = (RuntimeError, TimeoutError, OSError, OpenAIError)
+MOCK_SERVER = os.path.join(os.path.dirname(__file__), '..', '..', 'tools', 'mock_server.py')
+
+
+def vllm_command(model, port, gpu_memory_utilization=GPU_MEMORY_UTILIZATION):
+    return [sys.executable, '-m', 'vllm.entrypoints.openai.api_server', '--model', model, '--host', HOST,
+            '--port', str(port), '--gpu-memory-utilization', str(gpu_memory_utilization)]
+
+
+def mock_command(model, port, *extra):
+    return [sys.executable, MOCK_SERVER, '--host', HOST, '--port', str(port), '--model', model, *extra]
+
+
+async def http_get(port, path, timeout=HEALTH_TIMEOUT):
+    """(status, JSON body or None) of a GET to a local port."""
+    async def request():
+        reader, writer = await asyncio.open_connection(HOST, port)
+        try:
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: {HOST}:{port}\r\nConnection: close\r\n\r\n".encode('latin-1'))
+            await writer.drain()
+            response = await reader.read()
+        finally:
+            writer.close()
+        head, _, body = response.partition(b'\r\n\r\n')
+        status = int(head.split(b' ', 2)[1])
+        try:
+            return status, json.loads(body) if body else None
+        except ValueError:
+            return status, None
+
+    return await asyncio.wait_for(request(), timeout)
+
+
+async def read_request(reader):
+    """(method, path, headers, body) of the next HTTP/1.1 request, or None at EOF."""
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    method, path, _ = request_line.decode('latin-1').split(' ', 2)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers.get('content-length', 0)))
+    return method, path.split('?')[0], headers, body
+
+
+def send_json(writer, status, payload):
+    data = json.dumps(payload).encode('utf-8')
+    writer.write(f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(data)}\r\n\r\n".encode('latin-1') + data)
+
+
+class Backend:
+    """
+    One model server process.
+
+    Args:
+        model (str): Model name requests are routed by
+        port (int): Port the process listens on
+        command (list[str]): Command line that starts it on that port
+    """
+
+    def __init__(self, model, port, command):
+        self.model = model
+        self.port = port
+        self.command = command
+        self.process = None
+        self.ready = False
+        self.restarts = 0
+        self.failures = 0
+        self.requests = 0
+
+    def start(self):
+        # Output goes to the supervisor's terminal, like the single server before
+        self.process = subprocess.Popen(self.command)
+
+    def stop(self, timeout=30):
+        self.ready = False
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+
+    @property
+    def alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    @property
+    def serving(self):
+        """Ready and still running: a crash is only noticed by the monitor on its next pass."""
+        return self.ready and self.alive
+
+    async def healthy(self):
+        """/health answers 200 and /v1/models lists the model."""
+        try:
+            status, _ = await http_get(self.port, '/health')
+            if status != 200:
+                return False
+            status, models = await http_get(self.port, '/v1/models')
+        except (OSError, asyncio.TimeoutError, ValueError, IndexError):
+            return False
+        return status == 200 and any(entry.get('id') == self.model for entry in (models or {}).get('data', []))
+
+    def state(self):
+        return {'model': self.model, 'port': self.port, 'pid': self.process.pid if self.process else None,
+                'ready': self.serving, 'alive': self.alive, 'restarts': self.restarts, 'requests': self.requests}
+
+
+class Supervisor:
+    """
+    Start, warm up, route to and keep alive a set of backends.
+
+    Args:
+        backends (list[Backend]): One per model
+        warmup_requests (int): Concurrent warmup requests per backend (0 to skip)
+        startup_timeout (float): Seconds a backend may take to become healthy
+    """
+
+    def __init__(self, backends, host='localhost', port=PORT, warmup_requests=WARMUP_REQUESTS,
+                 startup_timeout=STARTUP_TIMEOUT, health_interval=HEALTH_INTERVAL):
+        self.backends = {backend.model: backend for backend in backends}
+        self.host = host
+        self.port = port
+        self.warmup_requests = warmup_requests
+        self.startup_timeout = startup_timeout
+        self.health_interval = health_interval
+        # model -> running restart or re-warm task
+        self.recovering = {}
+        self.server = None
+
+    async def wait_ready(self, backend):
+        deadline = time.monotonic() + self.startup_timeout
+        while time.monotonic() < deadline:
+            if not backend.alive:
+                raise RuntimeError(f"{backend.model} exited with code {backend.process.returncode} while starting")
+            if await backend.healthy():
+                return
+            await asyncio.sleep(0.5)
+        raise TimeoutError(f"{backend.model} not ready after {self.startup_timeout:g}s")
+
+    async def warmup(self, backend):
+        """A few concurrent OCR requests on a blank tablet-sized image."""
+        if not self.warmup_requests:
+            return
+        payload = encode_image(Image.new('RGB', (NATIVE_SIZE, NATIVE_SIZE), (182, 160, 128)))
+        client = OCRClient(base_url=f"http://{HOST}:{backend.port}/v1", max_in_flight=self.warmup_requests,
+                           timeout=self.startup_timeout)
+        start = time.perf_counter()
+        await asyncio.gather(*(client.transcribe(payload.url, backend.model, PROMPT, WARMUP_TOKENS)
+                               for _ in range(self.warmup_requests)))
+        await client.client.close()
+        print(f"  {backend.model}: warmed up in {time.perf_counter() - start:.1f}s")
+
+    async def start_backend(self, backend):
+        start = time.perf_counter()
+        backend.start()
+        await self.wait_ready(backend)
+        await self.warmup(backend)
+        backend.failures = 0
+        backend.ready = True
+        print(f"  {backend.model}: ready on port {backend.port} after {time.perf_counter() - start:.1f}s")
+
+    async def restart(self, backend, reason):
+        """Stop and start a backend until it comes up, backing off between attempts."""
+        while True:
+            delay = RESTART_BACKOFF[min(backend.restarts, len(RESTART_BACKOFF) - 1)]
+            backend.restarts += 1
+            print(f"  {backend.model}: {reason}; restart #{backend.restarts} in {delay:g}s")
+            await asyncio.to_thread(backend.stop)
+            await asyncio.sleep(delay)
+            try:
+                await self.start_backend(backend)
+                return
+            except START_ERRORS as e:
+                reason = f"{type(e).__name__}: {e}"
+
+    async def rewarm(self, backend):
+        """Warm up a healthy backend that is not ready; failures count towards a restart."""
+        try:
+            await self.warmup(backend)
+        except START_ERRORS as e:
+            backend.failures += 1
+            print(f"  {backend.model}: warmup failed ({type(e).__name__}: {e})")
+            return
+        backend.failures = 0
+        backend.ready = True
+        print(f"  {backend.model}: ready on port {backend.port}")
+
+    async def monitor(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            for backend in self.backends.values():
+                task = self.recovering.get(backend.model)
+                if task is not None and not task.done():
+                    continue
+                if not backend.alive:
+                    reason = f"exited with code {backend.process.returncode}"
+                elif not await backend.healthy():
+                    backend.failures += 1
+                    if backend.failures < HEALTH_FAILURES:
+                        continue
+                    reason = f"{backend.failures} failed health checks"
+                elif backend.ready:
+                    backend.failures = 0
+                    continue
+                elif backend.failures < HEALTH_FAILURES:
+                    self.recovering[backend.model] = asyncio.ensure_future(self.rewarm(backend))
+                    continue
+                else:
+                    reason = f"{backend.failures} failed warmups"
+                backend.ready = False
+                backend.failures = 0
+                self.recovering[backend.model] = asyncio.ensure_future(self.restart(backend, reason))
+
+    async def run(self, ready=None):
+        """
+        Start every backend, then serve and supervise until cancelled.
+
+        Backends start one after another: concurrent vLLM startups on one
+        GPU would each profile memory while the other is loading.
+
+        Args:
+            ready (asyncio.Event): Set once the public port accepts requests
+        """
+        try:
+            for backend in self.backends.values():
+                print(f"Starting {backend.model} on port {backend.port}")
+                await self.start_backend(backend)
+            self.server = await asyncio.start_server(self._connection, self.host, self.port)
+            print(f"Serving {', '.join(self.backends)} on http://{self.host}:{self.port}/v1")
+            if ready is not None:
+                ready.set()
+            async with self.server:
+                await self.monitor()
+        finally:
+            for task in self.recovering.values():
+                task.cancel()
+            for backend in self.backends.values():
+                backend.stop()
+
+    async def _connection(self, reader, writer):
+        try:
+            while True:
+                request = await read_request(reader)
+                if request is None:
+                    break
+                keep_alive = await self._route(*request, writer)
+                if not keep_alive or request[2].get('connection', '').lower() == 'close':
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method, path, headers, body, writer):
+        """Handle one request; returns whether the client connection stays open."""
+        if method == 'GET' and path == '/health':
+            states = [backend.state() for backend in self.backends.values()]
+            send_json(writer, '200 OK' if all(s['ready'] for s in states) else '503 Service Unavailable',
+                      {'backends': states})
+        elif method == 'GET' and path == '/v1/models':
+            send_json(writer, '200 OK', {'object': 'list', 'data': [
+                {'id': model, 'object': 'model', 'owned_by': 'deep-cuneiform', 'ready': backend.serving}
+                for model, backend in self.backends.items()]})
+        elif method == 'POST' and path.startswith('/v1/'):
+            try:
+                request = json.loads(body or b'{}')
+            except ValueError:
+                request = None
+            model = request.get('model') if isinstance(request, dict) else None
+            backend = self.backends.get(model)
+            if not isinstance(request, dict):
+                send_json(writer, '400 Bad Request', {'error': {'message': 'The request body must be a JSON object'}})
+            elif backend is None:
+                send_json(writer, '404 Not Found', {'error': {
+                    'message': f"The model `{model}` does not exist. Served: {', '.join(self.backends)}"}})
+            elif not backend.serving:
+                send_json(writer, '503 Service Unavailable', {'error': {'message': f"`{model}` is not ready"}})
+            else:
+                backend.requests += 1
+                return await self._proxy(backend, method, path, headers, body, writer)
+        else:
+            send_json(writer, '404 Not Found', {'error': {'message': f"{method} {path} not found"}})
+        await writer.drain()
+        return True
+
+    async def _proxy(self, backend, method, path, headers, body, writer):
+        """Pipe one request and its response through; both connections close afterwards."""
+        try:
+            upstream_reader, upstream_writer = await asyncio.open_connection(HOST, backend.port)
+        except OSError:
+            send_json(writer, '502 Bad Gateway', {'error': {'message': f"`{backend.model}` is not reachable"}})
+            await writer.drain()
+            return True
+        try:
+            forwarded = {name: value for name, value in headers.items() if name not in ('connection', 'keep-alive')}
+            forwarded['content-length'] = str(len(body))
+            upstream_writer.write((f"{method} {path} HTTP/1.1\r\n" + ''.join(
+                f"{name}: {value}\r\n" for name, value in forwarded.items()) + "connection: close\r\n\r\n"
+            ).encode('latin-1') + body)
+            await upstream_writer.drain()
+
+            # Status line and headers, with the connection marked as closing
+            head = await upstream_reader.readuntil(b'\r\n\r\n')
+            lines = [line for line in head.decode('latin-1').split('\r\n')[:-2]
+                     if not line.lower().startswith(('connection:', 'keep-alive:'))]
+            writer.write(('\r\n'.join(lines) + '\r\nConnection: close\r\n\r\n').encode('latin-1'))
+            while True:
+                chunk = await upstream_reader.read(65536)
+                if not chunk:
+                    break
+                writer.write(chunk)
+                # Raises once the client is gone; closing upstream then aborts the generation
+                await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            pass
+        finally:
+            upstream_writer.close()
+        return False
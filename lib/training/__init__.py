@@ -0,0 +1,42 @@
+"""
+Training data pipeline: cached preprocessing, length-bucketed batching,
+batch collation, tar-shard streaming and ATF tokenizer extension.
+"""
+
+from .dataset_cache import DatasetCache, collect_samples, read_annotation, preprocess_batch
+from .collator import OCRDataCollator
+from .face_samples import face_samples, pair_faces
+from .line_samples import extract_face_lines, extract_line_samples, line_samples
+from .length_sampler import LengthBucketSampler, padding_efficiency, sequence_lengths
+from .bucketed_trainer import BucketedTrainer
+from .data_benchmark import run_data_benchmark
+from .tar_shards import ShardStream, ShardTransform, iter_shard, read_index, shard_paths, write_shards
+from .vocab_extension import extend_tokenizer, load_extension, resize_embeddings, trainable_token_indices
+
+__all__ = [
+    'DatasetCache',
+    'collect_samples',
+    'read_annotation',
+    'preprocess_batch',
+    'OCRDataCollator',
+    'face_samples',
+    'pair_faces',
+    'extract_face_lines',
+    'extract_line_samples',
+    'line_samples',
+    'LengthBucketSampler',
+    'padding_efficiency',
+    'sequence_lengths',
+    'BucketedTrainer',
+    'run_data_benchmark',
+    'ShardStream',
+    'ShardTransform',
+    'iter_shard',
+    'read_index',
+    'shard_paths',
+    'write_shards',
+    'extend_tokenizer',
+    'load_extension',
+    'resize_embeddings',
+    'trainable_token_indices'
+]
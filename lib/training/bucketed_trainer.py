@@ -0,0 +1,57 @@
+"""
+Trainer whose data loaders batch by sequence length.
+"""
+
+from torch.utils.data import DataLoader, IterableDataset
+from transformers import Trainer
+
+from .length_sampler import DEFAULT_NUM_BUCKETS, LengthBucketSampler, sequence_lengths
+
+
+class BucketedTrainer(Trainer):
+    """
+    transformers.Trainer with LengthBucketSampler batches for train and eval.
+
+    Iterable (streamed) datasets fall back to the standard loaders.
+
+    Args:
+        num_buckets (int): Length buckets (quantiles of the token lengths)
+        max_tokens (int): Optional token budget per batch (packing mode);
+            per_device_*_batch_size then caps the number of samples
+    """
+
+    def __init__(self, *args, num_buckets=DEFAULT_NUM_BUCKETS, max_tokens=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.num_buckets = num_buckets
+        self.max_tokens = max_tokens
+        self.samplers = {}
+
+    def _bucketed_loader(self, dataset, name, batch_size, shuffle):
+        sampler = self.samplers.get(name)
+        if sampler is None or len(sampler.lengths) != len(dataset):
+            sampler = LengthBucketSampler(
+                sequence_lengths(dataset), batch_size, num_buckets=self.num_buckets, max_tokens=self.max_tokens,
+                shuffle=shuffle, drop_last=self.args.dataloader_drop_last, seed=self.args.seed, name=name,
+            )
+            self.samplers[name] = sampler
+        loader = DataLoader(
+            dataset,
+            batch_sampler=sampler,
+            collate_fn=self.data_collator,
+            num_workers=self.args.dataloader_num_workers,
+            pin_memory=self.args.dataloader_pin_memory,
+        )
+        return self.accelerator.prepare(loader)
+
+    def get_train_dataloader(self):
+        if self.train_dataset is None:
+            raise ValueError("Trainer: training requires a train_dataset.")
+        if isinstance(self.train_dataset, IterableDataset):
+            return super().get_train_dataloader()
+        return self._bucketed_loader(self.train_dataset, 'train', self._train_batch_size, shuffle=True)
+
+    def get_eval_dataloader(self, eval_dataset=None):
+        dataset = eval_dataset if eval_dataset is not None else self.eval_dataset
+        if dataset is None or isinstance(dataset, (dict, str, IterableDataset)):
+            return super().get_eval_dataloader(eval_dataset)
+        return self._bucketed_loader(dataset, 'eval', self.args.eval_batch_size, shuffle=False)
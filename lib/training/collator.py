@@ -0,0 +1,51 @@
+"""
+Batch collation for preprocessed OCR samples.
+"""
+
+import numpy as np
+import torch
+
+from images.image_store import CLIP_MEAN, CLIP_STD, normalize
+
+
+class OCRDataCollator:
+    """
+    Pad token sequences (on the tokenizer's padding side) and stack pixel tensors.
+
+    If an ImageStore is given, pixels are not read from the features but
+    gathered by sample key from the memory-mapped uint8 store and normalized
+    per batch.
+    """
+
+    def __init__(self, tokenizer, label_pad_id=-100, image_store=None, image_mean=CLIP_MEAN, image_std=CLIP_STD):
+        self.pad_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id
+        self.padding_side = tokenizer.padding_side
+        self.label_pad_id = label_pad_id
+        self.image_store = image_store
+        self.image_mean = image_mean
+        self.image_std = image_std
+
+    def _pad(self, sequences, value, length):
+        padded = torch.full((len(sequences), length), value, dtype=torch.long)
+        for i, seq in enumerate(sequences):
+            seq = torch.as_tensor(seq, dtype=torch.long)
+            if self.padding_side == 'left':
+                padded[i, length - len(seq):] = seq
+            else:
+                padded[i, :len(seq)] = seq
+        return padded
+
+    def _pixels(self, features):
+        if self.image_store is not None:
+            batch = self.image_store.batch([f['key'] for f in features])
+            return torch.from_numpy(normalize(batch, self.image_mean, self.image_std))
+        return torch.from_numpy(np.stack([np.asarray(f['pixel_values'], dtype=np.float32) for f in features]))
+
+    def __call__(self, features):
+        length = max(len(f['input_ids']) for f in features)
+        return {
+            'input_ids': self._pad([f['input_ids'] for f in features], self.pad_id, length),
+            'attention_mask': self._pad([f['attention_mask'] for f in features], 0, length),
+            'labels': self._pad([f['labels'] for f in features], self.label_pad_id, length),
+            'pixel_values': self._pixels(features),
+        }
@@ -0,0 +1,111 @@
+"""
+CPU-only benchmark of the training data pipeline.
+
+Runs the same dataset, sampler and collator the Trainer would use, without
+a model, and times each stage:
+
+- fetch:   reading rows from the (cached) Arrow dataset
+- collate: padding / pixel gathering in OCRDataCollator
+- loader:  the full DataLoader with worker processes; `stall` is the time
+           the training loop spends blocked waiting for the next batch
+           (with `step_time` simulating the model's compute per batch)
+
+Streamed datasets (ShardStream) have no batch sampler; only the loader
+stage is timed for them, with plain batches of `batch_size`.
+"""
+
+import time
+
+from torch.utils.data import DataLoader
+
+
+def _batch_tokens(batch):
+    mask = batch['attention_mask']
+    return int(mask.sum()), int(mask.numel())
+
+
+def time_stages(dataset, collator, batches):
+    """Single-process fetch and collate time over a list of index batches."""
+    fetch = collate = 0.0
+    for indices in batches:
+        start = time.perf_counter()
+        rows = dataset.__getitems__(indices) if hasattr(dataset, '__getitems__') else [dataset[i] for i in indices]
+        if isinstance(rows, dict):  # datasets returns columns for a list of indices
+            rows = [dict(zip(rows, values)) for values in zip(*rows.values())]
+        fetch += time.perf_counter() - start
+        start = time.perf_counter()
+        collator(rows)
+        collate += time.perf_counter() - start
+    return fetch, collate
+
+
+def time_loader(dataset, collator, batch_sampler, num_workers=0, epochs=1, step_time=0.0, batch_size=1):
+    """
+    Iterate a DataLoader like a training loop would.
+
+    Returns:
+        dict: wall, stall, samples, real_tokens, padded_tokens, batches
+    """
+    if batch_sampler is None:
+        # Iterable datasets reshuffle via set_epoch, which needs fresh workers per epoch
+        loader = DataLoader(dataset, batch_size=batch_size, collate_fn=collator, num_workers=num_workers)
+    else:
+        loader = DataLoader(dataset, batch_sampler=batch_sampler, collate_fn=collator,
+                            num_workers=num_workers, persistent_workers=num_workers > 0)
+    stats = {'wall': 0.0, 'stall': 0.0, 'samples': 0, 'real_tokens': 0, 'padded_tokens': 0, 'batches': 0}
+    start = time.perf_counter()
+    for epoch in range(epochs):
+        if hasattr(dataset, 'set_epoch'):
+            dataset.set_epoch(epoch)
+        iterator = iter(loader)
+        while True:
+            waited = time.perf_counter()
+            try:
+                batch = next(iterator)
+            except StopIteration:
+                break
+            stats['stall'] += time.perf_counter() - waited
+            real, padded = _batch_tokens(batch)
+            stats['samples'] += len(batch['input_ids'])
+            stats['real_tokens'] += real
+            stats['padded_tokens'] += padded
+            stats['batches'] += 1
+            if step_time:
+                time.sleep(step_time)
+    stats['wall'] = time.perf_counter() - start
+    return stats
+
+
+def run_data_benchmark(dataset, collator, batch_sampler, num_workers=0, epochs=1, step_time=0.0, stage_times=None,
+                       batch_size=1):
+    """
+    Benchmark the pipeline and print a report.
+
+    Args:
+        batch_sampler: LengthBucketSampler, or None for iterable datasets
+        stage_times (dict): Already measured setup stages, e.g. {'load': s, 'preprocess': s}
+        batch_size (int): Batch size when there is no batch sampler
+
+    Returns:
+        dict: All measurements
+    """
+    report = dict(stage_times or {})
+    batches = batch_sampler.batches(0) if batch_sampler is not None else []
+    if batches:
+        report['fetch'], report['collate'] = time_stages(dataset, collator, batches)
+    loader = time_loader(dataset, collator, batch_sampler, num_workers, epochs, step_time, batch_size)
+
+    print("\nData pipeline benchmark (no model)")
+    for stage, seconds in report.items():
+        print(f"  {stage:<12} {seconds:>9.3f}s")
+    if batches:
+        per_batch = 1000 * (report['fetch'] + report['collate']) / len(batches)
+        print(f"  {'per batch':<12} {per_batch:>8.2f}ms  (fetch + collate)")
+    wall = loader['wall']
+    print(f"  loader ({num_workers} workers, {epochs} epoch{'s' if epochs != 1 else ''}, "
+          f"{1000 * step_time:.0f} ms simulated step): {wall:.3f}s")
+    print(f"    samples/s      {loader['samples'] / wall:>10.1f}")
+    print(f"    tokens/s       {loader['real_tokens'] / wall:>10.1f} real, {loader['padded_tokens'] / wall:.1f} padded")
+    print(f"    worker stall   {loader['stall']:>10.3f}s ({100 * loader['stall'] / wall:.1f}% of wall time)")
+    report['loader'] = loader
+    return report
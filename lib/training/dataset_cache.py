@@ -0,0 +1,253 @@
+"""
+Cached, incrementally updated pre-tokenized training dataset.
+
+Tokenized targets and processed pixel tensors are written to Arrow (via
+`datasets`) under a directory keyed by the tokenizer, the image-processor
+config, the prompt and the max length. Inside it, every sample is keyed by
+a hash of its source image + ATF file. Each build only processes samples
+that are new or whose source changed and stores them as a new chunk;
+superseded rows are dropped when the cache is compacted.
+
+With `include_pixels=False` only the token columns are cached; pixels then
+come from the memory-mapped image store (see lib/images/image_store.py).
+"""
+
+import hashlib
+import json
+import os
+import shutil
+
+from datasets import Dataset, concatenate_datasets, load_from_disk
+from PIL import Image
+
+CACHE_VERSION = 1
+CACHE_DIR = 'data/cache/dataset'
+MANIFEST_FILE = 'manifest.json'
+PROMPT = "User: Transcribe this cuneiform tablet in ATF format.\n"
+MAX_LENGTH = 2048
+MISSING_ANNOTATION = "# No annotation"
+IMAGE_EXTENSIONS = ('.jpg', '.png', '.jpeg')
+# Rewrite the cache into one chunk once less than this fraction of rows is live
+COMPACT_RATIO = 0.5
+
+
+def collect_samples(image_dir, ann_dir):
+    """
+    Pair every image with its ATF annotation.
+
+    Returns:
+        list[dict]: {'key', 'image', 'annotation'} sorted by key; the
+        annotation path may not exist
+    """
+    samples = []
+    for name in sorted(os.listdir(image_dir)):
+        if not name.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        key = os.path.splitext(name)[0]
+        samples.append({
+            'key': key,
+            'image': os.path.join(image_dir, name),
+            'annotation': os.path.join(ann_dir, f"{key}.atf"),
+        })
+    return samples
+
+
+def read_annotation(path):
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read().strip()
+    return MISSING_ANNOTATION
+
+
+def _stat(path):
+    if not os.path.exists(path):
+        return [0, -1]
+    stat = os.stat(path)
+    return [stat.st_mtime, stat.st_size]
+
+
+def source_hash(image_path, ann_path):
+    """SHA-1 over the image bytes and the annotation bytes."""
+    digest = hashlib.sha1()
+    for path in (image_path, ann_path):
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def config_key(tokenizer, image_processor, prompt=PROMPT, max_length=MAX_LENGTH, include_pixels=True):
+    """Hash of everything that changes the processed tensors."""
+    config = {
+        'include_pixels': include_pixels,
+        'version': CACHE_VERSION,
+        'tokenizer': getattr(tokenizer, 'name_or_path', type(tokenizer).__name__),
+        'vocab_size': len(tokenizer),
+        'image_processor': image_processor.to_dict(),
+        'prompt': prompt,
+        'max_length': max_length,
+    }
+    return hashlib.sha1(json.dumps(config, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:16]
+
+
+def preprocess_batch(batch, tokenizer, image_processor, prompt=PROMPT, max_length=MAX_LENGTH, include_pixels=True):
+    """
+    Tokenize prompt + ATF target and process images for a batch of samples.
+
+    Prompt tokens are masked out of the labels with -100.
+    """
+    prompt_ids = tokenizer(prompt, add_special_tokens=True)['input_ids']
+    input_ids, attention_mask, labels = [], [], []
+    for text in batch['text']:
+        target_ids = tokenizer(text, add_special_tokens=False)['input_ids'] + [tokenizer.eos_token_id]
+        ids = (prompt_ids + target_ids)[:max_length]
+        input_ids.append(ids)
+        attention_mask.append([1] * len(ids))
+        labels.append(([-100] * len(prompt_ids) + target_ids)[:max_length])
+
+    processed = {
+        'input_ids': input_ids,
+        'attention_mask': attention_mask,
+        'labels': labels,
+    }
+    if include_pixels:
+        images = []
+        for path in batch['image']:
+            with Image.open(path) as image:
+                images.append(image.convert('RGB'))
+        pixel_values = image_processor(images=images, return_tensors='np')['pixel_values']
+        processed['pixel_values'] = [pv for pv in pixel_values]
+    return processed
+
+
+class DatasetCache:
+    """On-disk cache of preprocessed samples for one preprocessing config."""
+
+    def __init__(self, tokenizer, image_processor, cache_root=CACHE_DIR, prompt=PROMPT, max_length=MAX_LENGTH,
+                 include_pixels=True):
+        self.tokenizer = tokenizer
+        self.image_processor = image_processor
+        self.prompt = prompt
+        self.max_length = max_length
+        self.include_pixels = include_pixels
+        key = config_key(tokenizer, image_processor, prompt, max_length, include_pixels)
+        self.cache_dir = os.path.join(cache_root, key)
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self):
+        path = os.path.join(self.cache_dir, MANIFEST_FILE)
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {'version': CACHE_VERSION, 'chunks': {}, 'entries': {}}
+
+    def _save_manifest(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = os.path.join(self.cache_dir, MANIFEST_FILE)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f)
+        os.replace(path + '.tmp', path)
+
+    def _next_chunk(self):
+        numbers = [int(name.split('_')[1]) for name in self.manifest['chunks']]
+        return f"chunk_{max(numbers, default=-1) + 1:05d}"
+
+    def _stale(self, samples):
+        """Samples whose source is new or changed, with their source hashes."""
+        entries = self.manifest['entries']
+        todo = []
+        for sample in samples:
+            stat = _stat(sample['image']) + _stat(sample['annotation'])
+            entry = entries.get(sample['key'])
+            if entry and entry['stat'] == stat:
+                continue
+            digest = source_hash(sample['image'], sample['annotation'])
+            if entry and entry['hash'] == digest:
+                entry['stat'] = stat  # touched but unchanged
+                continue
+            todo.append(dict(sample, hash=digest, stat=stat))
+        return todo
+
+    def build(self, samples, num_proc=None):
+        """
+        Return the preprocessed dataset for `samples`, processing only what
+        is not cached yet.
+
+        Args:
+            samples (list[dict]): Output of collect_samples()
+            num_proc (int): Worker processes for Dataset.map
+
+        Returns:
+            datasets.Dataset: One row per sample, in the order given, with
+            key, input_ids, attention_mask, labels and (if include_pixels)
+            pixel_values
+        """
+        todo = self._stale(samples)
+        if todo:
+            print(f"Preprocessing {len(todo)} new/changed samples ({len(samples) - len(todo)} cached)")
+            chunk = self._next_chunk()
+            raw = Dataset.from_dict({
+                'key': [s['key'] for s in todo],
+                'image': [s['image'] for s in todo],
+                'text': [read_annotation(s['annotation']) for s in todo],
+            })
+            processed = raw.map(
+                preprocess_batch,
+                batched=True,
+                batch_size=16,
+                num_proc=min(num_proc, len(todo)) if num_proc else None,
+                remove_columns=['image', 'text'],
+                fn_kwargs={
+                    'tokenizer': self.tokenizer,
+                    'image_processor': self.image_processor,
+                    'prompt': self.prompt,
+                    'max_length': self.max_length,
+                    'include_pixels': self.include_pixels,
+                },
+                desc='Preprocessing',
+            )
+            processed.save_to_disk(os.path.join(self.cache_dir, chunk))
+            self.manifest['chunks'][chunk] = len(processed)
+            for row, sample in enumerate(todo):
+                self.manifest['entries'][sample['key']] = {
+                    'chunk': chunk, 'row': row, 'hash': sample['hash'], 'stat': sample['stat'],
+                }
+        else:
+            print(f"All {len(samples)} samples cached in {self.cache_dir}")
+        self._save_manifest()
+
+        dataset = self._select(samples)
+        live = len(samples)
+        total = sum(self.manifest['chunks'].values())
+        if len(self.manifest['chunks']) > 1 and live < COMPACT_RATIO * total:
+            dataset = self._compact(samples, dataset)
+        return dataset
+
+    def _select(self, samples):
+        chunk_names = sorted(self.manifest['chunks'])
+        offsets = {}
+        start = 0
+        for name in chunk_names:
+            offsets[name] = start
+            start += self.manifest['chunks'][name]
+        full = concatenate_datasets([load_from_disk(os.path.join(self.cache_dir, name)) for name in chunk_names])
+        entries = self.manifest['entries']
+        indices = [offsets[entries[s['key']]['chunk']] + entries[s['key']]['row'] for s in samples]
+        return full.select(indices)
+
+    def _compact(self, samples, dataset):
+        """Rewrite live rows into a single chunk and delete the old ones."""
+        chunk = self._next_chunk()
+        dataset.flatten_indices().save_to_disk(os.path.join(self.cache_dir, chunk))
+        for name in list(self.manifest['chunks']):
+            shutil.rmtree(os.path.join(self.cache_dir, name), ignore_errors=True)
+        self.manifest['chunks'] = {chunk: len(samples)}
+        for row, sample in enumerate(samples):
+            entry = self.manifest['entries'][sample['key']]
+            entry['chunk'], entry['row'] = chunk, row
+        keys = {s['key'] for s in samples}
+        self.manifest['entries'] = {k: v for k, v in self.manifest['entries'].items() if k in keys}
+        self._save_manifest()
+        return load_from_disk(os.path.join(self.cache_dir, chunk))
@@ -0,0 +1,122 @@
+"""
+Face-level training samples: tablet face crops paired with their ATF surface.
+
+Each whole-tablet sample (photo + ATF file) is split into one sample per
+segmented face whose surface (`@obverse`, `@reverse`, edges) has numbered
+lines in the ATF. Crops and section ATF files are written once next to the
+segmentation cache and reused while the photo and the annotation are
+unchanged. Tablets whose photo layout cannot be matched to the ATF keep
+their whole-tablet sample.
+"""
+
+import os
+
+from PIL import Image
+
+from corpus import split_surfaces
+from images import segment_cached
+
+from .dataset_cache import read_annotation
+
+FACE_DIR = 'data/cache/faces'
+# Extra border around each face box, as a fraction of the box size
+CROP_MARGIN = 0.03
+CROP_QUALITY = 95
+
+
+def pair_faces(segmentation, sections):
+    """
+    Match segmented faces to ATF surface sections.
+
+    Fatcross layouts pair every named face that has a section. A single-face
+    photo is only trusted for tablets written on the obverse alone.
+
+    Returns:
+        list[dict]: Faces (from segment_cached()) that have a section
+    """
+    layout, faces = segmentation['layout'], segmentation['faces']
+    if layout == 'fatcross':
+        seen = set()
+        paired = []
+        for face in faces:
+            if face['surface'] in sections and face['surface'] not in seen:
+                seen.add(face['surface'])
+                paired.append(face)
+        return paired
+    if layout == 'single' and set(sections) == {'obverse'}:
+        return [faces[0]]
+    return []
+
+
+def _crop_box(box, size, margin):
+    width, height = size
+    left, top, right, bottom = box[0] * width, box[1] * height, box[2] * width, box[3] * height
+    pad_x, pad_y = margin * (right - left), margin * (bottom - top)
+    return (max(0, int(left - pad_x)), max(0, int(top - pad_y)),
+            min(width, int(right + pad_x + 0.5)), min(height, int(bottom + pad_y + 0.5)))
+
+
+def _is_fresh(path, sources):
+    if not os.path.exists(path):
+        return False
+    mtime = os.path.getmtime(path)
+    return all(not os.path.exists(src) or os.path.getmtime(src) <= mtime for src in sources)
+
+
+def face_samples(samples, face_dir=FACE_DIR, workers=None, margin=CROP_MARGIN):
+    """
+    Split whole-tablet samples into face samples.
+
+    Args:
+        samples (list[dict]): Output of collect_samples()
+        face_dir (str): Cache directory for segmentations, crops and section ATF
+        workers (int): Processes for segmenting new or changed photos
+
+    Returns:
+        list[dict]: {'key', 'image', 'annotation', 'tablet'[, 'surface']};
+        face keys are `<tablet key>.<surface>`
+    """
+    segmentations = segment_cached([s['image'] for s in samples], os.path.join(face_dir, 'segments'), workers)
+    crop_dir = os.path.join(face_dir, 'crops')
+    os.makedirs(crop_dir, exist_ok=True)
+
+    result = []
+    fallback = 0
+    pixels_before = pixels_after = 0
+    chars_before = chars_after = 0
+    for sample in samples:
+        segmentation = segmentations.get(sample['image'])
+        atf_text = read_annotation(sample['annotation'])
+        sections = split_surfaces(atf_text)
+        paired = pair_faces(segmentation, sections) if segmentation else []
+        with Image.open(sample['image']) as image:
+            size = image.size
+            pixels_before += size[0] * size[1]
+            chars_before += len(atf_text)
+            if not paired:
+                fallback += 1
+                pixels_after += size[0] * size[1]
+                chars_after += len(atf_text)
+                result.append(dict(sample, tablet=sample['key']))
+                continue
+            for face in paired:
+                surface = face['surface']
+                key = f"{sample['key']}.{surface}"
+                crop_path = os.path.join(crop_dir, f"{key}.jpg")
+                atf_path = os.path.join(crop_dir, f"{key}.atf")
+                box = _crop_box(face['box'], size, margin)
+                if not _is_fresh(crop_path, [sample['image']]):
+                    image.convert('RGB').crop(box).save(crop_path, quality=CROP_QUALITY)
+                if not _is_fresh(atf_path, [sample['annotation']]):
+                    with open(atf_path, 'w', encoding='utf-8') as f:
+                        f.write(f"@{surface}\n{sections[surface]}\n")
+                pixels_after += (box[2] - box[0]) * (box[3] - box[1])
+                chars_after += len(sections[surface])
+                result.append({'key': key, 'image': crop_path, 'annotation': atf_path,
+                               'tablet': sample['key'], 'surface': surface})
+
+    print(f"Face samples: {len(samples)} tablets -> {len(result)} samples "
+          f"({fallback} whole-tablet fallbacks), "
+          f"{100 * pixels_after / max(1, pixels_before):.0f}% of pixels, "
+          f"{chars_after / max(1, len(result)):.0f} vs {chars_before / max(1, len(samples)):.0f} target chars per sample")
+    return result
@@ -0,0 +1,147 @@
+"""
+Length-bucketed batch sampling for ATF targets.
+
+Transliterations range from a couple of lines to hundreds, so random
+batches are mostly padding. Samples are grouped into buckets by tokenized
+length (quantile boundaries), shuffled within their bucket each epoch and
+cut into batches; the batch order is shuffled again so training still sees
+all lengths throughout the epoch.
+
+With `max_tokens`, batches are packed instead of fixed-size: a bucket's
+samples are added to a batch until batch_size * longest sequence would
+exceed the token budget, so many short line-level samples share one batch
+while long tablets get small ones.
+"""
+
+import random
+
+import numpy as np
+import pyarrow.compute as pc
+
+DEFAULT_NUM_BUCKETS = 8
+
+
+def sequence_lengths(dataset, column='input_ids'):
+    """Token count per row of a (cached) datasets.Dataset, without decoding the lists in Python."""
+    # Only the length column: the cache also holds pixel_values, gigabytes that are not needed here
+    table = dataset.select_columns([column]).with_format('arrow')[:]
+    return pc.list_value_length(table[column]).to_numpy(zero_copy_only=False).astype(np.int64)
+
+
+def bucket_boundaries(lengths, num_buckets=DEFAULT_NUM_BUCKETS):
+    """Upper length boundaries at the length quantiles (deduplicated)."""
+    quantiles = np.linspace(0, 1, num_buckets + 1)[1:-1]
+    return np.unique(np.quantile(lengths, quantiles).astype(np.int64)) if len(lengths) else np.zeros(0, np.int64)
+
+
+def padding_efficiency(lengths, batches):
+    """
+    Fraction of padded batch positions that hold real tokens.
+
+    Returns:
+        tuple[float, int, int]: (efficiency, real tokens, padded tokens)
+    """
+    lengths = np.asarray(lengths)
+    real = padded = 0
+    for batch in batches:
+        batch_lengths = lengths[batch]
+        real += int(batch_lengths.sum())
+        padded += int(batch_lengths.max()) * len(batch)
+    return (real / padded if padded else 1.0), real, padded
+
+
+class LengthBucketSampler:
+    """
+    Batch sampler (for DataLoader(batch_sampler=...)) that groups samples of similar length.
+
+    Every pass over the sampler is one epoch with its own deterministic
+    shuffle (seed + epoch) and prints the epoch's padding efficiency next to
+    what unbucketed random batches would have had.
+    """
+
+    def __init__(self, lengths, batch_size, num_buckets=DEFAULT_NUM_BUCKETS, max_tokens=None,
+                 shuffle=True, drop_last=False, seed=0, name='train', verbose=True):
+        self.lengths = np.asarray(lengths, dtype=np.int64)
+        self.batch_size = batch_size
+        self.max_tokens = max_tokens
+        self.shuffle = shuffle
+        self.drop_last = drop_last
+        self.seed = seed
+        self.name = name
+        self.verbose = verbose
+        self.epoch = 0
+        self.boundaries = bucket_boundaries(self.lengths, num_buckets)
+        bucket_ids = np.searchsorted(self.boundaries, self.lengths, side='left')
+        self.buckets = [np.flatnonzero(bucket_ids == b) for b in range(len(self.boundaries) + 1)]
+        self.buckets = [b for b in self.buckets if len(b)]
+        self.history = []
+        self._num_batches = None
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+    def _split(self, indices):
+        """Cut one (shuffled) bucket into fixed-size or token-budget batches."""
+        if not self.max_tokens:
+            batches = [indices[i:i + self.batch_size] for i in range(0, len(indices), self.batch_size)]
+        else:
+            # Longest first so each batch's budget is set by its first sample
+            indices = indices[np.argsort(-self.lengths[indices], kind='stable')]
+            batches, current, longest = [], [], 0
+            for i in indices:
+                length = int(self.lengths[i])
+                if current and (max(longest, length) * (len(current) + 1) > self.max_tokens
+                                or len(current) >= self.batch_size):
+                    batches.append(current)
+                    current, longest = [], 0
+                current.append(int(i))
+                longest = max(longest, length)
+            if current:
+                batches.append(current)
+        if self.drop_last and batches and len(batches[-1]) < self.batch_size and not self.max_tokens:
+            batches = batches[:-1]
+        return [[int(i) for i in batch] for batch in batches]
+
+    def batches(self, epoch=None):
+        """All batches of one epoch (deterministic for a given seed and epoch)."""
+        rng = random.Random(self.seed + (self.epoch if epoch is None else epoch))
+        batches = []
+        for bucket in self.buckets:
+            indices = bucket.copy()
+            if self.shuffle:
+                rng.shuffle(indices)
+            batches.extend(self._split(indices))
+        if self.shuffle:
+            rng.shuffle(batches)
+        return batches
+
+    def report(self, batches, epoch):
+        """Padding efficiency of an epoch vs. random fixed-size batches."""
+        efficiency, real, padded = padding_efficiency(self.lengths, batches)
+        order = list(range(len(self.lengths)))
+        random.Random(self.seed + epoch).shuffle(order)
+        baseline, _, _ = padding_efficiency(
+            self.lengths, [order[i:i + self.batch_size] for i in range(0, len(order), self.batch_size)])
+        stats = {'epoch': epoch, 'batches': len(batches), 'real_tokens': real, 'padded_tokens': padded,
+                 'efficiency': efficiency, 'random_efficiency': baseline}
+        self.history.append(stats)
+        if self.verbose:
+            print(f"[{self.name}] epoch {epoch}: {len(batches)} batches, padding efficiency "
+                  f"{100 * efficiency:.1f}% (random batches: {100 * baseline:.1f}%), "
+                  f"{real} real / {padded} padded tokens")
+        return stats
+
+    def __iter__(self):
+        # A generator, so iterators that DataLoader creates but never consumes
+        # (multi-worker setup calls iter() twice) don't advance the epoch
+        epoch = self.epoch
+        self.epoch += 1
+        batches = self.batches(epoch)
+        self.report(batches, epoch)
+        yield from batches
+
+    def __len__(self):
+        # Batch count depends only on the lengths, not on the epoch's shuffle
+        if self._num_batches is None:
+            self._num_batches = len(self.batches(0))
+        return self._num_batches
@@ -0,0 +1,137 @@
+"""
+Line-level training samples: text-line crops aligned to numbered ATF lines.
+
+Every face sample (see face_samples.py) is split into columns and lines
+with the projection-profile detector and its ATF section's `@column` /
+numbered-line structure. Each line crop is written with a one-line ATF
+file and a confidence score for its alignment. Results are cached per face
+and collected in `lines.jsonl`, the line-level dataset index.
+"""
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+from corpus import split_columns
+from images.line_detection import detect_lines
+
+LINE_DIR = 'data/cache/lines'
+INDEX_FILE = 'lines.jsonl'
+MIN_CONFIDENCE = 0.3
+# Extra height around each band, as a fraction of the band height
+LINE_PADDING = 0.15
+CROP_QUALITY = 95
+# Columns of the reverse run right to left
+RIGHT_TO_LEFT_SURFACES = ('reverse',)
+
+
+def _mtimes(paths):
+    return [os.path.getmtime(p) if os.path.exists(p) else 0 for p in paths]
+
+
+def extract_face_lines(sample, line_dir=LINE_DIR):
+    """
+    Detect and crop the lines of one face sample.
+
+    Returns:
+        list[dict]: One record per ATF line with key, image, annotation,
+        tablet, surface, column, label, text, box and confidence. Lines the
+        detector could not place are left out.
+    """
+    with open(sample['annotation'], 'r', encoding='utf-8') as f:
+        columns = split_columns(f.read())
+    if not columns:
+        return []
+    crop_dir = os.path.join(line_dir, 'crops')
+    records = []
+    with Image.open(sample['image']) as image:
+        image = image.convert('RGB')
+        width, height = image.size
+        detected = detect_lines(image, [len(c) for c in columns],
+                                right_to_left=sample.get('surface') in RIGHT_TO_LEFT_SURFACES)
+        for col, (lines, boxes) in enumerate(zip(columns, detected)):
+            for row, ((label, text), (box, confidence)) in enumerate(zip(lines, boxes)):
+                left, top, right, bottom = box
+                pad = LINE_PADDING * (bottom - top)
+                crop_box = (int(left * width), max(0, int((top - pad) * height)),
+                            int(right * width), min(height, int((bottom + pad) * height + 0.5)))
+                key = f"{sample['key']}.c{col + 1}.l{row + 1:02d}"
+                image_path = os.path.join(crop_dir, f"{key}.jpg")
+                atf_path = os.path.join(crop_dir, f"{key}.atf")
+                image.crop(crop_box).save(image_path, quality=CROP_QUALITY)
+                with open(atf_path, 'w', encoding='utf-8') as f:
+                    f.write(text + '\n')
+                records.append({
+                    'key': key, 'image': image_path, 'annotation': atf_path,
+                    'tablet': sample['tablet'], 'surface': sample.get('surface'),
+                    'column': col + 1, 'label': label, 'text': text,
+                    'box': [round(v, 4) for v in box], 'confidence': round(confidence, 4),
+                })
+    return records
+
+
+def _extract_job(args):
+    sample, line_dir = args
+    try:
+        return sample['key'], extract_face_lines(sample, line_dir)
+    except (OSError, ValueError) as e:
+        print(f"Line extraction failed for {sample['key']}: {e}")
+        return sample['key'], []
+
+
+def extract_line_samples(samples, line_dir=LINE_DIR, workers=None):
+    """
+    Line records for all face samples, processing new or changed faces in a process pool.
+
+    Whole-tablet fallback samples (no 'surface') are skipped. The full set
+    of records is written to `<line_dir>/lines.jsonl`.
+
+    Returns:
+        list[dict]: Records from extract_face_lines(), in sample order
+    """
+    faces = [s for s in samples if s.get('surface')]
+    face_cache = os.path.join(line_dir, 'faces')
+    os.makedirs(face_cache, exist_ok=True)
+    os.makedirs(os.path.join(line_dir, 'crops'), exist_ok=True)
+
+    results, todo = {}, []
+    for sample in faces:
+        cache_file = os.path.join(face_cache, f"{sample['key']}.json")
+        sources = _mtimes([sample['image'], sample['annotation']])
+        if os.path.exists(cache_file):
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if cached['sources'] == sources:
+                results[sample['key']] = cached['lines']
+                continue
+        todo.append(sample)
+
+    if todo:
+        print(f"Extracting lines from {len(todo)} new/changed faces ({len(faces) - len(todo)} cached)")
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            jobs = [(sample, line_dir) for sample in todo]
+            for sample, (key, lines) in zip(todo, pool.map(_extract_job, jobs, chunksize=2)):
+                results[key] = lines
+                with open(os.path.join(face_cache, f"{key}.json"), 'w', encoding='utf-8') as f:
+                    json.dump({'sources': _mtimes([sample['image'], sample['annotation']]), 'lines': lines}, f)
+
+    records = [record for sample in faces for record in results.get(sample['key'], [])]
+    with open(os.path.join(line_dir, INDEX_FILE), 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    return records
+
+
+def line_samples(samples, line_dir=LINE_DIR, min_confidence=MIN_CONFIDENCE, workers=None):
+    """
+    Training samples from line crops whose alignment confidence is at least `min_confidence`.
+
+    Returns:
+        list[dict]: {'key', 'image', 'annotation', 'tablet', 'surface', 'confidence'}
+    """
+    records = extract_line_samples(samples, line_dir, workers)
+    kept = [r for r in records if r['confidence'] >= min_confidence]
+    print(f"Line samples: {len(kept)} of {len(records)} aligned lines with confidence >= {min_confidence}")
+    return [{k: r[k] for k in ('key', 'image', 'annotation', 'tablet', 'surface', 'confidence')} for r in kept]
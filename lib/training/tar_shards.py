@@ -0,0 +1,271 @@
+"""
+WebDataset-style tar shards of (image, ATF, metadata) samples.
+
+Each sample is stored as consecutive tar members sharing one key:
+`<key>.jpg` (or `.png`, the original encoded bytes), `<key>.atf` and
+`<key>.json`. Member keys contain no dots (WebDataset splits the extension
+at the first one); the real sample key is kept in the JSON. Shards are
+closed at a sample-count or byte limit, and `index.json` lists the shards
+of every split with their sample counts and sizes plus the shard of every
+key.
+
+ShardStream reads shards sequentially (one large read per shard instead of
+two small files per sample), interleaves them across DataLoader workers
+and shuffles samples through a bounded buffer. The synthetic line shards
+from lib/images/synthetic_lines.py use the same member layout and can be
+streamed the same way.
+"""
+
+import io
+import json
+import os
+import tarfile
+
+import numpy as np
+from torch.utils.data import IterableDataset, get_worker_info
+
+from .dataset_cache import MAX_LENGTH, PROMPT, preprocess_batch, read_annotation
+
+SHARD_DIR = 'data/shards'
+INDEX_FILE = 'index.json'
+MAX_SHARD_SAMPLES = 1000
+MAX_SHARD_BYTES = 256 << 20
+SHUFFLE_BUFFER = 1000
+# Sample fields that are file paths and are stored as members instead of metadata
+PATH_FIELDS = ('image', 'annotation')
+IMAGE_EXTENSIONS = ('jpg', 'png')
+TAR_BLOCK = 512
+READ_BUFFER = 1 << 20
+
+
+def member_key(key):
+    return key.replace('.', '_')
+
+
+def _add_member(tar, name, data):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mtime = 0
+    tar.addfile(info, io.BytesIO(data))
+
+
+class _ShardWriter:
+    """Writes numbered shards, starting a new one at the sample or byte limit."""
+
+    def __init__(self, shard_dir, prefix, max_samples, max_bytes):
+        self.shard_dir, self.prefix = shard_dir, prefix
+        self.max_samples, self.max_bytes = max_samples, max_bytes
+        self.shards = []
+        self.tar = None
+
+    def _open(self):
+        name = f"{self.prefix}-{len(self.shards):05d}.tar"
+        self.path = os.path.join(self.shard_dir, name)
+        self.tar = tarfile.open(self.path + '.tmp', 'w')
+        self.shards.append({'name': name, 'samples': 0, 'bytes': 0})
+
+    def close(self):
+        if self.tar is not None:
+            self.tar.close()
+            os.replace(self.path + '.tmp', self.path)
+            self.tar = None
+
+    def write(self, key, members):
+        size = sum(len(data) for _, data in members)
+        shard = self.shards[-1] if self.shards else None
+        if self.tar is None or shard['samples'] >= self.max_samples or shard['bytes'] + size > self.max_bytes:
+            self.close()
+            self._open()
+        for extension, data in members:
+            _add_member(self.tar, f"{member_key(key)}.{extension}", data)
+        self.shards[-1]['samples'] += 1
+        self.shards[-1]['bytes'] += size
+        return self.shards[-1]['name']
+
+
+def write_shards(splits, shard_dir=SHARD_DIR, max_samples=MAX_SHARD_SAMPLES, max_bytes=MAX_SHARD_BYTES):
+    """
+    Pack samples into tar shards and write index.json.
+
+    Args:
+        splits (dict[str, list[dict]]): Split name -> samples with 'key',
+            'image' and 'annotation' paths; every other field is stored as
+            metadata
+
+    Returns:
+        dict: The index
+    """
+    os.makedirs(shard_dir, exist_ok=True)
+    index = {'version': 1, 'splits': {}, 'keys': {}}
+    for split, samples in splits.items():
+        writer = _ShardWriter(shard_dir, split, max_samples, max_bytes)
+        for sample in samples:
+            extension = os.path.splitext(sample['image'])[1].lower().lstrip('.')
+            extension = 'jpg' if extension == 'jpeg' else extension
+            with open(sample['image'], 'rb') as f:
+                image_bytes = f.read()
+            meta = {k: v for k, v in sample.items() if k not in PATH_FIELDS}
+            meta['source'] = os.path.basename(sample['image'])
+            members = [
+                (extension, image_bytes),
+                ('atf', read_annotation(sample['annotation']).encode('utf-8')),
+                ('json', json.dumps(meta, ensure_ascii=False).encode('utf-8')),
+            ]
+            index['keys'][sample['key']] = writer.write(sample['key'], members)
+        writer.close()
+        index['splits'][split] = writer.shards
+    with open(os.path.join(shard_dir, INDEX_FILE + '.tmp'), 'w', encoding='utf-8') as f:
+        json.dump(index, f)
+    os.replace(os.path.join(shard_dir, INDEX_FILE + '.tmp'), os.path.join(shard_dir, INDEX_FILE))
+    return index
+
+
+def read_index(shard_dir=SHARD_DIR):
+    with open(os.path.join(shard_dir, INDEX_FILE), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def shard_paths(index, split, shard_dir=SHARD_DIR):
+    """(paths, sample count) of one split's shards."""
+    shards = index['splits'].get(split, [])
+    return [os.path.join(shard_dir, s['name']) for s in shards], sum(s['samples'] for s in shards)
+
+
+def iter_tar_members(path):
+    """
+    (name, bytes) of the regular files in a tar archive, read sequentially.
+
+    A minimal ustar reader: tarfile's header parsing costs more than the
+    I/O for shards of small members. GNU long names and pax `path` records
+    are honoured; other member types are skipped.
+    """
+    long_name = None
+    with open(path, 'rb', buffering=READ_BUFFER) as f:
+        while True:
+            header = f.read(TAR_BLOCK)
+            if len(header) < TAR_BLOCK or header == bytes(TAR_BLOCK):
+                return
+            size = int(header[124:136].rstrip(b'\0 ') or b'0', 8)
+            data = f.read(size)
+            f.read(-size % TAR_BLOCK)
+            kind = header[156:157]
+            if kind == b'L':
+                long_name = data.rstrip(b'\0').decode('utf-8')
+                continue
+            if kind == b'x':
+                for record in data.decode('utf-8').splitlines():
+                    if ' path=' in record:
+                        long_name = record.split(' path=', 1)[1]
+                continue
+            if kind not in (b'0', b'\0'):
+                long_name = None
+                continue
+            name = long_name or header[:100].rstrip(b'\0').decode('utf-8')
+            prefix = header[345:500].rstrip(b'\0').decode('utf-8') if header[257:262] == b'ustar' else ''
+            if prefix and not long_name:
+                name = f"{prefix}/{name}"
+            long_name = None
+            yield name, data
+
+
+def iter_shard(path):
+    """
+    Stream the samples of one shard in order.
+
+    Yields:
+        dict: {'key', 'image' (encoded bytes), 'atf', 'meta'}
+    """
+    current, sample = None, {}
+    for name, data in iter_tar_members(path):
+        key, _, extension = os.path.basename(name).partition('.')
+        if key != current:
+            if sample:
+                yield _finish(current, sample)
+            current, sample = key, {}
+        sample[extension] = data
+    if sample:
+        yield _finish(current, sample)
+
+
+def _finish(key, members):
+    meta = json.loads(members['json']) if 'json' in members else {}
+    image = next((members[e] for e in IMAGE_EXTENSIONS if e in members), None)
+    return {'key': meta.get('key', key), 'image': image, 'atf': members.get('atf', b'').decode('utf-8').strip(),
+            'meta': meta}
+
+
+class ShardStream(IterableDataset):
+    """
+    Iterable dataset over tar shards with a shuffle buffer.
+
+    Shard order is shuffled per epoch with the same seed in every worker,
+    then shards are dealt round-robin to DataLoader workers. Within a
+    worker, samples pass through a buffer of `shuffle_buffer` and a random
+    one is emitted as each new one arrives.
+
+    Args:
+        shards (list[str]): Shard paths
+        num_samples (int): Total samples (for __len__), e.g. from shard_paths()
+        transform (callable): Maps a raw sample from iter_shard() to features
+        shuffle (bool): Shuffle shard order and samples (off for eval)
+    """
+
+    def __init__(self, shards, num_samples, transform=None, shuffle=True, shuffle_buffer=SHUFFLE_BUFFER, seed=0):
+        self.shards = list(shards)
+        self.num_samples = num_samples
+        self.transform = transform
+        self.shuffle = shuffle
+        self.shuffle_buffer = shuffle_buffer
+        self.seed = seed
+        self.epoch = 0
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+    def __len__(self):
+        return self.num_samples
+
+    def _samples(self, shards):
+        for path in shards:
+            for sample in iter_shard(path):
+                yield self.transform(sample) if self.transform else sample
+
+    def __iter__(self):
+        info = get_worker_info()
+        worker, workers = (info.id, info.num_workers) if info else (0, 1)
+        shards = self.shards
+        if self.shuffle:
+            order = np.random.default_rng([self.seed, self.epoch]).permutation(len(shards))
+            shards = [shards[i] for i in order]
+        samples = self._samples(shards[worker::workers])
+        if not self.shuffle or self.shuffle_buffer <= 1:
+            yield from samples
+            return
+        rng = np.random.default_rng([self.seed, self.epoch, worker])
+        buffer = []
+        for sample in samples:
+            if len(buffer) < self.shuffle_buffer:
+                buffer.append(sample)
+                continue
+            i = rng.integers(len(buffer))
+            yield buffer[i]
+            buffer[i] = sample
+        rng.shuffle(buffer)
+        yield from buffer
+
+
+class ShardTransform:
+    """Tokenize and preprocess one raw shard sample, exactly like DatasetCache does."""
+
+    def __init__(self, tokenizer, image_processor, prompt=PROMPT, max_length=MAX_LENGTH):
+        self.tokenizer = tokenizer
+        self.image_processor = image_processor
+        self.prompt = prompt
+        self.max_length = max_length
+
+    def __call__(self, sample):
+        batch = {'text': [sample['atf']], 'image': [io.BytesIO(sample['image'])]}
+        processed = preprocess_batch(batch, self.tokenizer, self.image_processor, self.prompt, self.max_length)
+        features = {name: values[0] for name, values in processed.items()}
+        features['key'] = sample['key']
+        return features
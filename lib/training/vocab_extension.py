@@ -0,0 +1,187 @@
+"""
+Tokenizer vocabulary extension for frequent ATF signs and syllables.
+
+The base (DeepSeek) BPE splits ATF such as `1(N01) , GAL~a# UMUN2#` into
+many short pieces. Whitespace-delimited sign tokens (flags and breakage
+brackets removed) and hyphen-separated syllables are counted over the
+corpus, and the ones that save the most tokens (count x (pieces - 1)) are
+added to the tokenizer, each also with a leading space so that the space
+before a sign does not become a token of its own. Tokenization stays
+lossless; the flag after a sign (`#`) is simply tokenized on its own.
+
+The extension is saved as a regular tokenizer directory plus
+`atf_tokens.json`, which records the base tokenizer, the base-token pieces
+of every added token (used to initialise its embedding as the mean of the
+pieces) and the measured tokens-per-tablet statistics.
+"""
+
+import json
+import os
+import re
+from collections import Counter
+
+import numpy as np
+from tokenizers import AddedToken
+
+from corpus.atf_reader import LINE_RE
+
+TOKENIZER_DIR = 'models/tokenizer-atf'
+EXTENSION_FILE = 'atf_tokens.json'
+MAX_NEW_TOKENS = 2000
+MIN_COUNT = 5
+SIGN_STRIP_RE = re.compile(r'[\[\]⸢⸣<>_#?!*]')
+# Bare separators and breakage markers are left to the base tokenizer
+SKIP_TOKENS = {',', '...', 'x', 'X', '$', '[...]'}
+
+
+def mine_atf_tokens(texts):
+    """
+    Count sign tokens and syllables on the transliteration lines of ATF texts.
+
+    Returns:
+        Counter: token -> count; hyphenated words contribute the whole word
+        and each syllable
+    """
+    counts = Counter()
+    for text in texts:
+        for line in text.split('\n'):
+            match = LINE_RE.match(line.strip())
+            if not match:
+                continue
+            for word in match.group(2).split():
+                word = SIGN_STRIP_RE.sub('', word)
+                if not word or word in SKIP_TOKENS:
+                    continue
+                counts[word] += 1
+                parts = [p for p in word.split('-') if p]
+                if len(parts) > 1:
+                    counts.update(p for p in parts if p not in SKIP_TOKENS)
+    return counts
+
+
+def select_tokens(tokenizer, counts, max_new=MAX_NEW_TOKENS, min_count=MIN_COUNT):
+    """
+    Candidates ranked by estimated savings, count x (base pieces - 1).
+
+    Returns:
+        list[tuple[str, int, int]]: (token, count, base pieces) with positive
+        savings, at most `max_new`
+    """
+    vocab = tokenizer.get_vocab()
+    scored = []
+    for token, count in counts.items():
+        if count < min_count or token in vocab:
+            continue
+        pieces = len(tokenizer(' ' + token, add_special_tokens=False)['input_ids'])
+        if pieces > 1:
+            scored.append((count * (pieces - 1), token, count, pieces))
+    scored.sort(key=lambda item: (-item[0], item[1]))
+    return [(token, count, pieces) for _, token, count, pieces in scored[:max_new]]
+
+
+def extend_tokenizer(tokenizer, tokens):
+    """
+    Add ATF tokens (bare and space-prefixed) to a tokenizer in place.
+
+    Returns:
+        dict[str, list[int]]: added token -> its base-tokenizer ids
+    """
+    forms = [form for token in tokens for form in (token, ' ' + token)]
+    pieces = {form: tokenizer(form, add_special_tokens=False)['input_ids'] for form in forms}
+    tokenizer.add_tokens([AddedToken(form, normalized=False) for form in forms])
+    return pieces
+
+
+def token_counts(tokenizer, texts, batch_size=256):
+    """Number of tokens per text (no special tokens)."""
+    counts = []
+    for start in range(0, len(texts), batch_size):
+        encoded = tokenizer(texts[start:start + batch_size], add_special_tokens=False)['input_ids']
+        counts.extend(len(ids) for ids in encoded)
+    return np.array(counts, dtype=np.int64)
+
+
+def recommend_max_tokens(counts, quantile=0.99, margin=1.1, multiple=64):
+    """Per-tablet generation budget: the `quantile` of tokens per tablet plus `margin`, rounded up to `multiple`."""
+    if not len(counts):
+        return multiple
+    budget = float(np.quantile(counts, quantile)) * margin
+    return int(np.ceil(budget / multiple) * multiple)
+
+
+def describe(counts):
+    return {
+        'mean': round(float(counts.mean()), 1),
+        'median': float(np.median(counts)),
+        'p95': float(np.quantile(counts, 0.95)),
+        'p99': float(np.quantile(counts, 0.99)),
+        'max': int(counts.max()),
+        'total': int(counts.sum()),
+    }
+
+
+def save_extension(tokenizer, base_name, pieces, stats, out_dir=TOKENIZER_DIR):
+    """Save the extended tokenizer and atf_tokens.json to `out_dir`."""
+    os.makedirs(out_dir, exist_ok=True)
+    tokenizer.save_pretrained(out_dir)
+    with open(os.path.join(out_dir, EXTENSION_FILE), 'w', encoding='utf-8') as f:
+        json.dump({'base': base_name, 'tokens': pieces, 'stats': stats}, f, ensure_ascii=False, indent=1)
+
+
+def load_extension(tokenizer_dir=TOKENIZER_DIR):
+    """atf_tokens.json of an extended tokenizer directory, or None if there is none."""
+    path = os.path.join(tokenizer_dir, EXTENSION_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def resize_embeddings(model, tokenizer, extension):
+    """
+    Resize the model's embeddings to the extended vocabulary.
+
+    Each added token's input (and untied output) embedding starts as the
+    mean of its base pieces' embeddings instead of a random vector.
+
+    Returns:
+        list[int]: ids of the added tokens, for trainable_token_indices()
+    """
+    import torch
+
+    model.resize_token_embeddings(len(tokenizer), mean_resizing=False)
+    vocab = tokenizer.get_vocab()
+    new_ids = sorted(vocab[token] for token in extension['tokens'] if token in vocab)
+    matrices = [model.get_input_embeddings().weight]
+    output = model.get_output_embeddings()
+    if output is not None and output.weight.data_ptr() != matrices[0].data_ptr():
+        matrices.append(output.weight)
+    with torch.no_grad():
+        for token, piece_ids in extension['tokens'].items():
+            if token in vocab and piece_ids:
+                for weight in matrices:
+                    weight[vocab[token]] = weight[piece_ids].mean(dim=0)
+    return new_ids
+
+
+def trainable_token_indices(model, new_ids):
+    """
+    LoRA `trainable_token_indices` for added tokens.
+
+    Their input embedding rows are trained, and so are their output
+    embedding (lm_head) rows when the head is not tied to the input
+    embeddings; frozen at the mean initialisation, those rows would let the
+    model read the new tokens but hardly ever emit them.
+
+    Returns:
+        dict[str, list[int]] | None: module name -> token ids, None without new tokens
+    """
+    if not new_ids:
+        return None
+    names = {id(module): name.rsplit('.', 1)[-1] for name, module in model.named_modules()}
+    embeddings = model.get_input_embeddings()
+    indices = {names[id(embeddings)]: list(new_ids)}
+    output = model.get_output_embeddings()
+    if output is not None and output.weight.data_ptr() != embeddings.weight.data_ptr():
+        indices[names[id(output)]] = list(new_ids)
+    return indices
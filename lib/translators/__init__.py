@@ -6,10 +6,16 @@ from .base_translator import BaseTranslator
 from .sumerian_translator import SumerianTranslator
 from .akkadian_translator import AkkadianTranslator
 from .language_detector import detect_language
+from .language_router import route_atf, group_runs, translate_routed, detect_language_header, bucket_corpus
 
 __all__ = [
     'BaseTranslator',
     'SumerianTranslator',
     'AkkadianTranslator',
-    'detect_language'
+    'detect_language',
+    'route_atf',
+    'group_runs',
+    'translate_routed',
+    'detect_language_header',
+    'bucket_corpus'
 ]
@@ -0,0 +1,200 @@
+"""
+Per-line language routing for mixed-language ATF texts.
+
+`detect_language()` picks a single translator for a whole text. Bilingual
+tablets switch language mid-text (`#atf: lang` per section) and Akkadian
+lines embed Sumerograms between underscores (`_..._`), so this module tags
+every line/span with its own language in a single pass and batches
+contiguous runs per translator.
+"""
+
+import os
+import re
+from collections import namedtuple
+
+from .sumerian_translator import SumerianTranslator
+from .akkadian_translator import AkkadianTranslator
+
+# Default number of bytes read by the header-only mode
+HEADER_BYTES = 4096
+
+LANG_TAG_RE = re.compile(r'^#atf:\s*lang\s+(\S+)')
+SUMEROGRAM_RE = re.compile(r'_([^_]+)_')
+LINE_NUMBER_RE = re.compile(r'^\d+[\'"]*\.\s*')
+
+TRANSLATOR_CLASSES = {
+    'sumerian': SumerianTranslator,
+    'akkadian': AkkadianTranslator,
+}
+
+# A run of text in a single language. `line_no` is the 0-based index of the
+# source line so spans split out of one line can be stitched back together.
+LanguageSpan = namedtuple('LanguageSpan', ['language', 'line_no', 'text'])
+
+
+def language_from_tag(tag):
+    """Map an ATF `#atf: lang` code to a translator language, or None."""
+    tag = tag.lower()
+    if tag == 'sux' or tag.startswith('sux-'):
+        return 'sumerian'
+    if tag == 'akk' or tag.startswith('akk-'):
+        return 'akkadian'
+    if tag == 'qeb':
+        # Eblaite - Akkadian is the closest available dictionary stack
+        return 'akkadian'
+    return None
+
+
+def language_from_period(period):
+    """Period-based fallback used when no usable language tag is present."""
+    period_lower = period.lower()
+    if any(term in period_lower for term in ['old babylonian', 'middle babylonian', 'neo-assyrian', 'neo-babylonian', 'assyrian', 'babylonian', 'ebla']):
+        return 'akkadian'
+    return 'sumerian'
+
+
+def _split_sumerograms(line_no, text):
+    """Split an Akkadian line into Akkadian and Sumerian (`_..._`) spans."""
+    spans = []
+    pos = 0
+    for match in SUMEROGRAM_RE.finditer(text):
+        before = text[pos:match.start()].strip()
+        if before:
+            spans.append(LanguageSpan('akkadian', line_no, before))
+        spans.append(LanguageSpan('sumerian', line_no, match.group(1).strip()))
+        pos = match.end()
+    rest = text[pos:].strip()
+    if rest:
+        spans.append(LanguageSpan('akkadian', line_no, rest))
+    return spans
+
+
+def route_atf(atf_text, period=''):
+    """
+    Tag each transliteration line (or sub-line span) with its language.
+
+    A `#atf: lang` tag switches the language for all following lines until
+    the next tag; lines before the first usable tag use the period fallback.
+    Inside Akkadian lines, `_..._` Sumerograms become separate Sumerian spans.
+
+    Args:
+        atf_text (str): The ATF text content
+        period (str): Period information from metadata
+
+    Returns:
+        list[LanguageSpan]: Spans in reading order, without line numbers
+    """
+    current = language_from_period(period)
+    spans = []
+    for line_no, raw in enumerate(atf_text.split('\n')):
+        line = raw.strip()
+        if not line:
+            continue
+        tag = LANG_TAG_RE.match(line)
+        if tag:
+            current = language_from_tag(tag.group(1)) or current
+            continue
+        if line[0] in '@$#&>':
+            continue
+
+        text = LINE_NUMBER_RE.sub('', line)
+        if ' , ' in text:
+            # Lexical lists: quantity before the comma, signs after it
+            text = text.split(',', 1)[1].strip()
+        if not text:
+            continue
+
+        if current == 'akkadian' and '_' in text:
+            spans.extend(_split_sumerograms(line_no, text))
+        else:
+            spans.append(LanguageSpan(current, line_no, text))
+    return spans
+
+
+def group_runs(spans):
+    """
+    Batch spans into contiguous same-language runs.
+
+    Returns:
+        list[tuple[str, list[LanguageSpan]]]: (language, spans) in order
+    """
+    runs = []
+    for span in spans:
+        if runs and runs[-1][0] == span.language:
+            runs[-1][1].append(span)
+        else:
+            runs.append((span.language, [span]))
+    return runs
+
+
+def translate_routed(atf_text, period='', translators=None):
+    """
+    Translate a (possibly mixed-language) ATF text run by run.
+
+    Each translator is instantiated at most once and then applied to every
+    contiguous run of its language, so dictionary stacks are not reloaded
+    or switched per sign.
+
+    Args:
+        atf_text (str): The ATF text to translate
+        period (str): Period information for the fallback language
+        translators (dict): Optional cache of language -> translator
+            instances, reused across calls
+
+    Returns:
+        str: English translation, one line per transliteration line
+    """
+    if translators is None:
+        translators = {}
+
+    line_translations = {}
+    for language, run in group_runs(route_atf(atf_text, period)):
+        translator = translators.get(language)
+        if translator is None:
+            translator = TRANSLATOR_CLASSES[language]()
+            translators[language] = translator
+        for span in run:
+            words = []
+            for sign in span.text.split():
+                if sign.startswith('>>') or sign == '[...]':
+                    continue
+                translation, ann = translator.translate_sign(sign)
+                words.append(translation)
+            if words:
+                line_translations.setdefault(span.line_no, []).extend(words)
+
+    return '\n'.join(' '.join(line_translations[n]) for n in sorted(line_translations))
+
+
+def detect_language_header(atf_path, period='', max_bytes=HEADER_BYTES):
+    """
+    Header-only language detection for corpus bucketing.
+
+    Reads at most `max_bytes` from the start of the file and returns the
+    language of the first usable `#atf: lang` tag (or the period fallback).
+    """
+    with open(atf_path, 'r', encoding='utf-8', errors='ignore') as f:
+        head = f.read(max_bytes)
+    for line in head.split('\n'):
+        tag = LANG_TAG_RE.match(line.strip())
+        if tag:
+            language = language_from_tag(tag.group(1))
+            if language:
+                return language
+    return language_from_period(period)
+
+
+def bucket_corpus(atf_dir, max_bytes=HEADER_BYTES):
+    """
+    Group the `.atf` files of a directory by header language.
+
+    Returns:
+        dict[str, list[str]]: language -> sorted list of file paths
+    """
+    buckets = {}
+    for name in sorted(os.listdir(atf_dir)):
+        if not name.endswith('.atf'):
+            continue
+        path = os.path.join(atf_dir, name)
+        buckets.setdefault(detect_language_header(path, max_bytes=max_bytes), []).append(path)
+    return buckets
@@ -1,5 +1,56 @@
-def main():
-    print("running deep-cuneiform")
+"""
+deep-cuneiform command line: one entry point for the corpus tools.
+
+    deep-cuneiform <command> [args...]
+
+Each command runs the matching script under tools/ with the remaining
+arguments, so `deep-cuneiform translate --help` shows that tool's options.
+The tools and lib/ are not packaged: the entry point runs them from the
+checkout main.py lives in, so it needs an editable install (`uv sync`,
+`pip install -e .`).
+Only the standard library is imported until a command is chosen; the tool
+then imports what it needs, which keeps `--help`, typos and scripted
+invocations of the light commands cheap.
+"""
+
+import argparse
+import os
+import sys
+
+TOOLS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tools')
+
+# command -> (script under tools/, help)
+COMMANDS = {
+    'download': ('download_cdli.py', 'Download filtered CDLI images and annotations'),
+    'lookup': ('lookup_cdli.py', 'Look up CDLI artifact details by ID'),
+    'translate': ('translate_atf.py', 'Translate ATF text or an artifact by ID'),
+    'visualize': ('visualize_tablet.py', 'Render a tablet with ATF, glyphs and translations'),
+    'index': ('sign_index.py', 'Build and query the corpus-wide sign index'),
+    'eval': ('evaluate_ocr.py', 'Score predicted ATF against gold'),
+}
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    parser = argparse.ArgumentParser(
+        prog='deep-cuneiform', description='Cuneiform corpus, translation and OCR evaluation tools',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='commands:\n' + '\n'.join(f"  {name:<10} {help}" for name, (_, help) in COMMANDS.items()) +
+               '\n\nRun `deep-cuneiform <command> --help` for the options of a command.')
+    parser.add_argument('command', choices=COMMANDS, metavar='command', help='One of: ' + ', '.join(COMMANDS))
+    # Everything after the command belongs to the tool's own parser
+    args = parser.parse_args(argv[:1])
+
+    script, _ = COMMANDS[args.command]
+    path = os.path.join(TOOLS_DIR, script)
+    if not os.path.exists(path):
+        parser.exit(1, f"deep-cuneiform: {path} not found. The command runs the tools from a checkout of the "
+                       f"repository; install it in editable mode (`uv sync` or `pip install -e .`)\n")
+    with open(path, 'rb') as f:
+        code = compile(f.read(), path, 'exec')
+    # Run as the script itself (runpy.run_path would reset argv[0], and with it the tool's usage line)
+    sys.argv = [f"deep-cuneiform {args.command}", *argv[1:]]
+    exec(code, {'__name__': '__main__', '__file__': path})
 
 
 if __name__ == "__main__":
@@ -1,19 +1,42 @@
 import argparse
-import subprocess
+import asyncio
+import os
+import sys
+
+# Add lib to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'lib'))
+
+from inference.client import BASE_MODEL, FINETUNED_MODEL
+from inference.supervisor import GPU_MEMORY_UTILIZATION, PORT, WARMUP_REQUESTS, Backend, Supervisor, mock_command, vllm_command
+
 
 def main():
-    parser = argparse.ArgumentParser()
-    parser.add_argument('--model', type=str, default='unsloth/DeepSeek-OCR', help='Model path: base or models/sumerian-deepseek-ocr')
+    parser = argparse.ArgumentParser(description='Serve the OCR models behind one OpenAI-compatible endpoint')
+    parser.add_argument('--model', type=str, action='append', default=None,
+                        help=f'Model path, repeatable (default: {BASE_MODEL}, plus {FINETUNED_MODEL} if it exists)')
+    parser.add_argument('--host', default='localhost', help='Bind address (default: localhost)')
+    parser.add_argument('--port', type=int, default=PORT, help=f'Public port (default: {PORT})')
+    parser.add_argument('--gpu-memory-utilization', type=float, default=GPU_MEMORY_UTILIZATION,
+                        help=f'GPU memory fraction, split between the models (default: {GPU_MEMORY_UTILIZATION})')
+    parser.add_argument('--warmup', type=int, default=WARMUP_REQUESTS,
+                        help=f'Warmup requests per model before serving (default: {WARMUP_REQUESTS})')
+    parser.add_argument('--mock', action='store_true', help='Run tools/mock_server.py backends instead of vLLM (CPU testing)')
     args = parser.parse_args()
 
-    # Run vLLM OpenAI server
-    subprocess.run([
-        'python', '-m', 'vllm.entrypoints.openai.api_server',
-        '--model', args.model,
-        '--host', 'localhost',
-        '--port', '8000',
-        '--gpu-memory-utilization', '0.9'
-    ])
+    models = args.model or [BASE_MODEL] + ([FINETUNED_MODEL] if os.path.isdir(FINETUNED_MODEL) else [])
+    backends = []
+    for i, model in enumerate(models):
+        port = args.port + 1 + i
+        command = mock_command(model, port) if args.mock else \
+            vllm_command(model, port, args.gpu_memory_utilization / len(models))
+        backends.append(Backend(model, port, command))
+
+    supervisor = Supervisor(backends, args.host, args.port, warmup_requests=args.warmup)
+    try:
+        asyncio.run(supervisor.run())
+    except KeyboardInterrupt:
+        pass
+
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,57 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+# Add lib to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lib'))
+
+from inference import BASE_MODEL, OCRClient
+from inference.batch import iter_image_dir, iter_shard_images, run_batch
+from inference.client import BASE_URL, MAX_TOKENS, REQUEST_TIMEOUT
+
+# Paths
+IMAGES_DIR = 'data/images'
+PREDICTIONS_DIR = 'data/predictions'
+
+
+def default_output(model):
+    return os.path.join(PREDICTIONS_DIR, f"{model.strip('/').replace('/', '_')}.jsonl")
+
+
+def load_items(args):
+    if args.shards:
+        from training.tar_shards import read_index, shard_paths
+        paths, count = shard_paths(read_index(args.shards), args.split, args.shards)
+        print(f"{count} images in {len(paths)} {args.split} shards")
+        return iter_shard_images(paths)
+    return iter_image_dir(args.images)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Transliterate many images through the OCR endpoint started by serve.py')
+    parser.add_argument('--images', default=IMAGES_DIR, help=f'Image directory (default: {IMAGES_DIR})')
+    parser.add_argument('--shards', default=None, help='Read images from a tar shard directory instead')
+    parser.add_argument('--split', default='eval', help='Shard split with --shards (default: eval)')
+    parser.add_argument('--out', default=None, help=f'JSONL predictions, appended to and resumed (default: {PREDICTIONS_DIR}/<model>.jsonl)')
+    parser.add_argument('--base-url', default=BASE_URL, help=f'OpenAI-compatible endpoint (default: {BASE_URL})')
+    parser.add_argument('--model', default=BASE_MODEL, help=f'Served model name (default: {BASE_MODEL})')
+    parser.add_argument('--concurrency', type=int, default=16, help='Requests in flight (default: 16)')
+    parser.add_argument('--max-tokens', type=int, default=MAX_TOKENS, help=f'Tokens per transliteration (default: {MAX_TOKENS})')
+    parser.add_argument('--timeout', type=float, default=REQUEST_TIMEOUT, help=f'Seconds per request (default: {REQUEST_TIMEOUT:g})')
+    parser.add_argument('--restart', action='store_true', help='Delete existing output instead of resuming')
+    args = parser.parse_args()
+
+    out = args.out or default_output(args.model)
+    if args.restart and os.path.exists(out):
+        os.remove(out)
+    client = OCRClient(base_url=args.base_url, max_in_flight=args.concurrency, timeout=args.timeout)
+    stats = asyncio.run(run_batch(client, load_items(args), out, model=args.model, max_tokens=args.max_tokens,
+                                  concurrency=args.concurrency))
+    print(json.dumps(stats))
+    print(f"Predictions -> {out} (score with: python tools/evaluate_ocr.py {out})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add lib to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lib'))
+
+from corpus import (EncodedCorpus, SignVocabulary, encode_corpus, load_period_map, normalize_sign,
+                    unigram_counts, ngram_counts, cooccurrence_counts, period_distribution)
+
+# Paths
+ENCODED_DIR = 'data/encoded'
+CSV_PATH = 'data/cdli-gh-data/cdli_cat.csv'
+ANNOTATIONS_DIR = 'data/annotations'
+CDLI_DUMP = 'data/cdli-gh-data/cdliatf_unblocked.atf'
+
+
+def cmd_encode(args):
+    start = time.perf_counter()
+    sources = args.sources or [p for p in [ANNOTATIONS_DIR, CDLI_DUMP] if os.path.exists(p)]
+    vocab_path = os.path.join(args.corpus, 'vocab.json')
+    vocab = SignVocabulary.load(vocab_path) if os.path.exists(vocab_path) else None
+    corpus = encode_corpus(sources, args.corpus, load_period_map(CSV_PATH), vocab)
+    elapsed = time.perf_counter() - start
+    print(f"Encoded {corpus.num_tablets} tablets, {corpus.num_lines} lines, {corpus.num_tokens} tokens, "
+          f"{len(corpus.vocab)} signs in {elapsed:.2f}s -> {args.corpus}")
+
+
+def cmd_ngrams(args):
+    corpus = EncodedCorpus.load(args.corpus)
+    start = time.perf_counter()
+    if args.n == 1:
+        counts = unigram_counts(corpus)
+        order = np.argsort(-counts, kind='stable')[:args.top]
+        rows = [([i], counts[i]) for i in order if counts[i]]
+    else:
+        ngrams, counts = ngram_counts(corpus, args.n)
+        rows = list(zip(ngrams[:args.top], counts[:args.top]))
+    elapsed = time.perf_counter() - start
+    for ids, count in rows:
+        print(f"{count:>8}  {' '.join(corpus.vocab.decode(ids))}")
+    print(f"\n{args.n}-grams over {corpus.num_tokens} tokens in {1000 * elapsed:.1f} ms")
+
+
+def cmd_cooc(args):
+    corpus = EncodedCorpus.load(args.corpus)
+    start = time.perf_counter()
+    pairs, counts = cooccurrence_counts(corpus, window=args.window)
+    if args.sign:
+        sign_id = corpus.vocab.ids.get(normalize_sign(args.sign))
+        if sign_id is None:
+            print(f"Sign {args.sign} not in vocabulary")
+            return
+        mask = (pairs[:, 0] == sign_id) | (pairs[:, 1] == sign_id)
+        pairs, counts = pairs[mask], counts[mask]
+    elapsed = time.perf_counter() - start
+    for (a, b), count in zip(pairs[:args.top], counts[:args.top]):
+        print(f"{count:>8}  {corpus.vocab.signs[a]}  {corpus.vocab.signs[b]}")
+    print(f"\nCo-occurrence (window {args.window}) in {1000 * elapsed:.1f} ms")
+
+
+def cmd_periods(args):
+    corpus = EncodedCorpus.load(args.corpus)
+    start = time.perf_counter()
+    matrix = period_distribution(corpus)
+    elapsed = time.perf_counter() - start
+    totals = matrix.sum(axis=1)
+    for sign in args.signs:
+        sign_id = corpus.vocab.ids.get(normalize_sign(sign))
+        if sign_id is None:
+            print(f"Sign {sign} not in vocabulary")
+            continue
+        print(sign)
+        for p, period in enumerate(corpus.periods):
+            if matrix[p, sign_id]:
+                per_10k = 10000 * matrix[p, sign_id] / max(totals[p], 1)
+                print(f"  {period:<40} {matrix[p, sign_id]:>8}  ({per_10k:.1f} per 10k tokens)")
+    print(f"\nPer-period distribution in {1000 * elapsed:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Integer-encoded corpus and vectorized sign statistics')
+    parser.add_argument('--corpus', default=ENCODED_DIR, help=f'Encoded corpus directory (default: {ENCODED_DIR})')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    encode = subparsers.add_parser('encode', help='Encode ATF files into memory-mapped int32 arrays')
+    encode.add_argument('sources', nargs='*', help=f'ATF files or directories (default: {ANNOTATIONS_DIR} and {CDLI_DUMP} if present)')
+    encode.set_defaults(func=cmd_encode)
+
+    ngrams = subparsers.add_parser('ngrams', help='Most frequent sign n-grams')
+    ngrams.add_argument('--n', type=int, choices=[1, 2, 3], default=1, help='n-gram order (default: 1)')
+    ngrams.add_argument('--top', type=int, default=20, help='Number of rows to print (default: 20)')
+    ngrams.set_defaults(func=cmd_ngrams)
+
+    cooc = subparsers.add_parser('cooc', help='Sign co-occurrence within a window on the same line')
+    cooc.add_argument('sign', nargs='?', help='Restrict to pairs containing this sign')
+    cooc.add_argument('--window', type=int, default=2, help='Maximum distance between signs (default: 2)')
+    cooc.add_argument('--top', type=int, default=20, help='Number of rows to print (default: 20)')
+    cooc.set_defaults(func=cmd_cooc)
+
+    periods = subparsers.add_parser('periods', help='Per-period distribution of signs')
+    periods.add_argument('signs', nargs='+', help='Signs to report')
+    periods.set_defaults(func=cmd_periods)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -3,8 +3,15 @@ import csv
 import json
 import os
 import requests
+import sys
 import time
 
+# Add lib to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lib'))
+
+from images import ImageHashIndex, hash_bytes
+from images.hash_index import DEFAULT_MAX_DISTANCE, EXACT_MAX_DISTANCE
+
 # Create directories
 os.makedirs('data/images', exist_ok=True)
 os.makedirs('data/annotations', exist_ok=True)
@@ -17,6 +24,7 @@ TARGET_PERIODS = [
 TARGET_LANGUAGE = "Sumerian"  # Or "Akkadian"
 MIN_ATF_LENGTH = 100  # Minimum ATF length for quality
 STATE_FILE = 'data/download_state.json'  # For resumable downloads
+HASH_INDEX = 'data/index/image_hashes.npz'  # Perceptual hashes of stored images
 
 def load_state():
     if os.path.exists(STATE_FILE):
@@ -112,6 +120,8 @@ def main():
     parser.add_argument('--limit', type=int, default=None, help='Limit to N items')
     parser.add_argument('--resume', action='store_true', help='Resume from saved state')
     parser.add_argument('--artifact_id', type=str, help='Download ATF for a specific artifact ID')
+    parser.add_argument('--skip-duplicate-images', action='store_true',
+                        help=f'Do not store images within {EXACT_MAX_DISTANCE} pHash bits of a stored photo (re-encodes of it)')
     args = parser.parse_args()
 
     if args.artifact_id:
@@ -126,6 +136,10 @@ def main():
         print(f'Error: {csv_path} not found. Please clone cdli-gh-data repo.')
         return
 
+    # Perceptual hashes of images we already have, to flag re-used or re-scanned photos
+    hash_index = ImageHashIndex.load(HASH_INDEX)
+    hash_index.update('data/images')
+
     processed = 0
     downloaded_good = 0
 
@@ -201,9 +215,28 @@ def main():
                 try:
                     response = requests.get(img_url, timeout=10)
                     if response.status_code == 200:
-                        with open(img_path, 'wb') as f:
-                            f.write(response.content)
-                        print(f'  Downloaded image to {img_path}')
+                        matches = []
+                        try:
+                            d_hash, p_hash = hash_bytes(response.content)
+                            matches = hash_index.query(p_hash, DEFAULT_MAX_DISTANCE)
+                        except OSError:
+                            d_hash = p_hash = None
+                        if matches:
+                            # Similar photos are not necessarily the same tablet: record them for review
+                            duplicate, distance = matches[0]
+                            state[numeric_id]['duplicate_image_of'] = duplicate
+                            state[numeric_id]['duplicate_distance'] = int(distance)
+                        if matches and args.skip_duplicate_images and distance <= EXACT_MAX_DISTANCE:
+                            print(f'  Image is a re-encode of {duplicate} ({distance} bits) - not storing')
+                        else:
+                            with open(img_path, 'wb') as f:
+                                f.write(response.content)
+                            print(f'  Downloaded image to {img_path}')
+                            if matches:
+                                print(f'  Possible duplicate of {duplicate} ({distance} bits) - recorded for review')
+                            if p_hash is not None:
+                                stat = os.stat(img_path)
+                                hash_index.add(img_path, d_hash, p_hash, stat.st_mtime, stat.st_size)
                     else:
                         print(f'  Failed to download image: {response.status_code} (continuing without image)')
                 except Exception as e:
@@ -226,12 +259,14 @@ def main():
             # Save state periodically
             if processed % 10 == 0:
                 save_state(state)
+                hash_index.save(HASH_INDEX)
                 print(f'Saved state after {processed} processed items')
 
             # Rate limit
             time.sleep(1)
 
     save_state(state)
+    hash_index.save(HASH_INDEX)
     print(f'\nCompleted. Processed: {processed}, Good downloads: {downloaded_good}')
 
 if __name__ == '__main__':
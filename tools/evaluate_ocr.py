@@ -0,0 +1,100 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+# Add lib to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lib'))
+
+from evaluation import evaluate
+
+# Paths
+ANNOTATIONS_DIR = 'data/annotations'
+
+
+def load_atf_dir(path):
+    texts = {}
+    for name in sorted(os.listdir(path)):
+        if name.endswith('.atf'):
+            with open(os.path.join(path, name), 'r', encoding='utf-8') as f:
+                texts[os.path.splitext(name)[0]] = f.read()
+    return texts
+
+
+def load_predictions(path):
+    """key -> predicted ATF from a JSONL file ({'key', 'atf'} per line) or a directory of .atf files."""
+    if os.path.isdir(path):
+        return load_atf_dir(path)
+    predictions = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                if record.get('atf') is not None:
+                    predictions[record['key']] = record['atf']
+    return predictions
+
+
+def load_gold(args):
+    if args.shards:
+        # The training package pulls in torch/transformers; only shard gold needs it
+        from training.tar_shards import iter_shard, read_index, shard_paths
+
+        paths, _ = shard_paths(read_index(args.shards), args.split, args.shards)
+        return {sample['key']: sample['atf'] for path in paths for sample in iter_shard(path)}
+    return load_atf_dir(args.gold)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Score predicted ATF against gold: sign/line error rates and sign confusions')
+    parser.add_argument('pred', help='Predictions: JSONL with key/atf per line, or a directory of <key>.atf files')
+    parser.add_argument('--gold', default=ANNOTATIONS_DIR, help=f'Gold ATF directory (default: {ANNOTATIONS_DIR})')
+    parser.add_argument('--shards', default=None, help='Take gold ATF from a tar shard directory instead')
+    parser.add_argument('--split', default='eval', help='Shard split with --shards (default: eval)')
+    parser.add_argument('--missing-as-empty', action='store_true',
+                        help='Score gold samples without a prediction against empty output (default: skip them)')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: all CPUs)')
+    parser.add_argument('--top', type=int, default=20, help='Confusions to print (default: 20)')
+    parser.add_argument('--label', default=None, help='Checkpoint/run label stored in the report')
+    parser.add_argument('--out', default=None, help='Write the JSON report here')
+    args = parser.parse_args()
+
+    gold = load_gold(args)
+    predictions = load_predictions(args.pred)
+    missing = sorted(set(gold) - set(predictions))
+    # A subset or an interrupted batch leaves gold without predictions; only count them as empty output on request
+    pairs = [(key, predictions.get(key, ''), text) for key, text in gold.items()
+             if args.missing_as_empty or key in predictions]
+    if not pairs:
+        print(f"No predictions in {args.pred} match the {len(gold)} gold samples")
+        return
+
+    start = time.perf_counter()
+    report = evaluate(pairs, workers=args.workers)
+    elapsed = time.perf_counter() - start
+    report['summary'].update(label=args.label, missing=len(missing), missing_as_empty=args.missing_as_empty,
+                             extra=len(set(predictions) - set(gold)), seconds=round(elapsed, 3))
+
+    summary = report['summary']
+    print(f"{summary['samples']} samples scored in {elapsed:.2f}s")
+    if missing:
+        print(f"  {len(missing)} of {len(gold)} gold samples have no prediction: "
+              f"{'scored as empty output' if args.missing_as_empty else 'skipped (--missing-as-empty to score them)'}")
+    print(f"  SER {summary['ser']}  ({summary['sign_errors']} errors / {summary['gold_signs']} gold signs: "
+          f"{summary['substitutions']} sub, {summary['deletions']} del, {summary['insertions']} ins)")
+    print(f"  LER {summary['ler']}  ({summary['line_errors']} errors / {summary['gold_lines']} gold lines)")
+    if report['confusion']:
+        print("  Most frequent errors (gold -> predicted):")
+        for row in report['confusion'][:args.top]:
+            print(f"    {row['count']:>6}  {row['gold']} -> {row['pred']}")
+
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or '.', exist_ok=True)
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=1)
+        print(f"Report -> {args.out}")
+
+
+if __name__ == '__main__':
+    main()
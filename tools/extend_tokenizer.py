@@ -0,0 +1,68 @@
+import argparse
+import os
+import sys
+
+# Add lib to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lib'))
+
+from corpus import iter_atf_files, iter_tablets
+from training.vocab_extension import (MAX_NEW_TOKENS, MIN_COUNT, TOKENIZER_DIR, describe, extend_tokenizer,
+                                      mine_atf_tokens, recommend_max_tokens, save_extension, select_tokens,
+                                      token_counts)
+
+# Paths
+ANNOTATIONS_DIR = 'data/annotations'
+CDLI_DUMP = 'data/cdli-gh-data/cdliatf_unblocked.atf'
+BASE_TOKENIZER = 'deepseek-ai/DeepSeek-OCR'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Extend the OCR tokenizer with frequent ATF signs and syllables')
+    parser.add_argument('sources', nargs='*', help='ATF files or directories (default: annotations and CDLI dump if present)')
+    parser.add_argument('--base', default=BASE_TOKENIZER, help=f'Base tokenizer (default: {BASE_TOKENIZER})')
+    parser.add_argument('--max-new', type=int, default=MAX_NEW_TOKENS, help=f'Signs to add (default: {MAX_NEW_TOKENS})')
+    parser.add_argument('--min-count', type=int, default=MIN_COUNT, help=f'Minimum corpus count (default: {MIN_COUNT})')
+    parser.add_argument('--top', type=int, default=20, help='Added tokens to list (default: 20)')
+    parser.add_argument('--out', default=TOKENIZER_DIR, help=f'Output tokenizer directory (default: {TOKENIZER_DIR})')
+    parser.add_argument('--dry-run', action='store_true', help='Measure only, do not save')
+    args = parser.parse_args()
+
+    from transformers import AutoTokenizer
+
+    sources = args.sources or [p for p in (ANNOTATIONS_DIR, CDLI_DUMP) if os.path.exists(p)]
+    texts = [text for path in iter_atf_files(sources) for _, _, text in iter_tablets(path)]
+    if not texts:
+        print(f"No tablets found in {sources}")
+        return
+    tokenizer = AutoTokenizer.from_pretrained(args.base, trust_remote_code=True)
+    before = token_counts(tokenizer, texts)
+
+    counts = mine_atf_tokens(texts)
+    selected = select_tokens(tokenizer, counts, args.max_new, args.min_count)
+    pieces = extend_tokenizer(tokenizer, [token for token, _, _ in selected])
+    after = token_counts(tokenizer, texts)
+
+    print(f"{len(texts)} tablets, {len(counts)} distinct signs/syllables, {len(selected)} added "
+          f"({len(pieces)} tokens with space-prefixed forms); vocabulary {len(tokenizer)}")
+    for token, count, n in selected[:args.top]:
+        print(f"  {count:>8}  {n:>2} -> 1  {token}")
+
+    stats = {'before': describe(before), 'after': describe(after)}
+    print(f"\n{'tokens/tablet':<14}{'mean':>9}{'median':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+    for name in ('before', 'after'):
+        row = stats[name]
+        print(f"{name:<14}{row['mean']:>9.1f}{row['median']:>9.0f}{row['p95']:>9.0f}{row['p99']:>9.0f}{row['max']:>9}")
+    print(f"Total tokens: {stats['before']['total']} -> {stats['after']['total']} "
+          f"({100 * (1 - stats['after']['total'] / max(1, stats['before']['total'])):.1f}% fewer)")
+
+    stats['max_tokens'] = recommend_max_tokens(after)
+    print(f"Recommended per-tablet max_tokens: {stats['max_tokens']} "
+          f"(p99 + 10%; {100 * (after > stats['max_tokens']).mean():.1f}% of tablets longer)")
+
+    if not args.dry_run:
+        save_extension(tokenizer, args.base, pieces, stats, args.out)
+        print(f"Saved extended tokenizer to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
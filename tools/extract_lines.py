@@ -0,0 +1,49 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add lib to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lib'))
+
+from training import collect_samples, extract_line_samples, face_samples
+from training.face_samples import FACE_DIR
+from training.line_samples import INDEX_FILE, LINE_DIR, MIN_CONFIDENCE
+
+# Paths
+IMAGES_DIR = 'data/images'
+ANNOTATIONS_DIR = 'data/annotations'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the line-level dataset: line crops aligned to numbered ATF lines')
+    parser.add_argument('--images', default=IMAGES_DIR, help=f'Image directory (default: {IMAGES_DIR})')
+    parser.add_argument('--annotations', default=ANNOTATIONS_DIR, help=f'ATF directory (default: {ANNOTATIONS_DIR})')
+    parser.add_argument('--faces', default=FACE_DIR, help=f'Face crop cache (default: {FACE_DIR})')
+    parser.add_argument('--out', default=LINE_DIR, help=f'Output directory (default: {LINE_DIR})')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: all CPUs)')
+    parser.add_argument('--min-confidence', type=float, default=MIN_CONFIDENCE,
+                        help=f'Confidence threshold for the summary (default: {MIN_CONFIDENCE})')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    faces = face_samples(collect_samples(args.images, args.annotations), args.faces, workers=args.workers)
+    records = extract_line_samples(faces, args.out, workers=args.workers)
+    elapsed = time.perf_counter() - start
+
+    confidences = np.array([r['confidence'] for r in records])
+    kept = int((confidences >= args.min_confidence).sum())
+    print(f"{len(records)} line alignments from {sum(1 for f in faces if f.get('surface'))} faces "
+          f"in {elapsed:.2f}s -> {os.path.join(args.out, INDEX_FILE)}")
+    if len(records):
+        print(f"Confidence: mean {confidences.mean():.2f}, median {np.median(confidences):.2f}; "
+              f"{kept} lines >= {args.min_confidence}")
+        counts, edges = np.histogram(confidences, bins=5, range=(0, 1))
+        for count, low, high in zip(counts, edges[:-1], edges[1:]):
+            print(f"  {low:.1f}-{high:.1f}  {count}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+# Add lib to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lib'))
+
+from corpus import find_clusters, group_clusters, iter_atf_files, iter_tablets
+from corpus.dedup import DEFAULT_BANDS, DEFAULT_NUM_PERM, DEFAULT_SHINGLE, DEFAULT_THRESHOLD
+
+# Paths
+ANNOTATIONS_DIR = 'data/annotations'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Find clusters of near-duplicate ATF tablets (MinHash + LSH)')
+    parser.add_argument('sources', nargs='*', default=[ANNOTATIONS_DIR], help=f'ATF files or directories (default: {ANNOTATIONS_DIR})')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help=f'Minimum estimated Jaccard similarity (default: {DEFAULT_THRESHOLD})')
+    parser.add_argument('--num-perm', type=int, default=DEFAULT_NUM_PERM, help=f'MinHash signature length (default: {DEFAULT_NUM_PERM})')
+    parser.add_argument('--bands', type=int, default=DEFAULT_BANDS, help=f'LSH bands (default: {DEFAULT_BANDS})')
+    parser.add_argument('--shingle', type=int, default=DEFAULT_SHINGLE, help=f'Signs per shingle (default: {DEFAULT_SHINGLE})')
+    parser.add_argument('--output', help='Write clusters as JSONL to this file instead of stdout')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    tablets = []
+    texts = []
+    for path in iter_atf_files(args.sources):
+        for name, offset, text in iter_tablets(path):
+            tablets.append({'tablet': name, 'path': path, 'offset': offset})
+            texts.append(text)
+
+    cluster_ids = find_clusters(texts, threshold=args.threshold, num_perm=args.num_perm,
+                                bands=args.bands, shingle=args.shingle)
+    clusters = group_clusters(cluster_ids)
+    clusters.sort(key=len, reverse=True)
+    elapsed = time.perf_counter() - start
+
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        for i, members in enumerate(clusters):
+            record = {'cluster': i, 'size': len(members), 'members': [tablets[m] for m in members]}
+            out.write(json.dumps(record, ensure_ascii=False) + '\n')
+    finally:
+        if args.output:
+            out.close()
+
+    duplicates = sum(len(members) - 1 for members in clusters)
+    print(f"{len(tablets)} tablets, {len(clusters)} clusters, {duplicates} redundant tablets in {elapsed:.2f}s",
+          file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
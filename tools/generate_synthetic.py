@@ -0,0 +1,39 @@
+import argparse
+import os
+import sys
+
+# Add lib to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lib'))
+
+from images.synthetic_lines import CORPUS_FRACTION, FONT_DIR, OUTPUT_DIR, SHARD_SIZE, generate
+
+# Paths
+ANNOTATIONS_DIR = 'data/annotations'
+CDLI_DUMP = 'data/cdli-gh-data/cdliatf_unblocked.atf'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Render synthetic cuneiform line images from corpus ATF into tar shards')
+    parser.add_argument('sources', nargs='*', help='ATF files or directories (default: annotations and CDLI dump if present)')
+    parser.add_argument('--num-samples', type=int, default=100000, help='Samples to render (default: 100000)')
+    parser.add_argument('--shard-size', type=int, default=SHARD_SIZE, help=f'Samples per shard (default: {SHARD_SIZE})')
+    parser.add_argument('--seed', type=int, default=0, help='Run seed; sample i is always rendered the same way (default: 0)')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: all CPUs)')
+    parser.add_argument('--corpus-fraction', type=float, default=CORPUS_FRACTION,
+                        help=f'Share of samples from corpus lines vs. random sign sequences (default: {CORPUS_FRACTION})')
+    parser.add_argument('--fonts', default=FONT_DIR, help=f'Font directory (default: {FONT_DIR})')
+    parser.add_argument('--out', default=OUTPUT_DIR, help=f'Output directory (default: {OUTPUT_DIR})')
+    args = parser.parse_args()
+
+    sources = args.sources or [p for p in (ANNOTATIONS_DIR, CDLI_DUMP) if os.path.exists(p)]
+    stats = generate(sources, args.num_samples, args.out, args.shard_size, args.seed, args.workers,
+                     args.fonts, args.corpus_fraction)
+    elapsed = max(stats['elapsed'], 1e-9)
+    print(f"{stats['samples']} samples in {stats['shards']} shards ({stats['skipped']} existing shards kept) "
+          f"in {elapsed:.1f}s -> {args.out}")
+    if stats['samples']:
+        print(f"{stats['samples'] / elapsed:.0f} samples/s, {3600 * stats['samples'] / elapsed:,.0f} samples/hour")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+# Add lib to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lib'))
+
+from images import ImageHashIndex, hash_file
+from images.hash_index import DEFAULT_MAX_DISTANCE
+
+# Paths
+IMAGES_DIR = 'data/images'
+HASH_INDEX = 'data/index/image_hashes.npz'
+
+
+def cmd_build(args):
+    start = time.perf_counter()
+    index = ImageHashIndex.load(args.index)
+    hashed = index.update(args.images, workers=args.workers)
+    index.save(args.index)
+    print(f"Hashed {hashed} new/changed images ({len(index)} total) in {time.perf_counter() - start:.2f}s -> {args.index}")
+
+
+def cmd_dups(args):
+    index = ImageHashIndex.load(args.index)
+    start = time.perf_counter()
+    clusters = index.duplicate_clusters(args.max_distance)
+    elapsed = time.perf_counter() - start
+    for i, paths in enumerate(sorted(clusters, key=len, reverse=True)):
+        print(json.dumps({'cluster': i, 'size': len(paths), 'images': paths}))
+    print(f"{len(index)} images, {len(clusters)} duplicate clusters (<= {args.max_distance} bits) in {1000 * elapsed:.1f} ms",
+          file=sys.stderr)
+
+
+def cmd_query(args):
+    index = ImageHashIndex.load(args.index)
+    path, d, p = hash_file(args.image)
+    if d is None:
+        print(f"Could not read image {args.image}")
+        return
+    for match, distance in index.query(p, args.max_distance):
+        print(f"{distance:>3}  {match}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Perceptual-hash index for duplicate tablet images')
+    parser.add_argument('--index', default=HASH_INDEX, help=f'Hash index file (default: {HASH_INDEX})')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build = subparsers.add_parser('build', help='Hash new or changed images in a process pool')
+    build.add_argument('--images', default=IMAGES_DIR, help=f'Image directory (default: {IMAGES_DIR})')
+    build.add_argument('--workers', type=int, default=None, help='Worker processes (default: all CPUs)')
+    build.set_defaults(func=cmd_build)
+
+    for name, func, help_text in [('dups', cmd_dups, 'List clusters of near-duplicate images'),
+                                  ('query', cmd_query, 'Find indexed images similar to an image file')]:
+        sub = subparsers.add_parser(name, help=help_text)
+        if name == 'query':
+            sub.add_argument('image', help='Image file to look up')
+        sub.add_argument('--max-distance', type=int, default=DEFAULT_MAX_DISTANCE,
+                         help=f'Maximum pHash Hamming distance in bits (default: {DEFAULT_MAX_DISTANCE})')
+        sub.set_defaults(func=func)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add lib to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lib'))
+
+from images import ImageStore, build_image_store, load_pixels, normalize
+from images.image_store import DEFAULT_SIZE, STORE_DIR
+
+# Paths
+IMAGES_DIR = 'data/images'
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+def list_images(image_dir):
+    return [os.path.join(image_dir, name) for name in sorted(os.listdir(image_dir))
+            if name.lower().endswith(IMAGE_EXTENSIONS)]
+
+
+def cmd_build(args):
+    paths = list_images(args.images)
+    start = time.perf_counter()
+    store = build_image_store(paths, args.store, size=args.size, workers=args.workers)
+    elapsed = time.perf_counter() - start
+    megabytes = store.array.nbytes / 1e6
+    print(f"Stored {len(store)} images at {store.size}x{store.size} ({megabytes:.1f} MB) in {elapsed:.2f}s -> {args.store}")
+
+
+def _throughput(load_batch, batches):
+    start = time.perf_counter()
+    for keys in batches:
+        load_batch(keys)
+    elapsed = time.perf_counter() - start
+    return sum(len(keys) for keys in batches) / elapsed, elapsed
+
+
+def cmd_benchmark(args):
+    """Samples/s of memmap slicing vs decoding + resizing each image on the fly (CPU only)."""
+    store = ImageStore(args.store)
+    rng = np.random.default_rng(args.seed)
+    order = rng.integers(0, len(store), size=args.samples)
+    batches = [[store.keys[i] for i in order[start:start + args.batch_size]]
+               for start in range(0, len(order), args.batch_size)]
+    paths = dict(zip(store.keys, store.paths))
+
+    def from_files(keys):
+        return normalize(np.stack([load_pixels(paths[key], store.size) for key in keys]))
+
+    def from_store(keys):
+        return normalize(store.batch(keys))
+
+    print(f"{args.samples} random samples, batch size {args.batch_size}, {store.size}x{store.size}")
+    for name, load_batch in [('decode on the fly', from_files), ('memmap store', from_store)]:
+        rate, elapsed = _throughput(load_batch, batches)
+        print(f"  {name:<18} {rate:>10.1f} samples/s  ({elapsed:.2f}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Memory-mapped uint8 store of preprocessed tablet images')
+    parser.add_argument('--store', default=STORE_DIR, help=f'Store directory (default: {STORE_DIR})')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build = subparsers.add_parser('build', help='Decode, resize and crop all images into the store')
+    build.add_argument('--images', default=IMAGES_DIR, help=f'Image directory (default: {IMAGES_DIR})')
+    build.add_argument('--size', type=int, default=DEFAULT_SIZE, help=f'Model input resolution (default: {DEFAULT_SIZE})')
+    build.add_argument('--workers', type=int, default=None, help='Worker processes (default: all CPUs)')
+    build.set_defaults(func=cmd_build)
+
+    bench = subparsers.add_parser('benchmark', help='Compare store slicing with on-the-fly decoding')
+    bench.add_argument('--samples', type=int, default=200, help='Samples to load (default: 200)')
+    bench.add_argument('--batch-size', type=int, default=8, help='Batch size (default: 8)')
+    bench.add_argument('--seed', type=int, default=0)
+    bench.set_defaults(func=cmd_benchmark)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+import numpy as np
+
+# Add lib to path
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.join(ROOT, 'lib'))
+
+from inference import BASE_MODEL, OCRClient, ResultCache
+from inference.batch import iter_image_dir, run_batch
+
+# Paths
+IMAGES_DIR = 'data/images'
+MOCK_SERVER = os.path.join(ROOT, 'tools', 'mock_server.py')
+
+
+def wait_healthy(base_url, timeout=30.0):
+    """Poll <server>/health until it answers 200."""
+    health = base_url.rstrip('/').removesuffix('/v1') + '/health'
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(health, timeout=1) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            pass
+        time.sleep(0.1)
+    raise TimeoutError(f"{health} not healthy after {timeout}s")
+
+
+def start_mock(args):
+    """Run tools/mock_server.py as a separate process, so it does not share the client's CPU time slice."""
+    command = [sys.executable, MOCK_SERVER, '--port', str(args.mock_port), '--batch-size', str(args.batch_size),
+               '--prefill', str(args.prefill), '--token-rate', str(args.token_rate), '--tokens', str(args.tokens)]
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{args.mock_port}/v1"
+    wait_healthy(base_url)
+    return process, base_url
+
+
+async def closed_loop(request, count, concurrency):
+    """Run `request(i)` for i < count with `concurrency` workers; returns the per-request results and wall time."""
+    results = []
+    indices = iter(range(count))
+
+    async def worker():
+        for i in indices:
+            results.append(await request(i))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return results, time.perf_counter() - start
+
+
+async def load_client(args, base_url):
+    """Raw OCRClient.transcribe() with a tiny payload: client + server overhead only."""
+    client = OCRClient(base_url=base_url, max_in_flight=args.concurrency)
+    url = 'data:image/jpeg;base64,' + '/' * 1024
+
+    async def request(i):
+        start = time.perf_counter()
+        _, usage = await client.transcribe(url, args.model)
+        return {'latency': time.perf_counter() - start, 'tokens': usage.get('completion_tokens') or 0}
+
+    return await closed_loop(request, args.requests, args.concurrency)
+
+
+async def load_infer(args, base_url):
+    """The Gradio handler end to end (payload, streaming, enrichment), without the result cache."""
+    # app.py lives in the repository root; importing it builds the Blocks UI but does not launch it
+    sys.path.insert(0, ROOT)
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app
+    from PIL import Image
+
+    # Same in-flight limit as the demo: --concurrency is the number of simultaneous users
+    app.client = OCRClient(base_url=base_url, max_in_flight=app.MAX_IN_FLIGHT, timeout=app.REQUEST_TIMEOUT)
+    app.cache = ResultCache(None, capacity=0)
+    images = []
+    for _, data in iter_image_dir(args.images):
+        image = Image.open(io.BytesIO(data))
+        image.load()
+        images.append(image)
+        if len(images) >= args.distinct:
+            break
+    if len(images) < args.concurrency:
+        print(f"Only {len(images)} distinct images for {args.concurrency} workers: identical concurrent requests share one generation")
+
+    async def request(i):
+        start = time.perf_counter()
+        first = None
+        async for _ in app.infer(images[i % len(images)], args.model != BASE_MODEL, True, args.line_parallel, args.columns):
+            first = first or time.perf_counter() - start
+        return {'latency': time.perf_counter() - start, 'ttft': first}
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        return await closed_loop(request, args.requests, args.concurrency)
+
+
+async def load_batch(args, base_url):
+    """inference.batch.run_batch() over the image directory (cycled to --requests images)."""
+    images = []
+    for key, data in iter_image_dir(args.images):
+        images.append((key, data))
+        if len(images) >= args.distinct:
+            break
+    items = ((f"{images[i % len(images)][0]}-{i}", images[i % len(images)][1]) for i in range(args.requests))
+    client = OCRClient(base_url=base_url, max_in_flight=args.concurrency)
+    with tempfile.TemporaryDirectory() as tmp:
+        out = os.path.join(tmp, 'predictions.jsonl')
+        start = time.perf_counter()
+        await run_batch(client, items, out, model=args.model, concurrency=args.concurrency, progress_interval=None)
+        elapsed = time.perf_counter() - start
+        with open(out, 'r', encoding='utf-8') as f:
+            records = [json.loads(line) for line in f]
+    return [{'latency': r['seconds'], 'tokens': (r.get('usage') or {}).get('completion_tokens') or 0,
+             'error': r.get('error')} for r in records], elapsed
+
+
+def summarize(results, elapsed):
+    latencies = np.array([r['latency'] for r in results]) * 1000
+    summary = {'requests': len(results), 'errors': sum(1 for r in results if r.get('error')),
+               'seconds': round(elapsed, 3), 'requests_per_s': round(len(results) / elapsed, 2)}
+    for q in (50, 95, 99):
+        summary[f"p{q}_ms"] = round(float(np.percentile(latencies, q)), 1)
+    if any('tokens' in r for r in results):
+        summary['tokens_per_s'] = round(sum(r.get('tokens', 0) for r in results) / elapsed, 1)
+    ttft = [r['ttft'] * 1000 for r in results if r.get('ttft')]
+    if ttft:
+        summary['ttft_p50_ms'] = round(float(np.percentile(ttft, 50)), 1)
+        summary['ttft_p95_ms'] = round(float(np.percentile(ttft, 95)), 1)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test the OCR client paths against a (mock) OpenAI-compatible server')
+    parser.add_argument('target', choices=['client', 'infer', 'batch'],
+                        help='client: raw OCRClient requests; infer: app.infer end to end; batch: inference.batch')
+    parser.add_argument('--base-url', default=None, help='Existing server (default: start tools/mock_server.py)')
+    parser.add_argument('--model', default=BASE_MODEL, help=f'Model name (default: {BASE_MODEL})')
+    parser.add_argument('--requests', type=int, default=200, help='Requests in total (default: 200)')
+    parser.add_argument('--concurrency', type=int, default=16, help='Requests in flight (default: 16)')
+    parser.add_argument('--images', default=IMAGES_DIR, help=f'Images for infer/batch (default: {IMAGES_DIR})')
+    parser.add_argument('--distinct', type=int, default=64, help='Distinct images to cycle through (default: 64)')
+    parser.add_argument('--line-parallel', action='store_true', help='infer: line-parallel mode')
+    parser.add_argument('--columns', type=int, default=1, help='infer: columns with --line-parallel (default: 1)')
+    parser.add_argument('--out', default=None, help='Write the JSON summary here')
+    mock = parser.add_argument_group('mock server')
+    mock.add_argument('--mock-port', type=int, default=8765, help='Port (default: 8765)')
+    mock.add_argument('--batch-size', type=int, default=64, help='Requests generating at once (default: 64)')
+    mock.add_argument('--prefill', type=float, default=0.05, help='Seconds to first token (default: 0.05)')
+    mock.add_argument('--token-rate', type=float, default=200.0, help='Tokens/s per request (default: 200)')
+    mock.add_argument('--tokens', type=int, default=48, help='Tokens per response (default: 48)')
+    args = parser.parse_args()
+
+    process = None
+    base_url = args.base_url
+    if base_url is None:
+        process, base_url = start_mock(args)
+    try:
+        runner = {'client': load_client, 'infer': load_infer, 'batch': load_batch}[args.target]
+        results, elapsed = asyncio.run(runner(args, base_url))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    summary = dict(summarize(results, elapsed), target=args.target, concurrency=args.concurrency)
+    print(f"{args.target}: {summary['requests']} requests ({summary['errors']} errors) at concurrency "
+          f"{args.concurrency} in {summary['seconds']}s -> {summary['requests_per_s']} req/s")
+    print(f"  latency p50 {summary['p50_ms']} ms, p95 {summary['p95_ms']} ms, p99 {summary['p99_ms']} ms")
+    if 'ttft_p50_ms' in summary:
+        print(f"  first output p50 {summary['ttft_p50_ms']} ms, p95 {summary['ttft_p95_ms']} ms")
+    if 'tokens_per_s' in summary:
+        print(f"  {summary['tokens_per_s']} generated tokens/s")
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or '.', exist_ok=True)
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=1)
+        print(f"Summary -> {args.out}")
+
+
+if __name__ == '__main__':
+    main()
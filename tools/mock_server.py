@@ -0,0 +1,34 @@
+import argparse
+import asyncio
+import os
+import sys
+
+# Add lib to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lib'))
+
+from inference.mock_server import BATCH_SIZE, COMPLETION_TOKENS, PREFILL, TOKEN_RATE, MockServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mock OpenAI/vLLM chat completions server for CPU-only testing')
+    parser.add_argument('--host', default='127.0.0.1', help='Bind address (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8000, help='Port (default: 8000, like serve.py)')
+    parser.add_argument('--model', action='append', default=None, help='Served model name (repeatable; default: any)')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help=f'Requests generating at once (default: {BATCH_SIZE})')
+    parser.add_argument('--prefill', type=float, default=PREFILL, help=f'Seconds to first token (default: {PREFILL})')
+    parser.add_argument('--token-rate', type=float, default=TOKEN_RATE, help=f'Tokens/s per request (default: {TOKEN_RATE:g})')
+    parser.add_argument('--tokens', type=int, default=COMPLETION_TOKENS, help=f'Tokens per response (default: {COMPLETION_TOKENS})')
+    parser.add_argument('--startup', type=float, default=0.0, help='Seconds until /health is ready (default: 0)')
+    args = parser.parse_args()
+
+    server = MockServer(args.model, args.batch_size, args.prefill, args.token_rate, args.tokens, args.startup)
+    print(f"Mock server on http://{args.host}:{args.port}/v1 (batch {args.batch_size}, prefill {args.prefill}s, "
+          f"{args.token_rate:g} tokens/s, {args.tokens} tokens)", flush=True)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+# Add lib to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lib'))
+
+from corpus import SignIndex, parse_tablet, read_tablet_at
+
+# Paths
+INDEX_DIR = 'data/index/signs'
+ANNOTATIONS_DIR = 'data/annotations'
+CDLI_DUMP = 'data/cdli-gh-data/cdliatf_unblocked.atf'
+
+
+def build_index(sources, index_dir, rebuild=False):
+    start = time.perf_counter()
+    index = SignIndex() if rebuild else SignIndex.load(index_dir)
+    added, removed = index.update(sources)
+    index.save(index_dir)
+    elapsed = time.perf_counter() - start
+    live = len(index.docs) - len(index.deleted)
+    print(f"Indexed {added} tablets ({removed} removed) in {elapsed:.2f}s")
+    print(f"Index: {live} tablets, {len(index.signs)} signs -> {index_dir}")
+
+
+def show_line(hit_info):
+    """Return the matching line (label and signs) from the source file."""
+    text = read_tablet_at(hit_info['path'], hit_info['offset'])
+    lines = parse_tablet(text)
+    if hit_info['line'] < len(lines):
+        surface, label, signs = lines[hit_info['line']]
+        return f"{label}. {' '.join(signs)}"
+    return ''
+
+
+def query_index(index_dir, query, limit, show, as_json):
+    start = time.perf_counter()
+    index = SignIndex.load(index_dir)
+    loaded = time.perf_counter()
+    try:
+        hits = index.search(query, limit=limit)
+    except ValueError as e:
+        print(e)
+        return
+    done = time.perf_counter()
+
+    results = [index.describe(hit) for hit in hits]
+    if as_json:
+        for info in results:
+            if show:
+                info['text'] = show_line(info)
+            print(json.dumps(info, ensure_ascii=False))
+        return
+
+    tablets = len({info['tablet'] for info in results})
+    for info in results:
+        location = f"{info['tablet']}  {info['surface']}  line {info['line'] + 1}  pos {info['position'] + 1}"
+        if show:
+            location += f"  |  {show_line(info)}"
+        print(location)
+    truncated = ' (limit reached)' if limit is not None and len(results) >= limit else ''
+    print(f"\n{len(results)} matches{truncated} in {tablets} tablets "
+          f"(load {1000 * (loaded - start):.1f} ms, query {1000 * (done - loaded):.1f} ms)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build and query the corpus-wide ATF sign index')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build = subparsers.add_parser('build', help='Build or incrementally update the index')
+    build.add_argument('sources', nargs='*', help=f'ATF files or directories (default: {ANNOTATIONS_DIR} and {CDLI_DUMP} if present)')
+    build.add_argument('--index', default=INDEX_DIR, help=f'Index directory (default: {INDEX_DIR})')
+    build.add_argument('--rebuild', action='store_true', help='Discard the existing index and rebuild from scratch')
+
+    query = subparsers.add_parser('query', help='Search for a sign, wildcard or sign sequence')
+    query.add_argument('query', help='e.g. "lugal", "gal~*", "|giszxdin| lugal", "en * lugal"')
+    query.add_argument('--index', default=INDEX_DIR, help=f'Index directory (default: {INDEX_DIR})')
+    query.add_argument('--limit', type=int, default=100, help='Maximum number of matches, 0 for all (default: 100)')
+    query.add_argument('--show', action='store_true', help='Print the matching line from the source file')
+    query.add_argument('--json', action='store_true', help='Output one JSON object per match')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        sources = args.sources or [p for p in [ANNOTATIONS_DIR, CDLI_DUMP] if os.path.exists(p)]
+        build_index(sources, args.index, rebuild=args.rebuild)
+    else:
+        query_index(args.index, args.query, args.limit or None, args.show, args.json)
+
+
+if __name__ == '__main__':
+    main()
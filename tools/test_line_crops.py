@@ -0,0 +1,65 @@
+import argparse
+import os
+import sys
+
+from PIL import Image, ImageDraw
+
+# Add lib to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lib'))
+
+from images.line_detection import detect_lines, estimate_line_counts
+
+
+def synthetic_face(left_lines, right_lines, size=(800, 600)):
+    """Two-column face: rows of wedge-like ticks on a light tablet over a dark background."""
+    width, height = size
+    image = Image.new('RGB', size, (20, 20, 20))
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((40, 30, width - 40, height - 30), fill=(190, 170, 140))
+    top, bottom = 60, height - 60
+    for (x0, x1), lines in (((70, width // 2 - 30), left_lines), ((width // 2 + 30, width - 70), right_lines)):
+        pitch = (bottom - top) / lines
+        for i in range(lines):
+            y = top + i * pitch
+            for x in range(x0, x1, 12):
+                draw.rectangle((x, y + pitch * 0.2, x + 4, y + pitch * 0.75), fill=(70, 55, 40))
+    return image
+
+
+def check_column_order(left_lines, right_lines, right_to_left):
+    """Column 1 in ATF order is the right column on a right-to-left face, and gets that column's line count."""
+    image = synthetic_face(left_lines, right_lines)
+    counts = estimate_line_counts(image, 2, right_to_left)
+    detected = detect_lines(image, counts, right_to_left)
+    first_lines = right_lines if right_to_left else left_lines
+    second_lines = left_lines if right_to_left else right_lines
+    errors = []
+    if [len(boxes) for boxes in detected] != counts:
+        errors.append(f"detected {[len(boxes) for boxes in detected]} lines for counts {counts}")
+    if (counts[0] > counts[1]) != (first_lines > second_lines):
+        errors.append(f"counts {counts} are not in ATF order for {first_lines}/{second_lines} lines")
+    if detected[0] and (detected[0][0][0][0] >= 0.4) != right_to_left:
+        errors.append(f"first column starts at x={detected[0][0][0][0]:.2f}")
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check line counts and column order of line detection on synthetic faces')
+    parser.parse_args()
+
+    failures = 0
+    for left_lines, right_lines in ((3, 6), (6, 3), (4, 8)):
+        for right_to_left in (False, True):
+            label = f"{left_lines}+{right_lines} lines, {'right to left' if right_to_left else 'left to right'}"
+            errors = check_column_order(left_lines, right_lines, right_to_left)
+            failures += bool(errors)
+            print(f"{'FAIL' if errors else 'ok  '} {label}" + ''.join(f"\n     {error}" for error in errors))
+
+    if failures:
+        print(f"{failures} checks failed")
+        sys.exit(1)
+    print("All checks passed")
+
+
+if __name__ == '__main__':
+    main()
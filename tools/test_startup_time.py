@@ -0,0 +1,64 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Paths
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+MAIN = os.path.join(ROOT, 'main.py')
+
+COMMANDS = ['download', 'lookup', 'translate', 'visualize', 'index', 'eval']
+# Seconds over a bare `python -c pass`: the dispatcher alone, and `<command> --help`
+# (a regression to importing torch/transformers up front costs several seconds)
+DISPATCH_BUDGET = 0.1
+COMMAND_BUDGET = 0.5
+
+
+def startup_time(command, runs):
+    """Median wall time of running `command` to completion."""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+        times.append(time.perf_counter() - start)
+        if result.returncode != 0:
+            raise RuntimeError(f"{' '.join(command[1:])} failed:\n{result.stderr.strip()}")
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check the deep-cuneiform CLI startup time against a budget')
+    parser.add_argument('--runs', type=int, default=5, help='Runs per command, median taken (default: 5)')
+    parser.add_argument('--dispatch-budget', type=float, default=DISPATCH_BUDGET,
+                        help=f'Seconds over bare interpreter start for `--help` (default: {DISPATCH_BUDGET})')
+    parser.add_argument('--command-budget', type=float, default=COMMAND_BUDGET,
+                        help=f'Seconds over bare interpreter start for `<command> --help` (default: {COMMAND_BUDGET})')
+    args = parser.parse_args()
+
+    baseline = startup_time([sys.executable, '-c', 'pass'], args.runs)
+    print(f"Interpreter start: {baseline * 1000:.0f} ms")
+    checks = [('--help', [sys.executable, MAIN, '--help'], args.dispatch_budget)]
+    checks += [(f"{name} --help", [sys.executable, MAIN, name, '--help'], args.command_budget) for name in COMMANDS]
+
+    failures = 0
+    for label, command, budget in checks:
+        try:
+            overhead = startup_time(command, args.runs) - baseline
+        except RuntimeError as e:
+            print(f"FAIL {label}: {e}")
+            failures += 1
+            continue
+        ok = overhead <= budget
+        failures += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {label:<18} +{overhead * 1000:6.0f} ms (budget {budget * 1000:.0f} ms)")
+
+    if failures:
+        print(f"{failures} of {len(checks)} checks failed")
+        sys.exit(1)
+    print(f"All {len(checks)} checks within budget")
+
+
+if __name__ == '__main__':
+    main()
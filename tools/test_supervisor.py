@@ -0,0 +1,178 @@
+import argparse
+import http.client
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+# Paths
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+SERVE = os.path.join(ROOT, 'serve.py')
+
+MODELS = ['mock-base', 'mock-finetuned']
+# Crash detection waits for the monitor's next pass (HEALTH_INTERVAL), then the first restart backoff
+RESTART_TIMEOUT = 30.0
+
+
+def free_port(count):
+    """A port with the `count` ports after it (one per backend) free as well."""
+    for _ in range(100):
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            port = s.getsockname()[1]
+        try:
+            for offset in range(count + 1):
+                with socket.socket() as s:
+                    s.bind(('127.0.0.1', port + offset))
+            return port
+        except OSError:
+            continue
+    raise RuntimeError("No free port range")
+
+
+def request(port, method, path, body=None):
+    """(status, JSON body or None) of one request to the supervisor."""
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    try:
+        data = body if isinstance(body, bytes) or body is None else json.dumps(body).encode('utf-8')
+        connection.request(method, path, body=data, headers={'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        raw = response.read()
+    finally:
+        connection.close()
+    try:
+        return response.status, json.loads(raw) if raw else None
+    except ValueError:
+        return response.status, None
+
+
+def chat(port, model):
+    return request(port, 'POST', '/v1/chat/completions', {
+        'model': model, 'max_tokens': 8, 'messages': [{'role': 'user', 'content': 'transliterate'}]})
+
+
+def backends(port):
+    """model -> backend state from /health."""
+    _, health = request(port, 'GET', '/health')
+    return {state['model']: state for state in health['backends']}
+
+
+def wait_for(condition, timeout, interval=0.2):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if condition():
+                return True
+        except OSError:
+            pass
+        time.sleep(interval)
+    return False
+
+
+def pid_exists(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+def run_checks(process, port, startup_timeout):
+    """Yields (label, error or None) for each check against a running `serve.py --mock`."""
+    started = wait_for(lambda: request(port, 'GET', '/health')[0] == 200, startup_timeout)
+    yield 'startup: /health is 200 once every backend is warmed up', \
+        None if started else f"no healthy supervisor on port {port} after {startup_timeout:g}s"
+    if not started:
+        return
+
+    _, models = request(port, 'GET', '/v1/models')
+    served = sorted(entry['id'] for entry in models['data'])
+    yield 'startup: /v1/models lists every model', None if served == sorted(MODELS) else f"served {served}"
+
+    errors = []
+    for model in MODELS:
+        status, response = chat(port, model)
+        if status != 200 or not response.get('choices'):
+            errors.append(f"{model}: {status} {response}")
+    counts = {model: state['requests'] for model, state in backends(port).items()}
+    if any(counts[model] < 1 for model in MODELS):
+        errors.append(f"requests per backend {counts}")
+    yield 'routing: each model is served by its own backend', '; '.join(errors) or None
+
+    status, _ = chat(port, 'no-such-model')
+    yield 'routing: unknown model is 404', None if status == 404 else f"got {status}"
+
+    try:
+        status, _ = request(port, 'POST', '/v1/chat/completions', [1])
+    except OSError as e:
+        status = f"{type(e).__name__}: {e}"
+    yield 'routing: non-object JSON body is 400', None if status == 400 else f"got {status}"
+
+    # Crash one backend; it must stop taking requests at once and come back after a restart
+    model = MODELS[0]
+    state = backends(port)[model]
+    os.kill(state['pid'], signal.SIGKILL)
+    wait_for(lambda: not backends(port)[model]['alive'], 5.0, 0.05)
+    crashed = backends(port)[model]
+    yield 'crash: /health reports the dead backend as not ready', \
+        None if not crashed['ready'] and not crashed['alive'] else f"state {crashed}"
+    status, _ = chat(port, model)
+    yield 'crash: requests get 503 while the backend restarts', None if status == 503 else f"got {status}"
+    status, _ = chat(port, MODELS[1])
+    yield 'crash: the other backend keeps serving', None if status == 200 else f"got {status}"
+
+    restarted = wait_for(lambda: backends(port)[model]['ready'], RESTART_TIMEOUT)
+    state = backends(port)[model]
+    status, _ = chat(port, model)
+    yield 'crash: the backend is restarted and serves again', \
+        None if restarted and state['restarts'] == 1 and status == 200 else f"state {state}, request {status}"
+
+    # Ctrl-C stops the supervisor and every backend
+    pids = [state['pid'] for state in backends(port).values()]
+    process.send_signal(signal.SIGINT)
+    try:
+        process.wait(timeout=30)
+        stopped = not any(pid_exists(pid) for pid in pids)
+        error = None if stopped else f"backends still running: {[pid for pid in pids if pid_exists(pid)]}"
+    except subprocess.TimeoutExpired:
+        error = 'supervisor still running 30s after SIGINT'
+    yield 'shutdown: SIGINT stops the supervisor and its backends', error
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check serve.py startup, routing, crash restart and shutdown with mock backends')
+    parser.add_argument('--startup-timeout', type=float, default=60.0,
+                        help='Seconds for the mock backends to start and warm up (default: 60)')
+    args = parser.parse_args()
+
+    port = free_port(len(MODELS))
+    command = [sys.executable, SERVE, '--mock', '--port', str(port), '--warmup', '1']
+    for model in MODELS:
+        command += ['--model', model]
+    process = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    failures = checks = 0
+    try:
+        for label, error in run_checks(process, port, args.startup_timeout):
+            checks += 1
+            failures += error is not None
+            print(f"{'FAIL' if error else 'ok  '} {label}" + (f"\n     {error}" if error else ''))
+    finally:
+        if process.poll() is None:
+            process.send_signal(signal.SIGINT)
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    if failures:
+        print(f"{failures} of {checks} checks failed")
+        sys.exit(1)
+    print(f"All {checks} checks passed")
+
+
+if __name__ == '__main__':
+    main()
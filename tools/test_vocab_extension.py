@@ -0,0 +1,77 @@
+import argparse
+import os
+import sys
+
+import torch
+from peft import LoraConfig, get_peft_model
+from tokenizers import Tokenizer, decoders, models, pre_tokenizers
+from transformers import LlamaConfig, LlamaForCausalLM, PreTrainedTokenizerFast
+
+# Add lib to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lib'))
+
+from training.vocab_extension import extend_tokenizer, resize_embeddings, trainable_token_indices
+
+TEXT = '1. lugal e2 lugal'
+PROMPT = '1.'
+NEW_TOKENS = ['lugal']
+
+
+def byte_tokenizer():
+    """Byte-level tokenizer without merges, so every added token splits into several base pieces."""
+    alphabet = sorted(pre_tokenizers.ByteLevel.alphabet())
+    tokenizer = Tokenizer(models.BPE(vocab={char: i for i, char in enumerate(alphabet)}, merges=[]))
+    tokenizer.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+    tokenizer.decoder = decoders.ByteLevel()
+    return PreTrainedTokenizerFast(tokenizer_object=tokenizer, eos_token='!')
+
+
+def fit_and_generate(indices_for, steps, seed=0):
+    """
+    Extend a tiny untied causal LM with NEW_TOKENS, fit LoRA + trainable tokens on TEXT, greedy-decode from PROMPT.
+
+    Returns:
+        tuple[dict, list[str], bool]: trainable_token_indices used, generated tokens, whether an added token was emitted
+    """
+    torch.manual_seed(seed)
+    tokenizer = byte_tokenizer()
+    model = LlamaForCausalLM(LlamaConfig(vocab_size=len(tokenizer), hidden_size=64, intermediate_size=128,
+                                         num_hidden_layers=2, num_attention_heads=4, num_key_value_heads=4,
+                                         tie_word_embeddings=False))
+    pieces = extend_tokenizer(tokenizer, NEW_TOKENS)
+    new_ids = resize_embeddings(model, tokenizer, {'tokens': pieces})
+    indices = indices_for(model, new_ids)
+    model = get_peft_model(model, LoraConfig(r=8, lora_alpha=16, target_modules=['q_proj', 'v_proj'],
+                                             trainable_token_indices=indices))
+
+    ids = torch.tensor([tokenizer(TEXT)['input_ids']])
+    optimizer = torch.optim.AdamW([p for p in model.parameters() if p.requires_grad], lr=1e-2)
+    for _ in range(steps):
+        model(input_ids=ids, labels=ids).loss.backward()
+        optimizer.step()
+        optimizer.zero_grad()
+
+    prompt = torch.tensor([tokenizer(PROMPT)['input_ids']])
+    generated = model.generate(input_ids=prompt, max_new_tokens=6, do_sample=False)[0, prompt.shape[1]:].tolist()
+    return indices, tokenizer.convert_ids_to_tokens(generated), any(i in new_ids for i in generated)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check that added ATF tokens can be generated after a short LoRA fit')
+    parser.add_argument('--steps', type=int, default=100, help='Optimizer steps (default: 100)')
+    args = parser.parse_args()
+
+    # Input rows only (the old configuration), for comparison
+    _, tokens, emitted = fit_and_generate(lambda model, new_ids: {'embed_tokens': new_ids}, args.steps)
+    print(f"embed_tokens only:         {tokens} -> added token {'emitted' if emitted else 'not emitted'}")
+
+    indices, tokens, emitted = fit_and_generate(trainable_token_indices, args.steps)
+    print(f"{', '.join(indices)}: {tokens} -> added token {'emitted' if emitted else 'not emitted'}")
+    if 'lm_head' not in indices or not emitted:
+        print("FAIL: the untied lm_head rows of the added tokens are not trained")
+        sys.exit(1)
+    print("ok")
+
+
+if __name__ == '__main__':
+    main()
@@ -9,7 +9,7 @@ import sys
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lib'))
 
 from atf2unicode.main import atf_to_cuneiform
-from translators import detect_language
+from translators import detect_language, translate_routed, bucket_corpus
 
 # Paths
 STATE_FILE = 'data/download_state.json'
@@ -161,7 +161,8 @@ def translate_atf(atf_text, language='auto', period=''):
         str: English translation
     """
     if language == 'auto':
-        translator = detect_language(atf_text, period)
+        # Route line by line so mixed-language tablets use the right dictionaries
+        return translate_routed(atf_text, period)
     elif language == 'sumerian':
         from translators import SumerianTranslator
         translator = SumerianTranslator()
@@ -243,11 +244,16 @@ def main():
     group = parser.add_mutually_exclusive_group(required=True)
     group.add_argument('atf_file', nargs='?', help='Path to ATF file (legacy mode)')
     group.add_argument('--artifact_id', help='Artifact ID to lookup and translate')
+    group.add_argument('--bucket', metavar='ATF_DIR', help='Group ATF files in a directory by header language (reads only the first few KB of each file)')
     parser.add_argument('--language', choices=['auto', 'sumerian', 'akkadian'], default='auto', help='Language for translation (auto-detects from ATF)')
     args = parser.parse_args()
 
     if args.artifact_id:
         lookup_and_translate(args.artifact_id, args.language)
+    elif args.bucket:
+        buckets = bucket_corpus(args.bucket)
+        for language, paths in sorted(buckets.items()):
+            print(f"{language}: {len(paths)} files")
     else:
         # Legacy mode
         if not os.path.exists(args.atf_file):
@@ -1,64 +1,187 @@
 # train.py — DeepSeek-OCR Cuneiform OCR Fine-Tuning (4090)
+#
+#   python train.py                    # fine-tune
+#   python train.py --benchmark-data   # time the data pipeline only (CPU, no model)
+import argparse
 import os
+import sys
+import tempfile
+import time
 import torch
-from transformers import AutoModel, AutoTokenizer, BitsAndBytesConfig, Trainer, TrainingArguments, CLIPImageProcessor
+from transformers import AutoModel, AutoTokenizer, BitsAndBytesConfig, TrainingArguments, CLIPImageProcessor
 from peft import LoraConfig, get_peft_model
-from datasets import Dataset
-from PIL import Image
 import warnings
 
 warnings.filterwarnings("ignore")
 
+# Add lib to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'lib'))
+
+from corpus import find_clusters, grouped_split
+from images import open_image_store
+from training import (BucketedTrainer, DatasetCache, LengthBucketSampler, OCRDataCollator, ShardStream,
+                      ShardTransform, collect_samples, face_samples, line_samples, load_extension, read_annotation,
+                      read_index, resize_embeddings, run_data_benchmark, sequence_lengths, shard_paths,
+                      trainable_token_indices)
+
+parser = argparse.ArgumentParser(description="Fine-tune DeepSeek-OCR on cuneiform tablets")
+parser.add_argument("--benchmark-data", action="store_true",
+                    help="Run loading, preprocessing, tokenization and collation as training would, without the model")
+parser.add_argument("--benchmark-epochs", type=int, default=1, help="Epochs to iterate in --benchmark-data (default: 1)")
+parser.add_argument("--step-time", type=float, default=0.0,
+                    help="Simulated model step in seconds per batch for --benchmark-data (default: 0)")
+parser.add_argument("--cold", action="store_true",
+                    help="With --benchmark-data, preprocess from scratch in temporary cache directories")
+args = parser.parse_args()
+
 # ==============================
 # 1. CONFIG
 # ==============================
 DATA_DIR = "data"
 IMAGE_DIR = os.path.join(DATA_DIR, "images")
 ANN_DIR = os.path.join(DATA_DIR, "annotations")
+CACHE_DIR = os.path.join(DATA_DIR, "cache", "dataset")
+IMAGE_STORE_DIR = os.path.join(DATA_DIR, "cache", "image_store")
+FACE_DIR = os.path.join(DATA_DIR, "cache", "faces")
+LINE_DIR = os.path.join(DATA_DIR, "cache", "lines")
+SHARD_DIR = os.path.join(DATA_DIR, "shards")
 OUTPUT_DIR = "outputs"
+BASE_MODEL = "deepseek-ai/DeepSeek-OCR"
+# Tokenizer extended with frequent ATF signs (tools/extend_tokenizer.py); used when present
+EXTENDED_TOKENIZER_DIR = "models/tokenizer-atf"
 FINAL_MODEL_DIR = "models/sumerian-deepseek-ocr"
+# Keep near-duplicate transliterations (MinHash/LSH clusters) on one side of the split
+DEDUP_SPLIT = True
+# Parallel workers for the (cached) preprocessing stage
+NUM_PROC = min(8, os.cpu_count() or 1)
+# Train on segmented obverse/reverse crops paired with their ATF section instead of whole photos
+FACE_SAMPLES = True
+# Train on text-line crops aligned to numbered ATF lines (requires FACE_SAMPLES)
+LINE_SAMPLES = False
+LINE_MIN_CONFIDENCE = 0.3
+# Stream samples from tar shards (tools/make_shards.py) instead of data/images + data/annotations
+STREAM_SHARDS = False
+SHUFFLE_BUFFER = 1000
+# Serve pixels from the memory-mapped uint8 image store instead of caching float tensors
+USE_IMAGE_STORE = True
+# Batch samples of similar target length (quantile buckets) to cut padding
+NUM_LENGTH_BUCKETS = 8
+# Token budget per batch for packing many short (line-level) samples; None = fixed batch size
+MAX_BATCH_TOKENS = None
+BATCH_SIZE = 2
+DATALOADER_WORKERS = 2
 
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-os.makedirs(FINAL_MODEL_DIR, exist_ok=True)
+if args.benchmark_data and args.cold:
+    cache_tmp = tempfile.TemporaryDirectory(prefix="deep-cuneiform-bench-")
+    CACHE_DIR = os.path.join(cache_tmp.name, "dataset")
+    IMAGE_STORE_DIR = os.path.join(cache_tmp.name, "image_store")
+    FACE_DIR = os.path.join(cache_tmp.name, "faces")
+    LINE_DIR = os.path.join(cache_tmp.name, "lines")
+
+if not args.benchmark_data:
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    os.makedirs(FINAL_MODEL_DIR, exist_ok=True)
+
+stage_times = {}
+stage_start = time.perf_counter()
 
 # ==============================
 # 2. LOAD DATASET
 # ==============================
-image_paths = [
-    os.path.join(IMAGE_DIR, f)
-    for f in os.listdir(IMAGE_DIR)
-    if f.lower().endswith(('.jpg', '.png', '.jpeg'))
-]
-
-atf_texts = []
-for img_file in [os.path.basename(p) for p in image_paths]:
-    base_name = os.path.splitext(img_file)[0]
-    ann_path = os.path.join(ANN_DIR, f"{base_name}.atf")
-    if os.path.exists(ann_path):
-        with open(ann_path, 'r', encoding='utf-8') as f:
-            text = f.read().strip()
-    else:
-        text = "# No annotation"
-    atf_texts.append(text)
+if STREAM_SHARDS:
+    # Samples and the train/eval split come from the tar shards (tools/make_shards.py)
+    shard_index = read_index(SHARD_DIR)
+    stage_times["load"] = time.perf_counter() - stage_start
+else:
+    tablet_samples = collect_samples(IMAGE_DIR, ANN_DIR)
+    atf_texts = [read_annotation(s["annotation"]) for s in tablet_samples]
+    stage_times["load"] = time.perf_counter() - stage_start
 
-raw_dataset = Dataset.from_dict({"image": image_paths, "text": atf_texts})
-dataset_split = raw_dataset.train_test_split(test_size=0.2, seed=3407)
-train_dataset = dataset_split["train"]
-eval_dataset = dataset_split["test"]
-
-print(f"Loaded {len(train_dataset)} train, {len(eval_dataset)} eval samples.")
+    if FACE_SAMPLES:
+        stage_start = time.perf_counter()
+        samples = face_samples(tablet_samples, FACE_DIR, workers=NUM_PROC)
+        stage_times["faces"] = time.perf_counter() - stage_start
+        if LINE_SAMPLES:
+            stage_start = time.perf_counter()
+            samples = line_samples(samples, LINE_DIR, LINE_MIN_CONFIDENCE, workers=NUM_PROC)
+            stage_times["lines"] = time.perf_counter() - stage_start
+    else:
+        samples = [dict(s, tablet=s["key"]) for s in tablet_samples]
 
 # ==============================
 # 3. LOAD TOKENIZER & IMAGE PROCESSOR
 # ==============================
-tokenizer = AutoTokenizer.from_pretrained("deepseek-ai/DeepSeek-OCR", trust_remote_code=True)
+stage_start = time.perf_counter()
+tokenizer_extension = load_extension(EXTENDED_TOKENIZER_DIR)
+if tokenizer_extension:
+    tokenizer = AutoTokenizer.from_pretrained(EXTENDED_TOKENIZER_DIR, trust_remote_code=True)
+    print(f"Using extended tokenizer from {EXTENDED_TOKENIZER_DIR} ({len(tokenizer_extension['tokens'])} ATF tokens)")
+else:
+    tokenizer = AutoTokenizer.from_pretrained(BASE_MODEL, trust_remote_code=True)
 tokenizer.padding_side = "left"
 
 # Use CLIP image processor (DeepSeek-VL2 vision tower is CLIP-based)
 image_processor = CLIPImageProcessor.from_pretrained("openai/clip-vit-large-patch14")
+stage_times["tokenizer"] = time.perf_counter() - stage_start
+
+# ==============================
+# 4. PREPROCESS (CACHED)
+# ==============================
+# Tokenized targets and pixel tensors are cached on disk keyed by tokenizer,
+# image-processor config and source file hash; only new tablets are processed.
+# With the image store, images are decoded and resized once into a uint8 memmap
+# and only normalized per batch in the collator.
+image_store = None
+if STREAM_SHARDS:
+    # Shards are read sequentially and shuffled through a buffer; samples are
+    # tokenized and processed on the fly in the loader workers
+    shard_transform = ShardTransform(tokenizer, image_processor)
+    train_shards, train_count = shard_paths(shard_index, "train", SHARD_DIR)
+    eval_shards, eval_count = shard_paths(shard_index, "eval", SHARD_DIR)
+    train_dataset = ShardStream(train_shards, train_count, shard_transform, shuffle_buffer=SHUFFLE_BUFFER, seed=42)
+    eval_dataset = ShardStream(eval_shards, eval_count, shard_transform, shuffle=False)
+else:
+    if USE_IMAGE_STORE:
+        stage_start = time.perf_counter()
+        image_store = open_image_store([s["image"] for s in samples], IMAGE_STORE_DIR,
+                                       size=image_processor.crop_size["height"], workers=NUM_PROC)
+        stage_times["images"] = time.perf_counter() - stage_start
+    stage_start = time.perf_counter()
+    dataset = DatasetCache(
+        tokenizer, image_processor, cache_root=CACHE_DIR, include_pixels=not USE_IMAGE_STORE,
+    ).build(samples, num_proc=NUM_PROC)
+    stage_times["tokenize"] = time.perf_counter() - stage_start
+
+    if DEDUP_SPLIT:
+        # Clusters are found on whole tablets; faces of a tablet share its cluster
+        tablet_clusters = dict(zip((s["key"] for s in tablet_samples), find_clusters(atf_texts)))
+        train_idx, test_idx = grouped_split([tablet_clusters[s["tablet"]] for s in samples], test_size=0.2, seed=3407)
+        train_dataset = dataset.select(train_idx)
+        eval_dataset = dataset.select(test_idx)
+    else:
+        dataset_split = dataset.train_test_split(test_size=0.2, seed=3407)
+        train_dataset = dataset_split["train"]
+        eval_dataset = dataset_split["test"]
+
+print(f"Loaded {len(train_dataset)} train, {len(eval_dataset)} eval samples.")
+
+data_collator = OCRDataCollator(
+    tokenizer, image_store=image_store,
+    image_mean=image_processor.image_mean, image_std=image_processor.image_std,
+)
+
+if args.benchmark_data:
+    sampler = None
+    if not STREAM_SHARDS:
+        sampler = LengthBucketSampler(sequence_lengths(train_dataset), BATCH_SIZE, num_buckets=NUM_LENGTH_BUCKETS,
+                                      max_tokens=MAX_BATCH_TOKENS, seed=42)
+    run_data_benchmark(train_dataset, data_collator, sampler, num_workers=DATALOADER_WORKERS,
+                       epochs=args.benchmark_epochs, step_time=args.step_time, stage_times=stage_times,
+                       batch_size=BATCH_SIZE)
+    sys.exit(0)
 
 # ==============================
-# 4. LOAD MODEL
+# 5. LOAD MODEL
 # ==============================
 quantization_config = BitsAndBytesConfig(
     load_in_4bit=True,
@@ -68,7 +191,7 @@ quantization_config = BitsAndBytesConfig(
 )
 
 model = AutoModel.from_pretrained(
-    "deepseek-ai/DeepSeek-OCR",
+    BASE_MODEL,
     quantization_config=quantization_config,
     device_map="auto",
     trust_remote_code=True,
@@ -76,8 +199,13 @@ model = AutoModel.from_pretrained(
     attn_implementation="flash_attention_2",
 )
 
+# New ATF tokens start from the mean of their base-token embeddings and
+# are trained alongside the LoRA weights (only their rows, not the whole matrix,
+# in the input embeddings and in an untied lm_head)
+new_token_ids = resize_embeddings(model, tokenizer, tokenizer_extension) if tokenizer_extension else []
+
 # ==============================
-# 5. LoRA
+# 6. LoRA
 # ==============================
 lora_config = LoraConfig(
     r=16,
@@ -89,14 +217,43 @@ lora_config = LoraConfig(
     lora_dropout=0.05,
     bias="none",
     task_type="CAUSAL_LM",
+    trainable_token_indices=trainable_token_indices(model, new_token_ids),
 )
 model = get_peft_model(model, lora_config)
 model.print_trainable_parameters()
 
 # ==============================
-# 6. PREPROCESS FUNCTION (FIXED WITH PIL)
+# 7. TRAIN
 # ==============================
-def preprocess_function(examples):
-    image_paths = examples["image"]
-    texts = examples["text"]
-    prompt = "User: Transcribe this cuneiform tablet in ATF format.\n"
+training_args = TrainingArguments(
+    output_dir=OUTPUT_DIR,
+    per_device_train_batch_size=BATCH_SIZE,
+    per_device_eval_batch_size=BATCH_SIZE,
+    gradient_accumulation_steps=4,
+    num_train_epochs=3,
+    learning_rate=2e-4,
+    bf16=True,
+    logging_steps=10,
+    eval_strategy="epoch",
+    save_strategy="epoch",
+    save_total_limit=2,
+    dataloader_num_workers=DATALOADER_WORKERS,
+    remove_unused_columns=False,
+    report_to="none",
+)
+
+# Padding efficiency per epoch is printed by the length-bucket sampler
+trainer = BucketedTrainer(
+    model=model,
+    args=training_args,
+    train_dataset=train_dataset,
+    eval_dataset=eval_dataset,
+    data_collator=data_collator,
+    num_buckets=NUM_LENGTH_BUCKETS,
+    max_tokens=MAX_BATCH_TOKENS,
+)
+trainer.train()
+
+model.save_pretrained(FINAL_MODEL_DIR)
+tokenizer.save_pretrained(FINAL_MODEL_DIR)
+print(f"Saved LoRA adapter to {FINAL_MODEL_DIR}")